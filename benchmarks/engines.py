@@ -0,0 +1,82 @@
+"""Time each engine node by node on C-5 or a synthetic city and check that the engines agree.
+
+Usage:
+
+    python benchmarks/engines.py
+    python benchmarks/engines.py --blocks 20 --seed 3
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+from hamilton import base, lifecycle
+
+from naturf import equivalence
+from naturf.driver import Model
+
+
+class NodeTimer(lifecycle.NodeExecutionHook):
+    """Record the wall time of every node."""
+
+    def __init__(self):
+        self.seconds = {}
+
+    def run_before_node_execution(self, node_name: str, **kwargs):
+        self.seconds[node_name] = time.perf_counter()
+
+    def run_after_node_execution(self, node_name: str, **kwargs):
+        self.seconds[node_name] = time.perf_counter() - self.seconds[node_name]
+
+
+def time_nodes(inputs: dict, overrides: dict, engine: str) -> pd.Series:
+    """Run the DAG with `engine` and return the seconds spent in each node."""
+
+    timer = NodeTimer()
+    model = Model(inputs, equivalence.DEFAULT_COMPARED_NODES, engine=engine)
+    dr = model._build_driver([base.DictResult(), timer])
+    overrides = {name: value.copy() for name, value in overrides.items()}
+    dr.execute(equivalence.DEFAULT_COMPARED_NODES, inputs=inputs, overrides=overrides)
+
+    return pd.Series(timer.seconds, name=engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--blocks", type=int, default=0, help="blocks per side of a synthetic city, 0 for C-5"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic city")
+    args = parser.parse_args()
+
+    inputs = {"radius": 100, "cap_style": 1}
+    overrides = {}
+    if args.blocks:
+        overrides["input_shapefile_df"] = equivalence.synthetic_city(
+            blocks=args.blocks, seed=args.seed
+        )
+    else:
+        inputs["input_shapefile"] = os.path.join(
+            os.path.dirname(__file__), "..", "naturf", "data", "C-5.shp"
+        )
+
+    seconds = pd.concat(
+        [time_nodes(inputs, overrides, engine) for engine in ("reference", "fast")], axis=1
+    )
+    seconds["speedup"] = seconds["reference"] / seconds["fast"]
+    seconds.loc["total"] = [
+        seconds["reference"].sum(),
+        seconds["fast"].sum(),
+        seconds["reference"].sum() / seconds["fast"].sum(),
+    ]
+
+    with pd.option_context("display.max_rows", None, "display.float_format", "{:.3f}".format):
+        print(seconds.sort_values("reference", ascending=False))
+
+    report = equivalence.compare_engines(inputs, overrides=overrides)
+    print(f"first divergent node: {equivalence.first_divergent_node(report)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Time many small runs of the model with the default adapters and headless.
+
+Each run builds a model for a small synthetic city and writes its binary and index, as a batch or service job does,
+so the fixed cost of building the driver and of the progress bar and data frame results weighs on every run.
+
+Usage:
+
+    python benchmarks/headless.py
+    python benchmarks/headless.py --blocks 2 --runs 50 --engine fast
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from naturf import equivalence
+from naturf.driver import Model
+
+
+def time_runs(inputs: dict, city: pd.DataFrame, runs: int, engine: str, headless: bool) -> dict:
+    """Build and execute `runs` models and return the milliseconds per run spent building and executing them."""
+
+    outputs = ["write_binary", "write_index"]
+    build = execute = 0.0
+    for _ in range(runs):
+        start = time.perf_counter()
+        model = Model(inputs, outputs, engine=engine, headless=headless)
+        model.overrides = {"input_shapefile_df": city.copy()}
+        build += time.perf_counter() - start
+
+        start = time.perf_counter()
+        # the progress bar writes to stderr, which is discarded so that it is timed but not shown
+        with contextlib.redirect_stderr(io.StringIO()):
+            model.execute()
+        execute += time.perf_counter() - start
+
+    return {"build_ms": 1000 * build / runs, "execute_ms": 1000 * execute / runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=2, help="blocks per side of the city")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic city")
+    parser.add_argument("--engine", choices=["reference", "fast"], default="fast")
+    parser.add_argument("--runs", type=int, default=30, help="runs per mode")
+    args = parser.parse_args()
+
+    city = equivalence.synthetic_city(blocks=args.blocks, seed=args.seed)
+    with tempfile.TemporaryDirectory() as output_directory:
+        inputs = {
+            "radius": 100,
+            "cap_style": 1,
+            "input_shapefile": "synthetic.shp",
+            "output_directory": output_directory,
+        }
+        # warm up the imports and caches shared by both modes
+        time_runs(inputs, city, 1, args.engine, headless=True)
+
+        with open(os.path.join(output_directory, "index")) as index:
+            assert index.read()
+
+        seconds = pd.DataFrame(
+            {
+                mode: time_runs(inputs, city, args.runs, args.engine, headless=mode == "headless")
+                for mode in ("default", "headless")
+            }
+        ).T
+    seconds["total_ms"] = seconds.sum(axis=1)
+
+    print(f"{len(city)} buildings, {args.engine} engine, {args.runs} runs per mode")
+    with pd.option_context("display.float_format", "{:.1f}".format):
+        print(seconds)
+    print(
+        f"speedup: {seconds.loc['default', 'total_ms'] / seconds.loc['headless', 'total_ms']:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
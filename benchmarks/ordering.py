@@ -0,0 +1,84 @@
+"""Time the pair based nodes with the buildings in input order and ordered along a Hilbert curve.
+
+The synthetic city is generated block by block, so by default its buildings are shuffled first to mimic inputs whose
+file order has nothing to do with where the buildings are.
+
+Usage:
+
+    python benchmarks/ordering.py
+    python benchmarks/ordering.py --blocks 40 --engine fast --repeat 3
+"""
+
+import argparse
+
+import pandas as pd
+from hamilton import base
+
+from engines import NodeTimer
+from naturf import equivalence
+from naturf.driver import Model
+
+# nodes whose cost scales with the number of neighbor pairs, and the ordering node itself
+PAIR_NODES = [
+    "filter_height_range",
+    "buildings_intersecting_plan_area",
+    "building_plan_area",
+    "frontal_length",
+    "distance_between_buildings",
+    "average_distance_between_buildings",
+    "area_weighted_mean_of_building_heights",
+    "mean_building_height",
+    "standard_deviation_of_building_heights",
+    "lot_area",
+]
+
+
+def time_nodes(inputs: dict, city: pd.DataFrame, building_order: str, engine: str) -> pd.Series:
+    """Run the DAG up to the parameters with `building_order` and return the seconds spent in each node."""
+
+    timer = NodeTimer()
+    model = Model(inputs, ["merge_parameters"], engine=engine, building_order=building_order)
+    dr = model._build_driver([base.DictResult(), timer])
+    dr.execute(["merge_parameters"], inputs=inputs, overrides={"input_shapefile_df": city.copy()})
+
+    return pd.Series(timer.seconds, name=building_order)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=30, help="blocks per side of the city")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic city")
+    parser.add_argument("--engine", choices=["reference", "fast"], default="fast")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per order, the fastest is kept")
+    parser.add_argument(
+        "--keep-order",
+        action="store_true",
+        help="keep the city in block order instead of shuffling",
+    )
+    args = parser.parse_args()
+
+    inputs = {"radius": 100, "cap_style": 1}
+    city = equivalence.synthetic_city(blocks=args.blocks, seed=args.seed)
+    if not args.keep_order:
+        city = city.sample(frac=1, random_state=args.seed).reset_index(drop=True)
+
+    seconds = pd.concat(
+        [
+            pd.concat(
+                [time_nodes(inputs, city, order, args.engine) for _ in range(args.repeat)], axis=1
+            ).min(axis=1)
+            for order in ("file", "hilbert")
+        ],
+        axis=1,
+        keys=["file", "hilbert"],
+    ).loc[PAIR_NODES]
+    seconds.loc["total"] = seconds.sum()
+    seconds["speedup"] = seconds["file"] / seconds["hilbert"]
+
+    print(f"{len(city)} buildings, {args.engine} engine")
+    with pd.option_context("display.float_format", "{:.3f}".format):
+        print(seconds)
+
+
+if __name__ == "__main__":
+    main()
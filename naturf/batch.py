@@ -0,0 +1,189 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .driver import Model
+from .nodes import input_shapefile_df
+
+# columns of the summary returned by `run_inputs()`, one row per input
+SUMMARY_COLUMNS = [
+    "status",
+    "buildings",
+    "read_seconds",
+    "wait_seconds",
+    "compute_seconds",
+    "worker",
+    "error",
+]
+
+
+def input_files(paths: Sequence[str]) -> List[str]:
+    """Expand input paths into the shapefiles to process. Directories are replaced by the shapefiles they hold, in
+    alphabetical order, and files are kept as given.
+
+    :param paths:                           Shapefiles and directories of shapefiles.
+    :type paths:                            Sequence[str]
+
+    :return:                                Paths of the shapefiles.
+    """
+
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            filenames.extend(sorted(glob.glob(os.path.join(path, "*.shp"))))
+        else:
+            filenames.append(path)
+
+    return filenames
+
+
+def run_inputs(
+    input_paths: Sequence[str],
+    output_directory: str,
+    inputs: Optional[dict] = None,
+    outputs: Sequence[str] = ("write_binary", "write_index"),
+    workers: int = 1,
+    **kwargs,
+) -> pd.DataFrame:
+    """Compute the outputs of many input shapefiles, each written to a directory named after the input inside
+    `output_directory`. The inputs are spread over `workers` processes, largest files first, each going to the
+    process with the least input size assigned so far. Every process builds its driver once and reads its next input in a
+    background thread while the current one is computed. A failing input is recorded in the summary and does not
+    stop the others.
+
+    :param input_paths:                     Shapefiles and directories of shapefiles, expanded by `input_files()`.
+    :type input_paths:                      Sequence[str]
+
+    :param output_directory:                Directory the per-input output directories are created in.
+    :type output_directory:                 str
+
+    :param inputs:                          Inputs shared by every run, such as `radius` and `output_resolution`.
+                                            DEFAULT: None
+    :type inputs:                           dict
+
+    :param outputs:                         Output nodes to compute for each input.
+                                            DEFAULT: ("write_binary", "write_index")
+    :type outputs:                          Sequence[str]
+
+    :param workers:                         Number of processes. With 1 the inputs are run in this process.
+                                            DEFAULT: 1
+    :type workers:                          int
+
+    :param kwargs:                          Options of `Model`, such as `engine`.
+
+    :return:                                Pandas DataFrame indexed by input with the columns of
+                                            `SUMMARY_COLUMNS`, in input order. Empty when no shapefiles
+                                            are found.
+    """
+
+    filenames = input_files(input_paths)
+    names = [_input_name(filename) for filename in filenames]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Inputs with the same name would share an output directory: {duplicates}")
+
+    assignments = [
+        assigned
+        for assigned in _assign(filenames, max(1, min(workers, len(filenames))))
+        if assigned
+    ]
+    jobs = [
+        (assigned, output_directory, inputs or {}, list(outputs), kwargs)
+        for assigned in assignments
+    ]
+
+    if not jobs:
+        records = []
+    elif len(jobs) == 1:
+        records = _run_worker(*jobs[0])
+    else:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = [executor.submit(_run_worker, *job) for job in jobs]
+            records = [record for future in futures for record in future.result()]
+
+    summary = pd.DataFrame.from_records(records, index="input", columns=["input", *SUMMARY_COLUMNS])
+    summary = summary.astype({"buildings": "Int64"})
+
+    return summary.loc[names]
+
+
+def _run_worker(
+    filenames: List[str], output_directory: str, inputs: dict, outputs: List[str], options: dict
+) -> List[dict]:
+    """Run the inputs assigned to one process in order with a single driver, prefetching the next input."""
+
+    dr = Model(inputs, outputs, **{**options, "headless": True}).dr
+
+    records = []
+    with ThreadPoolExecutor(max_workers=1) as reader:
+        pending = reader.submit(_read, filenames[0])
+        for position, filename in enumerate(filenames):
+            record = {"input": _input_name(filename), "worker": os.getpid()}
+            start = time.perf_counter()
+            try:
+                buildings, record["read_seconds"] = pending.result()
+            except Exception as error:
+                buildings = None
+                record.update(status="failed", error=f"{type(error).__name__}: {error}")
+            record["wait_seconds"] = time.perf_counter() - start
+
+            if position + 1 < len(filenames):
+                pending = reader.submit(_read, filenames[position + 1])
+
+            if buildings is not None:
+                input_directory = os.path.join(output_directory, record["input"])
+                os.makedirs(input_directory, exist_ok=True)
+                start = time.perf_counter()
+                try:
+                    results = dr.execute(
+                        [*outputs, "building_id"],
+                        inputs=dict(
+                            inputs, input_shapefile=filename, output_directory=input_directory
+                        ),
+                        overrides={"input_shapefile_df": buildings},
+                    )
+                except Exception as error:
+                    record.update(status="failed", error=f"{type(error).__name__}: {error}")
+                else:
+                    record.update(status="ok", buildings=len(results["building_id"]))
+                record["compute_seconds"] = time.perf_counter() - start
+
+            records.append(record)
+
+    return records
+
+
+def _read(filename: str):
+    """Read an input shapefile, returning it with the seconds spent reading."""
+
+    start = time.perf_counter()
+    buildings = input_shapefile_df(filename)
+
+    return buildings, time.perf_counter() - start
+
+
+def _assign(filenames: List[str], workers: int) -> List[List[str]]:
+    """Assign the files to `workers` lists, largest first, each to the list with the smallest total size so far."""
+
+    sizes = np.array(
+        [os.path.getsize(filename) if os.path.exists(filename) else 0 for filename in filenames]
+    )
+    assigned = [[] for _ in range(workers)]
+    totals = np.zeros(workers)
+    for index in np.argsort(-sizes, kind="stable"):
+        worker = int(np.argmin(totals))
+        assigned[worker].append(filenames[index])
+        totals[worker] += sizes[index]
+
+    return assigned
+
+
+def _input_name(filename: str) -> str:
+    """Name of the output directory of an input, its file name without extension."""
+
+    return os.path.splitext(os.path.basename(filename))[0]
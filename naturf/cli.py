@@ -0,0 +1,245 @@
+import argparse
+import os
+import signal
+import sys
+import time
+from typing import List, Optional
+
+from . import batch, service, tiling
+from .config import Settings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the `naturf` command.
+
+    :param argv:                            Command line arguments. By default those of the process.
+                                            DEFAULT: None
+    :type argv:                             List[str]
+
+    :return:                                Exit code, 0 on success.
+    """
+
+    args = _parser().parse_args(argv)
+
+    return args.command(args)
+
+
+def _inputs(args: argparse.Namespace) -> dict:
+    inputs = {"radius": args.radius, "cap_style": args.cap_style}
+    if args.output_resolution is not None:
+        resolution = args.output_resolution
+        inputs["output_resolution"] = resolution[0] if len(resolution) == 1 else resolution
+
+    return inputs
+
+
+def _run(args: argparse.Namespace) -> int:
+    filenames = batch.input_files(args.inputs)
+    if not filenames:
+        print("no input shapefiles found", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    summary = batch.run_inputs(
+        filenames,
+        args.output_directory,
+        _inputs(args),
+        outputs=args.outputs,
+        workers=args.workers,
+        engine=args.engine,
+        building_order=args.building_order,
+    )
+    seconds = time.perf_counter() - start
+
+    print(summary.drop(columns="error").to_string(float_format="{:.3f}".format))
+    failed = summary.loc[summary["status"] != "ok"]
+    for name, error in failed["error"].items():
+        print(f"{name}: {error}", file=sys.stderr)
+    print(f"{len(summary) - len(failed)} of {len(summary)} inputs in {seconds:.1f} s")
+    if args.summary is not None:
+        summary.to_csv(args.summary)
+
+    return 1 if len(failed) else 0
+
+
+def _serve(args: argparse.Namespace) -> int:
+    # stop as on Ctrl-C when a service manager or scheduler terminates the server
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    def ready(server):
+        host, port = server.server_address[:2]
+        print(f"serving on http://{host}:{port} with {args.workers} workers", flush=True)
+
+    service.serve(
+        args.host,
+        args.port,
+        workers=args.workers,
+        max_queued=args.max_queued,
+        ready=ready,
+        inputs=_inputs(args),
+        engine=args.engine,
+        building_order=args.building_order,
+    )
+
+    return 0
+
+
+def _plan(args: argparse.Namespace) -> int:
+    inputs = _inputs(args)
+    if args.output_directory is not None:
+        inputs["output_directory"] = os.path.abspath(args.output_directory)
+
+    manifest_filename = tiling.plan_tiles(
+        args.input_shapefile,
+        args.manifest_directory,
+        inputs,
+        tile_size=args.tile_size,
+        method=args.method,
+        tile_count=args.tile_count,
+        engine=args.engine,
+        building_order=args.building_order,
+    )
+    print(f"{manifest_filename}: {len(tiling.read_manifest(manifest_filename)['tiles'])} tiles")
+
+    return 0
+
+
+def _worker(args: argparse.Namespace) -> int:
+    task_id = args.task_id
+    if task_id is None:
+        if "SLURM_ARRAY_TASK_ID" not in os.environ:
+            print("--task-id is required outside of a SLURM array job", file=sys.stderr)
+            return 2
+        task_id = int(os.environ["SLURM_ARRAY_TASK_ID"])
+
+    print(tiling.run_tile(args.manifest, task_id))
+
+    return 0
+
+
+def _reduce(args: argparse.Namespace) -> int:
+    missing = tiling.missing_tiles(args.manifest)
+    if missing:
+        print(f"tiles without results: {missing}", file=sys.stderr)
+        return 1
+
+    tiling.reduce_tiles(args.manifest, args.outputs, args.output_directory)
+
+    return 0
+
+
+def _report(args: argparse.Namespace) -> int:
+    report = tiling.tile_report(args.manifest)
+    print(report.to_string(float_format="{:.3f}".format))
+
+    return 0
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="naturf", description="Compute urban parameters for WRF from building footprints."
+    )
+    commands = parser.add_subparsers(required=True, metavar="command")
+
+    run = commands.add_parser(
+        "run", help="compute the outputs of many input shapefiles in a pool of worker processes"
+    )
+    run.add_argument("inputs", nargs="+", help="shapefiles, or directories of shapefiles")
+    run.add_argument(
+        "--output-directory",
+        required=True,
+        help="directory holding one output directory per input, named after the input",
+    )
+    run.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    run.add_argument("--outputs", nargs="+", default=["write_binary", "write_index"])
+    run.add_argument("--summary", help="CSV file the per-input status and timings are written to")
+    _add_model_arguments(run)
+    run.set_defaults(command=_run)
+
+    serve = commands.add_parser(
+        "serve", help="run jobs submitted over local HTTP in a pool of warm worker processes"
+    )
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve.add_argument("--port", type=int, default=8765, help="port to listen on, 0 for any")
+    serve.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    serve.add_argument(
+        "--max-queued",
+        type=int,
+        default=100,
+        help="jobs that can wait for a worker before new jobs are refused",
+    )
+    _add_model_arguments(serve)
+    serve.set_defaults(command=_serve)
+
+    plan = commands.add_parser(
+        "plan", help="partition an input shapefile into tiles and write a manifest of tile jobs"
+    )
+    plan.add_argument("input_shapefile", help="shapefile of building footprints and heights")
+    plan.add_argument(
+        "--manifest-directory",
+        required=True,
+        help="shared directory the manifest and the tile results are written to",
+    )
+    plan.add_argument(
+        "--tile-size",
+        type=float,
+        default=Settings.DEFAULT_SPATIAL_TILE_SIZE,
+        help="side of a tile of the grid method in units of the input CRS",
+    )
+    plan.add_argument(
+        "--method",
+        choices=tiling.TILING_METHODS,
+        default="grid",
+        help="square tiles of --tile-size, or --tile-count tiles balanced by estimated cost",
+    )
+    plan.add_argument(
+        "--tile-count",
+        type=int,
+        default=Settings.DEFAULT_SPATIAL_TILE_COUNT,
+        help="number of tiles of the balanced method",
+    )
+    plan.add_argument("--output-directory", help="directory the reducer writes the outputs to")
+    _add_model_arguments(plan)
+    plan.set_defaults(command=_plan)
+
+    worker = commands.add_parser("worker", help="compute the parameters of one tile of a manifest")
+    worker.add_argument("--manifest", required=True)
+    worker.add_argument(
+        "--task-id", type=int, help="tile to compute, by default $SLURM_ARRAY_TASK_ID"
+    )
+    worker.set_defaults(command=_worker)
+
+    reduce = commands.add_parser(
+        "reduce", help="merge the tile results of a manifest and write the outputs"
+    )
+    reduce.add_argument("--manifest", required=True)
+    reduce.add_argument("--outputs", nargs="+", default=["write_binary", "write_index"])
+    reduce.add_argument("--output-directory")
+    reduce.set_defaults(command=_reduce)
+
+    report = commands.add_parser(
+        "report", help="compare the estimated and measured cost of the tiles of a manifest"
+    )
+    report.add_argument("--manifest", required=True)
+    report.set_defaults(command=_report)
+
+    return parser
+
+
+def _add_model_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--radius", type=int, default=Settings.RADIUS)
+    parser.add_argument("--cap-style", type=int, default=Settings.CAP_STYLE)
+    parser.add_argument(
+        "--output-resolution", type=float, nargs="+", help="output cell size, or its y and x sizes"
+    )
+    parser.add_argument("--engine", choices=["reference", "fast"], default="reference")
+    parser.add_argument(
+        "--building-order",
+        choices=["file", "hilbert"],
+        default=Settings.DEFAULT_BUILDING_ORDER,
+        help="keep the buildings in input order or order them along a Hilbert curve",
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
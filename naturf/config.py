@@ -36,6 +36,21 @@ class Settings:
     DEFAULT_STREET_WIDTH = 15
     DEFAULT_OUTPUT_RESOLUTION = [0.00083333333, 0.00083333333]
     DEFAULT_FILL_VALUE = 0
+    DEFAULT_PARAMETER_GROUP_SIZE = 16
+    DEFAULT_BUILDING_CHUNK_SIZE = 100000
+    DEFAULT_TILE_SIZE = 1000
+    DEFAULT_DATASET_CHUNK_SIZE = 512
+    DEFAULT_COMPRESSION_LEVEL = 4
+    DEFAULT_COMPARE_BLOCK_ROWS = 1024
+    DEFAULT_COMPARE_RTOL = 1e-5
+    DEFAULT_COMPARE_ATOL = 1e-4
+    DEFAULT_PARQUET_ROW_GROUP_SIZE = 100000
+    DEFAULT_PRECISION = "float64"
+    DEFAULT_ENGINE = "reference"
+    DEFAULT_DISTANCE = "polygon"
+    DEFAULT_BUILDING_ORDER = "file"
+    DEFAULT_SPATIAL_TILE_SIZE = 10000
+    DEFAULT_SPATIAL_TILE_COUNT = 100
     SCALING_FACTOR = 4
 
     DATA_ID_FIELD_NAME = "OBJECTID"
@@ -51,6 +66,7 @@ class Settings:
     EAST_WEST = "east_west"
 
     ID_FIELD = "building_id"
+    ORIGINAL_ID_FIELD = "original_building_id"
     HEIGHT_FIELD = "building_height"
     GEOMETRY_FIELD = "building_geometry"
     AREA_FIELD = "building_area"
@@ -69,13 +85,19 @@ class Settings:
     NEIGHBOR_AREA_FIELD = f"{AREA_FIELD}_{NEIGHBOR}"
     TARGET_GEOMETRY_FIELD = f"{GEOMETRY_FIELD}_{TARGET}"
     NEIGHBOR_GEOMETRY_FIELD = f"{GEOMETRY_FIELD}_{NEIGHBOR}"
+    GEOMETRY_BOUNDS_FIELDS = [
+        f"{GEOMETRY_FIELD}_minx",
+        f"{GEOMETRY_FIELD}_miny",
+        f"{GEOMETRY_FIELD}_maxx",
+        f"{GEOMETRY_FIELD}_maxy",
+    ]
     TARGET_CENTROID_FIELD = f"{CENTROID_FIELD}_{TARGET}"
     NEIGHBOR_CENTROID_FIELD = f"{CENTROID_FIELD}_{NEIGHBOR}"
     NEIGHBOR_VOLUME_FIELD = f"{VOLUME_FIELD}_{NEIGHBOR}"
 
     TARGET_BUFFERED_FIELD = f"{BUFFERED_FIELD}_{TARGET}"
+    NEIGHBOR_BUFFERED_FIELD = f"{BUFFERED_FIELD}_{NEIGHBOR}"
 
-    DISTANCE_TO_NEIGHBOR_BY_CENTROID = f"distance_to_{NEIGHBOR}_by_centroid"
     DISTANCE_BETWEEN_BUILDINGS = "distance_between_buildings"
     AVERAGE_DISTANCE_BETWEEN_BUILDINGS = "average_distance_between_buildings"
 
@@ -97,6 +119,18 @@ class Settings:
     WALL_LENGTH_EAST = "wall_length_east"
     WALL_LENGTH_SOUTH = "wall_length_south"
     WALL_LENGTH_WEST = "wall_length_west"
+    WALL_LENGTH_FIELDS = [WALL_LENGTH_NORTH, WALL_LENGTH_EAST, WALL_LENGTH_SOUTH, WALL_LENGTH_WEST]
+
+    GEOMETRY_HASH_FIELD = "geometry_hash"
+    VERTEX_COUNT_FIELD = "vertex_count"
+    CENTROID_FIELDS = [f"{CENTROID_FIELD}_x", f"{CENTROID_FIELD}_y"]
+    BUILDING_FEATURE_FIELDS = [
+        AREA_FIELD,
+        *CENTROID_FIELDS,
+        *WALL_LENGTH_FIELDS,
+        VERTEX_COUNT_FIELD,
+        *GEOMETRY_BOUNDS_FIELDS,
+    ]
     FRONTAL_LENGTH_NORTH = "frontal_length_north"
     FRONTAL_LENGTH_EAST = "frontal_length_east"
     FRONTAL_LENGTH_SOUTH = "frontal_length_south"
@@ -130,6 +164,16 @@ class Settings:
     RAUPACH_ROUGHNESS_LENGTH_EAST = "raupach_roughness_length_east"
     RAUPACH_ROUGHNESS_LENGTH_SOUTH = "raupach_roughness_length_south"
     RAUPACH_ROUGHNESS_LENGTH_WEST = "raupach_roughness_length_west"
+    RAUPACH_FIELDS = [
+        RAUPACH_ROUGHNESS_LENGTH_NORTH,
+        RAUPACH_DISPLACEMENT_HEIGHT_NORTH,
+        RAUPACH_ROUGHNESS_LENGTH_EAST,
+        RAUPACH_DISPLACEMENT_HEIGHT_EAST,
+        RAUPACH_ROUGHNESS_LENGTH_SOUTH,
+        RAUPACH_DISPLACEMENT_HEIGHT_SOUTH,
+        RAUPACH_ROUGHNESS_LENGTH_WEST,
+        RAUPACH_DISPLACEMENT_HEIGHT_WEST,
+    ]
     MACDONALD_ROUGHNESS_LENGTH_NORTH = "macdonald_roughness_length_north"
     MACDONALD_ROUGHNESS_LENGTH_EAST = "macdonald_roughness_length_east"
     MACDONALD_ROUGHNESS_LENGTH_SOUTH = "macdonald_roughness_length_south"
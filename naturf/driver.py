@@ -1,12 +1,20 @@
+import asyncio
 import os
-from typing import List, Union
+import threading
+import time
+from concurrent.futures import Executor
+from typing import List, Optional, Sequence, Union
 
+import geopandas as gpd
+import numpy as np
 import pandas as pd
-from hamilton import driver, base
+import shapely
+from hamilton import driver, base, lifecycle
 from hamilton.plugins import h_tqdm
 
 import naturf.nodes as nodes
 import naturf.output as output
+from naturf.config import Settings
 
 DAGWORKS_API_KEY = os.environ.get("DAGWORKS_API_KEY")
 HAMILTON_UI_PROJECT_ID = os.environ.get("HAMILTON_UI_PROJECT_ID")
@@ -15,69 +23,339 @@ ENV = os.environ.get("ENV", "dev")
 
 
 class Model:
-    def __init__(self, inputs: dict, outputs: List[str], **kwargs):
+    # nodes whose results are computed once and shared by every resolution when fanning out
+    SHARED_NODES = ["merge_parameters", "output_bounds"]
+
+    # nodes that only depend on the building footprints, computed once and shared by every height scenario
+    GEOMETRY_NODES = [
+        "building_id",
+        "original_building_id",
+        "building_geometry",
+        "building_area",
+        "wall_length",
+        "total_plan_area",
+        "buildings_intersecting_plan_area",
+        "building_plan_area",
+        "frontal_length",
+        "distance_between_buildings",
+        "average_distance_between_buildings",
+        "plan_area_fraction",
+        "target_crs",
+        "output_geometry",
+        "output_bounds",
+    ]
+
+    # nodes that do not depend on the plan area radius, computed once and shared by every radius of a sweep
+    BUILDING_NODES = [
+        "building_id",
+        "building_height",
+        "building_geometry",
+        "building_area",
+        "wall_length",
+        "target_crs",
+        "output_geometry",
+        "output_bounds",
+    ]
+
+    def __init__(
+        self,
+        inputs: dict,
+        outputs: List[str],
+        streaming: bool = False,
+        precision: str = Settings.DEFAULT_PRECISION,
+        engine: str = Settings.DEFAULT_ENGINE,
+        distance: str = Settings.DEFAULT_DISTANCE,
+        building_order: str = Settings.DEFAULT_BUILDING_ORDER,
+        neighbor_cache: bool = False,
+        feature_store: bool = False,
+        headless: bool = False,
+        resolutions: Optional[Sequence[Union[float, Sequence[float]]]] = None,
+        height_scenarios: Optional[pd.DataFrame] = None,
+        radii: Optional[Sequence[float]] = None,
+        **kwargs,
+    ):
         # dictionary of parameter inputs required to construct the DAG
         self.inputs = inputs
 
         # desired output parameters
         self.outputs = outputs
 
-        # instantiate any adapters we want
-        hamilton_adapters = [
-            base.SimplePythonDataFrameGraphAdapter(),
-            h_tqdm.ProgressBar("Naturf DAG"),
-        ]
-        # use the hosted version (there's a free tier) of the Hamilton UI to log telemetry to.
-        if DAGWORKS_API_KEY and HAMILTON_UI_USERNAME and HAMILTON_UI_PROJECT_ID:
-            try:
-                from dagworks import adapters
-            except ImportError:
-                # dagworks-sdk not installed
-                pass
-            else:
-                hamilton_adapters.append(  # pragma: no cover
-                    adapters.DAGWorksTracker(
-                        project_id=int(HAMILTON_UI_PROJECT_ID),
-                        api_key=DAGWORKS_API_KEY,
-                        username=HAMILTON_UI_USERNAME,
-                        dag_name="naturf-dag",
-                        tags={"env": ENV},
-                    )
-                )
-        # use the self-hosted version of the Hamilton UI to log telemetry to.
-        elif HAMILTON_UI_USERNAME and HAMILTON_UI_PROJECT_ID:
-            try:
-                from hamilton_sdk import adapters
-            except ImportError:
-                # hamilton-sdk not installed
-                pass
-            else:
-                hamilton_adapters.append(  # pragma: no cover
-                    adapters.HamiltonTracker(
-                        project_id=int(HAMILTON_UI_PROJECT_ID),
-                        username=HAMILTON_UI_USERNAME,
-                        dag_name="naturf-dag",
-                        tags={"env": ENV},
-                    )
-                )
+        # output resolutions to rasterize the same buildings at, each written to its own directory
+        self.resolutions = resolutions
+
+        # building heights indexed by building ID with one column per scenario, each run over the same footprints
+        # and written to its own directory
+        self.height_scenarios = height_scenarios
+
+        # plan area radii to sweep, all derived from a single spatial join at the largest radius
+        self.radii = radii
+
+        if height_scenarios is not None and radii is not None:
+            raise ValueError("Height scenarios and radii cannot be swept together.")
+
+        # node results supplied up front instead of being computed, skipping everything upstream of them
+        self.overrides = {}
+
+        if precision not in ("float64", "float32"):
+            raise ValueError(f"Unknown precision '{precision}', expected 'float64' or 'float32'.")
+        if engine not in ("reference", "fast"):
+            raise ValueError(f"Unknown engine '{engine}', expected 'reference' or 'fast'.")
+        if distance not in ("polygon", "centroid"):
+            raise ValueError(f"Unknown distance '{distance}', expected 'polygon' or 'centroid'.")
+        if building_order not in ("file", "hilbert"):
+            raise ValueError(
+                f"Unknown building order '{building_order}', expected 'file' or 'hilbert'."
+            )
+
+        # configuration selecting between alternative implementations of nodes;
+        # `streaming` rasterizes straight into the output array to cap peak memory and
+        # `precision` is the float dtype the per-building parameter tables and rasters are kept in, and
+        # `engine` selects the vectorized implementations of the heavy nodes ("fast") or the original ones, and
+        # `distance` measures the distance between buildings from polygon to polygon or, approximately, by centroid,
+        # `building_order` keeps the buildings in input order ("file") or orders them along a Hilbert curve,
+        # `neighbor_cache` reuses the neighbor pairs of the spatial join saved by an earlier run of the same buildings,
+        # and `feature_store` loads the area and wall lengths of unchanged buildings from an earlier run
+        self.config = {
+            "streaming": streaming,
+            "precision": precision,
+            "engine": engine,
+            "distance": distance,
+            "building_order": building_order,
+            "neighbor_cache": neighbor_cache,
+            "feature_store": feature_store,
+        }
+
+        # reports the nodes of a run started by `aexecute()` and stops it between nodes when cancelled; only
+        # attached to the drivers by the first `aexecute()`, so that `execute()` does not pay for it per node
+        self._node_events = None
+
+        # instantiate any adapters we want; headless models return a dictionary of the raw node outputs and skip the
+        # progress bar and the Hamilton UI trackers
+        if headless:
+            self._adapters = [base.DictResult()]
+        else:
+            self._adapters = [
+                base.SimplePythonDataFrameGraphAdapter(),
+                h_tqdm.ProgressBar("Naturf DAG"),
+                *_tracker_adapters(),
+            ]
+
+        # instantiate drivers with function definitions & adapters
+        self._build_drivers(self._adapters)
+
+    @classmethod
+    def from_parameters(
+        cls,
+        parameters_filename: Union[str, Sequence[str]],
+        outputs: List[str],
+        inputs: Optional[dict] = None,
+        **kwargs,
+    ) -> "Model":
+        """Create a model that starts from the building parameters written by `write_parameters()` instead of the
+        input shapefile, so that only the rasterization and output nodes run.
+
+        :param parameters_filename:         Full path with file name to the GeoParquet file, or a list of them
+                                            holding disjoint sets of buildings to rasterize together.
+        :type parameters_filename:          Union[str, Sequence[str]]
+
+        :param outputs:                     Output nodes to compute, such as `write_binary` and `write_index`.
+        :type outputs:                      List[str]
+
+        :param inputs:                      Inputs of the output nodes, such as `output_resolution`.
+                                            DEFAULT: None
+        :type inputs:                       dict
+
+        :return:                            Model
+        """
+
+        if isinstance(parameters_filename, str):
+            parameters = gpd.read_parquet(parameters_filename)
+        else:
+            parameters = pd.concat(
+                [gpd.read_parquet(filename) for filename in parameters_filename], ignore_index=True
+            )
+        parameters = parameters.drop(
+            columns=[field for field in Settings.GEOMETRY_BOUNDS_FIELDS if field in parameters]
+        )
+
+        model = cls(inputs or {}, outputs, **kwargs)
+        model.overrides = {
+            "merge_parameters": parameters,
+            "output_bounds": parameters.total_bounds,
+        }
+
+        return model
+
+    def _build_drivers(self, hamilton_adapters: list):
+        """Build the driver, and the driver returning a dictionary of the shared results when fanning out over
+        resolutions, scenarios, or radii."""
 
-        # instantiate driver with function definitions & adapters
-        self.dr = (
+        self.dr = self._build_driver(hamilton_adapters)
+
+        if any(
+            sweep is not None for sweep in (self.resolutions, self.height_scenarios, self.radii)
+        ):
+            self.shared_dr = self._build_driver([base.DictResult(), *hamilton_adapters[1:]])
+
+    def _watch_nodes(self) -> "_NodeEvents":
+        """Return the node event hook of `aexecute()`, rebuilding the drivers with it the first time."""
+
+        if self._node_events is None:
+            self._node_events = _NodeEvents()
+            self._build_drivers([*self._adapters, self._node_events])
+
+        return self._node_events
+
+    def _build_driver(self, hamilton_adapters: list) -> driver.Driver:
+        """Build a driver over the naturf modules with the model configuration and the given adapters."""
+
+        return (
             driver.Builder()
-            .with_config({})
+            .with_config(self.config)
             .with_modules(nodes, output)
             .with_adapters(*hamilton_adapters)
             .build()
         )
 
-    def execute(self) -> pd.DataFrame:
-        """Run the driver."""
+    def execute(self) -> Union[pd.DataFrame, dict]:
+        """Run the driver. If height scenarios, radii, or resolutions were given, return a dictionary of the results
+        for each scenario, radius, or resolution, nested by scenario or radius if resolutions were also given.
+        The results of a headless model are dictionaries of the node outputs rather than data frames.
+        """
+
+        if self.height_scenarios is not None:
+            return self._run_scenarios()
+
+        if self.radii is not None:
+            return self._run_radii()
+
+        if self.resolutions is not None:
+            return self._fan_out(self.inputs, self.overrides)
 
         # generate initial data frame
-        df = self.dr.execute(self.outputs, inputs=self.inputs)
+        df = self.dr.execute(self.outputs, inputs=self.inputs, overrides=self.overrides)
 
         return df
 
+    def aexecute(self, executor: Optional[Executor] = None) -> "Execution":
+        """Run `execute()` in `executor` without blocking the event loop. The returned execution is awaited for the
+        results of `execute()`, and iterated with `async for` for an event as each node starts and finishes.
+        Cancelling the awaiting task stops the run before its next node. Must be called from a running event loop,
+        and a model runs one execution at a time.
+
+        :param executor:                    Thread pool to run the DAG in. By default the event loop's executor.
+                                            DEFAULT: None
+        :type executor:                     concurrent.futures.Executor
+
+        :return:                            Execution
+        """
+
+        return Execution(self, executor)
+
+    def _fan_out(self, inputs: dict, overrides: dict) -> dict:
+        """Compute the per-building parameters once, then rasterize and write the outputs for each resolution into
+        a subdirectory of `output_directory` named after the resolution."""
+
+        shared = dict(overrides)
+        missing = [node for node in self.SHARED_NODES if node not in shared]
+        if missing:
+            shared.update(self.shared_dr.execute(missing, inputs=inputs, overrides=overrides))
+        output_directory = inputs.get("output_directory", ".")
+
+        results = {}
+        for resolution in self.resolutions:
+            resolution_directory = os.path.join(output_directory, _resolution_name(resolution))
+            os.makedirs(resolution_directory, exist_ok=True)
+
+            resolution_inputs = dict(
+                inputs, output_resolution=resolution, output_directory=resolution_directory
+            )
+            results[_resolution_name(resolution)] = self.dr.execute(
+                self.outputs, inputs=resolution_inputs, overrides=shared
+            )
+
+        return results
+
+    def _run_scenarios(self) -> dict:
+        """Compute the nodes that only depend on the footprints once, then run the height dependent nodes for
+        each height scenario, writing the outputs into a subdirectory of `output_directory` named after it.
+        """
+
+        geometry = dict(self.overrides)
+        missing = [node for node in self.GEOMETRY_NODES if node not in geometry]
+        if missing:
+            geometry.update(
+                self.shared_dr.execute(missing, inputs=self.inputs, overrides=self.overrides)
+            )
+        heights = _scenario_heights(self.height_scenarios, geometry["original_building_id"])
+        buildings = geometry["buildings_intersecting_plan_area"]
+        output_directory = self.inputs.get("output_directory", ".")
+
+        results = {}
+        for scenario in heights.columns:
+            scenario_directory = os.path.join(output_directory, str(scenario))
+            os.makedirs(scenario_directory, exist_ok=True)
+
+            inputs = dict(self.inputs, output_directory=scenario_directory)
+            overrides = dict(
+                geometry,
+                building_height=heights[scenario],
+                buildings_intersecting_plan_area=_with_heights(
+                    buildings, geometry["building_id"], heights[scenario]
+                ),
+            )
+            if self.resolutions is not None:
+                results[str(scenario)] = self._fan_out(inputs, overrides)
+            else:
+                results[str(scenario)] = self.dr.execute(
+                    self.outputs, inputs=inputs, overrides=overrides
+                )
+
+        return results
+
+    def _run_radii(self) -> dict:
+        """Join the buildings to their neighbors once at the largest radius, then filter the neighbors within each
+        radius and run the plan area dependent nodes, writing the outputs into a subdirectory of `output_directory`
+        named after the radius."""
+
+        inputs = dict(self.inputs, radius=max(self.radii))
+        shared = dict(self.overrides)
+        missing = [
+            node
+            for node in [*self.BUILDING_NODES, "buildings_intersecting_plan_area"]
+            if node not in shared
+        ]
+        if missing:
+            shared.update(self.shared_dr.execute(missing, inputs=inputs, overrides=shared))
+        neighbors = shared.pop("buildings_intersecting_plan_area")
+        predicate = getattr(shapely, self.inputs.get("join_predicate", "intersects"))
+        output_directory = self.inputs.get("output_directory", ".")
+
+        results = {}
+        for radius in self.radii:
+            radius_directory = os.path.join(output_directory, _radius_name(radius))
+            os.makedirs(radius_directory, exist_ok=True)
+
+            inputs = dict(self.inputs, radius=radius, output_directory=radius_directory)
+            plan_area = self.shared_dr.execute(
+                ["total_plan_area_geometry"], inputs=inputs, overrides=shared
+            )["total_plan_area_geometry"]
+            overrides = dict(
+                shared,
+                total_plan_area_geometry=plan_area,
+                buildings_intersecting_plan_area=_within_plan_area(
+                    neighbors, shared["building_id"], plan_area, predicate
+                ),
+            )
+            if self.resolutions is not None:
+                results[_radius_name(radius)] = self._fan_out(inputs, overrides)
+            else:
+                results[_radius_name(radius)] = self.dr.execute(
+                    self.outputs, inputs=inputs, overrides=overrides
+                )
+
+        return results
+
     def graph(self, view: bool = True, output_file_path: Union[str, None] = None) -> object:
         """Show the DAG. Return the graph object for the given inputs to execute."""
 
@@ -92,3 +370,234 @@ class Model:
         """List all available parameters."""
 
         return self.dr.list_available_variables()
+
+
+class ExecutionCancelled(Exception):
+    """Raised in the thread running an execution when it is cancelled before its next node."""
+
+
+class Execution:
+    """A run of `Model.execute()` in an executor, started by `Model.aexecute()`. Await it for the results, or
+    iterate over it with `async for` for the node events: dictionaries with the `node`, the `event` ("started" or
+    "finished"), and once finished whether it `succeeded` and the `seconds` it took. The iteration ends with the run.
+
+    :param model:                           Model to run.
+    :type model:                            Model
+
+    :param executor:                        Thread pool to run the DAG in. By default the event loop's executor.
+                                            DEFAULT: None
+    :type executor:                         concurrent.futures.Executor
+
+    """
+
+    def __init__(self, model: Model, executor: Optional[Executor] = None):
+        self._loop = asyncio.get_running_loop()
+        self._events = asyncio.Queue()
+        self._cancelled = threading.Event()
+
+        model._watch_nodes().start(self._emit, self._cancelled)
+        self._future = self._loop.run_in_executor(executor, self._run, model)
+
+    def __await__(self):
+        return self._result().__await__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        event = await self._events.get()
+        if event is None:
+            raise StopAsyncIteration
+
+        return event
+
+    def cancel(self):
+        """Stop the run before its next node. Awaiting the execution then raises `asyncio.CancelledError`."""
+
+        self._cancelled.set()
+
+    async def _result(self):
+        try:
+            return await asyncio.shield(self._future)
+        except asyncio.CancelledError:
+            # the awaiting task was cancelled: stop the run at the next node and wait for the thread to let go
+            self.cancel()
+            try:
+                await asyncio.shield(self._future)
+            except ExecutionCancelled:
+                pass
+            raise
+        except ExecutionCancelled:
+            raise asyncio.CancelledError() from None
+
+    def _run(self, model: Model):
+        try:
+            return model.execute()
+        finally:
+            model._node_events.stop()
+            self._emit(None)
+
+    def _emit(self, event: Optional[dict]):
+        self._loop.call_soon_threadsafe(self._events.put_nowait, event)
+
+
+class _NodeEvents(lifecycle.NodeExecutionHook):
+    """Pass an event to the listener of the current execution as each node starts and finishes, and stop the
+    execution before the next node once it is cancelled. Without an execution it does nothing."""
+
+    def __init__(self):
+        self._listener = None
+        self._cancelled = None
+        self._started = {}
+
+    def start(self, listener, cancelled: threading.Event):
+        if self._listener is not None:
+            raise RuntimeError("The model is already running an execution.")
+        self._listener = listener
+        self._cancelled = cancelled
+
+    def stop(self):
+        self._listener = None
+        self._cancelled = None
+        self._started = {}
+
+    def run_before_node_execution(self, *, node_name: str, **kwargs):
+        if self._listener is None:
+            return
+        if self._cancelled.is_set():
+            raise ExecutionCancelled(f"Cancelled before {node_name}.")
+        self._started[node_name] = time.perf_counter()
+        self._listener({"node": node_name, "event": "started"})
+
+    def run_after_node_execution(self, *, node_name: str, success: bool, **kwargs):
+        if self._listener is None:
+            return
+        self._listener(
+            {
+                "node": node_name,
+                "event": "finished",
+                "succeeded": success,
+                "seconds": time.perf_counter() - self._started.pop(node_name),
+            }
+        )
+
+
+def _tracker_adapters() -> list:
+    """Adapters logging runs to the Hamilton UI, if it is configured through the environment and its SDK is
+    installed."""
+
+    trackers = []
+
+    # use the hosted version (there's a free tier) of the Hamilton UI to log telemetry to.
+    if DAGWORKS_API_KEY and HAMILTON_UI_USERNAME and HAMILTON_UI_PROJECT_ID:
+        try:
+            from dagworks import adapters
+        except ImportError:
+            # dagworks-sdk not installed
+            pass
+        else:
+            trackers.append(  # pragma: no cover
+                adapters.DAGWorksTracker(
+                    project_id=int(HAMILTON_UI_PROJECT_ID),
+                    api_key=DAGWORKS_API_KEY,
+                    username=HAMILTON_UI_USERNAME,
+                    dag_name="naturf-dag",
+                    tags={"env": ENV},
+                )
+            )
+    # use the self-hosted version of the Hamilton UI to log telemetry to.
+    elif HAMILTON_UI_USERNAME and HAMILTON_UI_PROJECT_ID:
+        try:
+            from hamilton_sdk import adapters
+        except ImportError:
+            # hamilton-sdk not installed
+            pass
+        else:
+            trackers.append(  # pragma: no cover
+                adapters.HamiltonTracker(
+                    project_id=int(HAMILTON_UI_PROJECT_ID),
+                    username=HAMILTON_UI_USERNAME,
+                    dag_name="naturf-dag",
+                    tags={"env": ENV},
+                )
+            )
+
+    return trackers
+
+
+def _resolution_name(resolution: Union[float, Sequence[float]]) -> str:
+    """Directory name for the outputs at `resolution`."""
+
+    if isinstance(resolution, (int, float)):
+        return str(resolution)
+
+    return "x".join(str(size) for size in resolution)
+
+
+def _radius_name(radius: float) -> str:
+    """Directory name for the outputs at `radius`."""
+
+    return f"radius_{radius}"
+
+
+def _scenario_heights(height_scenarios: pd.DataFrame, building_id: pd.Series) -> pd.DataFrame:
+    """Heights of every scenario for the buildings kept by `filter_height_range()`, in the same order and capped
+    at Settings.MAX_BUILDING_HEIGHT."""
+
+    heights = height_scenarios.reindex(building_id.to_numpy())
+    heights.index = building_id.index
+
+    if heights.isna().any(axis=None):
+        missing = building_id[heights.isna().any(axis=1)].tolist()
+        raise ValueError(f"The height scenarios have no heights for buildings {missing[:10]}.")
+    if (heights <= 0).any(axis=None):
+        raise ValueError("The height scenarios must only hold positive heights.")
+
+    return heights.astype(np.float64).clip(upper=Settings.MAX_BUILDING_HEIGHT)
+
+
+def _with_heights(
+    buildings_intersecting_plan_area: gpd.GeoDataFrame, building_id: pd.Series, heights: pd.Series
+) -> gpd.GeoDataFrame:
+    """Replace the target and neighbor heights of the spatially joined buildings with the heights of a scenario."""
+
+    building_heights = pd.Series(heights.to_numpy(), index=building_id.to_numpy())
+
+    buildings = buildings_intersecting_plan_area.copy()
+    buildings[Settings.TARGET_HEIGHT_FIELD] = building_heights.reindex(
+        buildings[Settings.TARGET_ID_FIELD].to_numpy()
+    ).to_numpy()
+    buildings[Settings.NEIGHBOR_HEIGHT_FIELD] = building_heights.reindex(buildings.index).to_numpy()
+
+    return buildings
+
+
+def _within_plan_area(
+    buildings_intersecting_plan_area: gpd.GeoDataFrame,
+    building_id: pd.Series,
+    plan_area_geometry: gpd.GeoSeries,
+    predicate,
+) -> gpd.GeoDataFrame:
+    """Keep the spatially joined neighbors that still satisfy `predicate` with the smaller plan areas, and replace the
+    buffered geometries of the join with those plan areas."""
+
+    plan_area = pd.Series(np.asarray(plan_area_geometry), index=building_id.to_numpy())
+    target_plan_area = plan_area.reindex(
+        buildings_intersecting_plan_area[Settings.TARGET_ID_FIELD].to_numpy()
+    ).to_numpy()
+    within = predicate(
+        target_plan_area,
+        np.asarray(buildings_intersecting_plan_area[Settings.NEIGHBOR_GEOMETRY_FIELD]),
+    )
+
+    buildings = buildings_intersecting_plan_area.loc[within].copy()
+    buildings[Settings.TARGET_BUFFERED_FIELD] = gpd.GeoSeries(
+        target_plan_area[within], index=buildings.index, crs=plan_area_geometry.crs
+    )
+    buildings[Settings.NEIGHBOR_BUFFERED_FIELD] = gpd.GeoSeries(
+        plan_area.reindex(buildings.index).to_numpy(),
+        index=buildings.index,
+        crs=plan_area_geometry.crs,
+    )
+
+    return buildings
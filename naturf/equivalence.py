@@ -0,0 +1,335 @@
+from graphlib import TopologicalSorter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+import xarray as xr
+
+from .config import Settings
+from .driver import Model
+
+
+# (rtol, atol) used to compare node outputs that have no entry in NODE_TOLERANCES
+DEFAULT_TOLERANCE = (1e-9, 1e-9)
+
+# (rtol, atol) of nodes whose outputs are rounded: the stacked rasters are float32 and the binary holds integers
+# truncated from them, so a value on a rounding boundary can move by one scaled unit
+NODE_TOLERANCES = {
+    "raster_to_numpy": (1e-6, 1e-6),
+    "numpy_to_binary": (0, 1),
+}
+
+# nodes computed by `compare_engines()` by default, which cover every node of the non-streaming DAG
+DEFAULT_COMPARED_NODES = ["numpy_to_binary", "output_bounds"]
+
+
+def synthetic_city(
+    blocks: int = 10,
+    buildings_per_block: int = 4,
+    seed: int = 0,
+    origin: Tuple[float, float] = (1617000.0, 1922000.0),
+    crs: str = "EPSG:5070",
+) -> gpd.GeoDataFrame:
+    """Generate a city of `blocks` by `blocks` square blocks separated by streets, each holding a grid of rotated
+    rectangular buildings of random size and height. Some buildings are split into two parts to exercise multipart
+    geometries. The columns match those read from the input shapefile by `input_shapefile_df()`.
+
+    :param blocks:                          Number of blocks along each side of the city.
+                                            DEFAULT: 10
+    :type blocks:                           int
+
+    :param buildings_per_block:             Number of buildings along each side of a block.
+                                            DEFAULT: 4
+    :type buildings_per_block:              int
+
+    :param seed:                            Seed of the random number generator.
+                                            DEFAULT: 0
+    :type seed:                             int
+
+    :param origin:                          (x, y) of the south-west corner of the city in units of `crs`.
+                                            DEFAULT: (1617000.0, 1922000.0)
+    :type origin:                           tuple
+
+    :param crs:                             Projected coordinate reference system of the city in meters.
+                                            DEFAULT: "EPSG:5070"
+    :type crs:                              str
+
+    :return:                                GeoDataFrame of buildings with an ID, a height, and a geometry.
+    """
+
+    rng = np.random.default_rng(seed)
+    block_size = 100.0
+    lot_size = block_size / buildings_per_block
+    count = (blocks * buildings_per_block) ** 2
+
+    # center of each lot, laid out block by block with a street between blocks
+    lots = np.arange(blocks * buildings_per_block)
+    lot_offset = lots * lot_size + lots // buildings_per_block * Settings.DEFAULT_STREET_WIDTH
+    x, y = np.meshgrid(origin[0] + lot_offset, origin[1] + lot_offset)
+    x = x.ravel() + lot_size / 2
+    y = y.ravel() + lot_size / 2
+
+    width = rng.uniform(0.3, 0.8, count) * lot_size
+    depth = rng.uniform(0.3, 0.8, count) * lot_size
+    angle = rng.uniform(-np.pi / 4, np.pi / 4, count)
+    height = rng.uniform(3, Settings.MAX_BUILDING_HEIGHT, count).round(1)
+
+    geometry = _rectangles(x, y, width, depth, angle, -0.5, 0.5)
+
+    # Split every tenth building along its width into a two part building.
+    split = np.flatnonzero(np.arange(count) % 10 == 0)
+    parts = np.stack(
+        [
+            _rectangles(x[split], y[split], width[split], depth[split], angle[split], -0.5, -0.05),
+            _rectangles(x[split], y[split], width[split], depth[split], angle[split], 0.05, 0.5),
+        ],
+        axis=1,
+    )
+    geometry[split] = shapely.multipolygons(
+        parts.ravel(), indices=np.repeat(np.arange(len(split)), 2)
+    )
+
+    return gpd.GeoDataFrame(
+        {
+            Settings.DATA_ID_FIELD_NAME: np.arange(1, count + 1),
+            Settings.DATA_HEIGHT_FIELD_NAME: height,
+            Settings.DATA_GEOMETRY_FIELD_NAME: geometry,
+        },
+        geometry=Settings.DATA_GEOMETRY_FIELD_NAME,
+        crs=crs,
+    )
+
+
+def run_nodes(
+    inputs: dict,
+    final_vars: Sequence[str] = DEFAULT_COMPARED_NODES,
+    overrides: Optional[dict] = None,
+    **kwargs,
+) -> Dict[str, object]:
+    """Execute the DAG and return the output of every node upstream of `final_vars`, in topological order.
+
+    :param inputs:                          Inputs of the DAG.
+    :type inputs:                           dict
+
+    :param final_vars:                      Nodes whose upstream nodes are computed.
+                                            DEFAULT: DEFAULT_COMPARED_NODES
+    :type final_vars:                       list
+
+    :param overrides:                       Node outputs supplied instead of being computed, such as an
+                                            `input_shapefile_df` from `synthetic_city()`. DataFrames are copied so
+                                            that runs do not share state.
+                                            DEFAULT: None
+    :type overrides:                        dict
+
+    :param kwargs:                          Configuration of the model, such as `engine` or `precision`.
+
+    :return:                                Dictionary of node outputs.
+    """
+
+    dr = Model(inputs, list(final_vars), **{**kwargs, "headless": True}).dr
+
+    overrides = {
+        name: value.copy() if isinstance(value, pd.DataFrame) else value
+        for name, value in (overrides or {}).items()
+    }
+    graph = {
+        node.name: node.required_dependencies | node.optional_dependencies
+        for node in dr.what_is_upstream_of(*final_vars)
+        if not node.is_external_input and node.name not in overrides
+    }
+    order = [name for name in TopologicalSorter(graph).static_order() if name in graph]
+
+    return dict(zip(order, map(dr.execute(order, inputs=inputs, overrides=overrides).get, order)))
+
+
+def compare_engines(
+    inputs: dict,
+    reference: Optional[dict] = None,
+    candidate: Optional[dict] = None,
+    final_vars: Sequence[str] = DEFAULT_COMPARED_NODES,
+    overrides: Optional[dict] = None,
+    tolerances: Optional[Dict[str, Tuple[float, float]]] = None,
+) -> pd.DataFrame:
+    """Run the DAG under two model configurations and compare the output of every node. Series, DataFrames,
+    rasters, arrays, and binaries are compared element by element and geometries by their Hausdorff distance.
+
+    :param inputs:                          Inputs of the DAG.
+    :type inputs:                           dict
+
+    :param reference:                       Model configuration of the reference run.
+                                            DEFAULT: {"engine": "reference"}
+    :type reference:                        dict
+
+    :param candidate:                       Model configuration of the run compared against the reference.
+                                            DEFAULT: {"engine": "fast"}
+    :type candidate:                        dict
+
+    :param final_vars:                      Nodes whose upstream nodes are compared.
+                                            DEFAULT: DEFAULT_COMPARED_NODES
+    :type final_vars:                       list
+
+    :param overrides:                       Node outputs supplied to both runs instead of being computed.
+                                            DEFAULT: None
+    :type overrides:                        dict
+
+    :param tolerances:                      (rtol, atol) by node, updating NODE_TOLERANCES.
+                                            DEFAULT: None
+    :type tolerances:                       dict
+
+    :return:                                Pandas DataFrame indexed by node in topological order with the maximum
+                                            absolute difference, the tolerances, and whether the outputs are
+                                            equivalent.
+    """
+
+    expected = run_nodes(inputs, final_vars, overrides, **(reference or {"engine": "reference"}))
+    actual = run_nodes(inputs, final_vars, overrides, **(candidate or {"engine": "fast"}))
+    tolerances = {**NODE_TOLERANCES, **(tolerances or {})}
+
+    rows = []
+    for node, value in expected.items():
+        rtol, atol = tolerances.get(node, DEFAULT_TOLERANCE)
+        max_abs_diff, equivalent = _compare(value, actual[node], rtol, atol)
+        rows.append((node, max_abs_diff, rtol, atol, equivalent))
+
+    return pd.DataFrame(
+        rows, columns=["node", "max_abs_diff", "rtol", "atol", "equivalent"]
+    ).set_index("node")
+
+
+def first_divergent_node(report: pd.DataFrame) -> Optional[str]:
+    """Return the first node of a `compare_engines()` report whose outputs are not equivalent, or None. Since nodes
+    are in topological order, the differences of every later node may be caused by this one.
+
+    :param report:                          Report returned by `compare_engines()`.
+    :type report:                           pd.DataFrame
+
+    :return:                                Name of the node or None.
+    """
+
+    divergent = report.index[~report["equivalent"]]
+
+    return divergent[0] if len(divergent) else None
+
+
+def _rectangles(
+    x: np.ndarray,
+    y: np.ndarray,
+    width: np.ndarray,
+    depth: np.ndarray,
+    angle: np.ndarray,
+    left: float,
+    right: float,
+) -> np.ndarray:
+    """Rectangles centered on (x, y) and rotated by `angle`, spanning `left` to `right` of their width."""
+
+    corners = np.array([[left, -0.5], [right, -0.5], [right, 0.5], [left, 0.5], [left, -0.5]])
+    local_x = corners[:, 0] * width[:, np.newaxis]
+    local_y = corners[:, 1] * depth[:, np.newaxis]
+    cos, sin = np.cos(angle)[:, np.newaxis], np.sin(angle)[:, np.newaxis]
+
+    return shapely.polygons(
+        np.stack(
+            [
+                x[:, np.newaxis] + local_x * cos - local_y * sin,
+                y[:, np.newaxis] + local_x * sin + local_y * cos,
+            ],
+            axis=-1,
+        )
+    )
+
+
+def _compare(expected, actual, rtol: float, atol: float) -> Tuple[float, bool]:
+    """Return the maximum absolute difference between two node outputs and whether they are within tolerance."""
+
+    if isinstance(expected, xr.Dataset):
+        if not isinstance(actual, xr.Dataset) or list(expected.variables) != list(actual.variables):
+            return np.inf, False
+        return _combine(
+            _compare(expected[name].to_numpy(), actual[name].to_numpy(), rtol, atol)
+            for name in expected.variables
+        )
+
+    if isinstance(expected, (pd.Series, pd.DataFrame)):
+        if type(expected) is not type(actual) or not expected.index.equals(actual.index):
+            return np.inf, False
+        if isinstance(expected, pd.Series):
+            return _compare(expected.to_numpy(), actual.to_numpy(), rtol, atol)
+        if list(expected.columns) != list(actual.columns):
+            return np.inf, False
+        return _combine(
+            _compare(expected[column].to_numpy(), actual[column].to_numpy(), rtol, atol)
+            for column in expected.columns
+        )
+
+    if isinstance(expected, bytes):
+        if not isinstance(actual, bytes) or len(expected) != len(actual):
+            return np.inf, False
+        if len(expected) % 4:
+            return (0.0, True) if expected == actual else (np.inf, False)
+        return _compare(np.frombuffer(expected, ">i4"), np.frombuffer(actual, ">i4"), rtol, atol)
+
+    if isinstance(expected, np.ndarray) or isinstance(actual, np.ndarray):
+        expected, actual = np.asarray(expected), np.asarray(actual)
+        if expected.shape != actual.shape:
+            return np.inf, False
+        if expected.dtype.kind in "biuf" and actual.dtype.kind in "biuf":
+            return _compare_numbers(expected, actual, rtol, atol)
+        if expected.dtype.kind == "O" or actual.dtype.kind == "O":
+            return _combine(_compare_objects(expected.ravel(), actual.ravel(), rtol, atol))
+        return (0.0, True) if np.array_equal(expected, actual) else (np.inf, False)
+
+    if isinstance(expected, (list, tuple)):
+        return _compare(np.asarray(expected), np.asarray(actual), rtol, atol)
+
+    return (0.0, True) if expected == actual else (np.inf, False)
+
+
+def _compare_numbers(
+    expected: np.ndarray, actual: np.ndarray, rtol: float, atol: float
+) -> Tuple[float, bool]:
+    """Compare numeric arrays, treating NaNs in the same place as equal."""
+
+    expected = expected.astype(np.float64)
+    actual = actual.astype(np.float64)
+    both_nan = np.isnan(expected) & np.isnan(actual)
+    abs_diff = np.where(both_nan, 0, np.abs(expected - actual))
+    max_abs_diff = float(abs_diff.max()) if abs_diff.size else 0.0
+
+    return max_abs_diff, bool(np.isclose(expected, actual, rtol, atol, equal_nan=True).all())
+
+
+def _compare_objects(expected: np.ndarray, actual: np.ndarray, rtol: float, atol: float) -> List:
+    """Compare object arrays holding geometries, per-building lists, or other values."""
+
+    geometry = shapely.is_geometry(expected) | shapely.is_missing(expected)
+    if geometry.all() and (shapely.is_geometry(actual) | shapely.is_missing(actual)).all():
+        missing = shapely.is_missing(expected)
+        if (missing != shapely.is_missing(actual)).any():
+            return [(np.inf, False)]
+        expected, actual = expected[~missing], actual[~missing]
+        differs = ~shapely.equals_exact(expected, actual, tolerance=0)
+        distance = shapely.hausdorff_distance(expected[differs], actual[differs])
+        max_abs_diff = float(np.nanmax(distance, initial=0.0))
+        return [(max_abs_diff, bool(np.all(distance <= atol)))]
+
+    return [
+        (
+            _compare(np.asarray(value), np.asarray(actual_value), rtol, atol)
+            if isinstance(value, (list, np.ndarray))
+            else ((0.0, True) if value == actual_value else (np.inf, False))
+        )
+        for value, actual_value in zip(expected, actual)
+    ]
+
+
+def _combine(results) -> Tuple[float, bool]:
+    """Combine the comparisons of the parts of an output."""
+
+    max_abs_diff, equivalent = 0.0, True
+    for part_max_abs_diff, part_equivalent in results:
+        max_abs_diff = max(max_abs_diff, part_max_abs_diff)
+        equivalent = equivalent and part_equivalent
+
+    return max_abs_diff, equivalent
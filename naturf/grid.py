@@ -0,0 +1,253 @@
+import re
+from typing import Tuple, Union
+
+import numpy as np
+import rioxarray  # noqa: F401
+import xarray as xr
+from affine import Affine
+from pyproj import Transformer
+from pyproj.crs import CRS
+
+
+# radius of the sphere WRF uses for its map projections
+WRF_EARTH_RADIUS = 6370000
+
+# WRF `map_proj` names and the proj string template of the matching projection
+WRF_MAP_PROJECTIONS = {
+    "lambert": "+proj=lcc +lat_1={truelat1} +lat_2={truelat2} +lat_0={ref_lat} +lon_0={stand_lon}",
+    "mercator": "+proj=merc +lat_ts={truelat1} +lon_0={stand_lon}",
+    "polar": "+proj=stere +lat_0={pole} +lat_ts={truelat1} +lon_0={stand_lon}",
+    "lat-lon": "+proj=longlat",
+}
+
+
+class Grid:
+    """Regular output grid that building parameters are rasterized onto, such as the mass grid of a WRF domain.
+    Rows run from south to north and columns from west to east, following the WRF geogrid convention.
+
+    :param crs:                         Coordinate reference system of the grid.
+    :type crs:                          CRS, str
+
+    :param origin:                      (x, y) coordinates of the south-west corner of the grid.
+    :type origin:                       tuple
+
+    :param resolution:                  (dx, dy) size of a grid cell in units of the CRS.
+    :type resolution:                   tuple
+
+    :param shape:                       (rows, cols) number of grid cells.
+    :type shape:                        tuple
+
+    """
+
+    def __init__(
+        self,
+        crs: Union[CRS, str],
+        origin: Tuple[float, float],
+        resolution: Tuple[float, float],
+        shape: Tuple[int, int],
+    ):
+        self.crs = CRS.from_user_input(crs)
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.resolution = (float(resolution[0]), float(resolution[1]))
+        self.shape = (int(shape[0]), int(shape[1]))
+
+    def __repr__(self) -> str:
+        return (
+            f"Grid(crs={self.crs.to_string()!r}, origin={self.origin}, "
+            f"resolution={self.resolution}, shape={self.shape})"
+        )
+
+    @property
+    def transform(self) -> Affine:
+        """Affine transform from (col, row) to (x, y) at the south-west corner of each cell."""
+
+        return Affine.translation(*self.origin) * Affine.scale(*self.resolution)
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """(minx, miny, maxx, maxy) of the grid."""
+
+        rows, cols = self.shape
+
+        return (
+            self.origin[0],
+            self.origin[1],
+            self.origin[0] + cols * self.resolution[0],
+            self.origin[1] + rows * self.resolution[1],
+        )
+
+    def cell_centers(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the x coordinates of the column centers and the y coordinates of the row centers."""
+
+        rows, cols = self.shape
+        x = self.origin[0] + (np.arange(cols) + 0.5) * self.resolution[0]
+        y = self.origin[1] + (np.arange(rows) + 0.5) * self.resolution[1]
+
+        return x, y
+
+    def template(self) -> xr.DataArray:
+        """Return an empty raster on the grid that can be passed as `like` to `geocube.api.core.make_geocube()`."""
+
+        x, y = self.cell_centers()
+        template = xr.DataArray(
+            np.zeros(self.shape, dtype=np.float32), coords={"y": y, "x": x}, dims=("y", "x")
+        )
+
+        return template.rio.write_crs(self.crs).rio.write_transform(self.transform)
+
+    def index_projection(self) -> dict:
+        """Return the geogrid index file entries that describe the projection of the grid.
+
+        :return:                        Dictionary of index file keys and values.
+        """
+
+        if self.crs.is_geographic:
+            return {"projection": "regular_ll"}
+
+        cf = self.crs.to_cf()
+        grid_mapping = cf.get("grid_mapping_name")
+
+        if grid_mapping == "lambert_conformal_conic":
+            truelat1, truelat2 = np.broadcast_to(cf["standard_parallel"], 2)
+            return {
+                "projection": "lambert",
+                "truelat1": float(truelat1),
+                "truelat2": float(truelat2),
+                "stdlon": cf["longitude_of_central_meridian"],
+            }
+        if grid_mapping == "mercator":
+            return {"projection": "mercator", "truelat1": cf["standard_parallel"]}
+        if grid_mapping == "polar_stereographic":
+            return {
+                "projection": "polar",
+                "truelat1": cf["standard_parallel"],
+                "stdlon": cf["straight_vertical_longitude_from_pole"],
+            }
+        if grid_mapping == "albers_conical_equal_area":
+            truelat1, truelat2 = np.broadcast_to(cf["standard_parallel"], 2)
+            return {
+                "projection": "albers_nad83",
+                "truelat1": float(truelat1),
+                "truelat2": float(truelat2),
+                "stdlon": cf["longitude_of_central_meridian"],
+            }
+
+        raise ValueError(f"The grid projection '{grid_mapping}' is not supported by geogrid.")
+
+    def known_point(self) -> Tuple[float, float]:
+        """Return the (latitude, longitude) of the center of the south-west cell, which is the (1, 1) point of the
+        geogrid index file.
+        """
+
+        x, y = self.cell_centers()
+        transformer = Transformer.from_crs(self.crs, self.crs.geodetic_crs, always_xy=True)
+        lon, lat = transformer.transform(x[0], y[0])
+
+        return float(lat), float(lon)
+
+    @classmethod
+    def from_namelist(cls, namelist_wps: str, domain: int = 1) -> "Grid":
+        """Create the mass grid of a WRF domain from the `&geogrid` section of a WPS namelist.
+
+        :param namelist_wps:            Full path with file name to the `namelist.wps` file.
+        :type namelist_wps:             str
+
+        :param domain:                  Number of the domain, starting from 1 for the outermost domain.
+                                        DEFAULT: 1
+        :type domain:                   int
+
+        :return:                        Grid
+        """
+
+        with open(namelist_wps) as namelist:
+            geogrid = _read_namelist_group(namelist.read(), "geogrid")
+
+        return _domain_grid(geogrid, domain)
+
+
+def _read_namelist_group(text: str, group: str) -> dict:
+    """Parse one group of a Fortran namelist into a dictionary of lists of values."""
+
+    text = re.sub(r"!.*", "", text)
+    match = re.search(
+        rf"&{group}\b(.*?)^\s*/", text, flags=re.DOTALL | re.IGNORECASE | re.MULTILINE
+    )
+    if match is None:
+        raise ValueError(f"The namelist has no '&{group}' group.")
+
+    values = {}
+    for key, value in re.findall(r"(\w+)\s*=\s*(.*?)(?=\s*\w+\s*=|\Z)", match.group(1), re.DOTALL):
+        items = [item.strip().strip("'\"") for item in value.split(",") if item.strip()]
+        values[key.lower()] = [_namelist_value(item) for item in items]
+
+    return values
+
+
+def _namelist_value(item: str) -> Union[int, float, str]:
+    """Convert a namelist value to an int or float when possible."""
+
+    for kind in (int, float):
+        try:
+            return kind(item.replace("d", "e").replace("D", "e"))
+        except ValueError:
+            pass
+
+    return item
+
+
+def _domain_grid(geogrid: dict, domain: int) -> Grid:
+    """Build the grid of `domain` from the parsed `&geogrid` group, placing nests inside their parents."""
+
+    def value(key, index=0, default=None):
+        values = geogrid.get(key)
+        if not values:
+            if default is None:
+                raise ValueError(f"The namelist is missing '{key}'.")
+            return default
+        return values[min(index, len(values) - 1)]
+
+    index = domain - 1
+    rows = int(value("e_sn", index)) - 1
+    cols = int(value("e_we", index)) - 1
+
+    if domain > 1:
+        parent = int(value("parent_id", index))
+        ratio = int(value("parent_grid_ratio", index))
+        parent_grid = _domain_grid(geogrid, parent)
+        dx, dy = parent_grid.resolution
+        origin = (
+            parent_grid.origin[0] + (int(value("i_parent_start", index)) - 1) * dx,
+            parent_grid.origin[1] + (int(value("j_parent_start", index)) - 1) * dy,
+        )
+        return Grid(parent_grid.crs, origin, (dx / ratio, dy / ratio), (rows, cols))
+
+    map_proj = str(value("map_proj")).lower()
+    if map_proj not in WRF_MAP_PROJECTIONS:
+        raise ValueError(f"The WRF map projection '{map_proj}' is not supported.")
+    if map_proj == "lat-lon" and float(value("pole_lat", default=90.0)) != 90.0:
+        raise ValueError("Rotated lat-lon WRF domains are not supported.")
+
+    ref_lat = float(value("ref_lat"))
+    ref_lon = float(value("ref_lon"))
+    truelat1 = float(value("truelat1", default=ref_lat))
+    parameters = {
+        "ref_lat": ref_lat,
+        "truelat1": truelat1,
+        "truelat2": float(value("truelat2", default=truelat1)),
+        "stand_lon": float(value("stand_lon", default=ref_lon)),
+        "pole": 90 if truelat1 >= 0 else -90,
+    }
+    crs = CRS.from_proj4(
+        WRF_MAP_PROJECTIONS[map_proj].format(**parameters)
+        + f" +a={WRF_EARTH_RADIUS} +b={WRF_EARTH_RADIUS} +no_defs"
+    )
+
+    dx = float(value("dx"))
+    dy = float(value("dy"))
+
+    # The reference point is the center of the domain unless ref_x/ref_y place it on a given mass point.
+    ref_x = float(value("ref_x", default=cols / 2 + 0.5)) - 0.5
+    ref_y = float(value("ref_y", default=rows / 2 + 0.5)) - 0.5
+    x, y = Transformer.from_crs(crs.geodetic_crs, crs, always_xy=True).transform(ref_lon, ref_lat)
+
+    return Grid(crs, (x - ref_x * dx, y - ref_y * dy), (dx, dy), (rows, cols))
@@ -1,9 +1,13 @@
 import geopandas as gpd
+import hashlib
 import math
+import os
 import numpy as np
 import pandas as pd
+import shapely
 from pyproj.crs import CRS
-from hamilton.function_modifiers import extract_columns
+from typing import Optional
+from hamilton.function_modifiers import config, extract_columns
 
 from .config import Settings
 
@@ -65,6 +69,7 @@ def average_distance_between_buildings(distance_between_buildings: pd.Series) ->
     return df[Settings.AVERAGE_DISTANCE_BETWEEN_BUILDINGS]
 
 
+@config.when_not(feature_store=True)
 def building_area(building_geometry: pd.Series) -> pd.Series:
     """Calculate the area of the building geometry.
 
@@ -78,6 +83,101 @@ def building_area(building_geometry: pd.Series) -> pd.Series:
     return building_geometry.area
 
 
+@config.when(feature_store=True)
+def building_area__stored(building_features: pd.DataFrame) -> pd.Series:
+    """Area of the building geometry, taken from the feature store.
+
+    :param building_features:                       Static features of each building.
+    :type building_features:                        pd.DataFrame
+
+    :return:                                        pd.Series
+
+    """
+
+    return building_features[Settings.AREA_FIELD].rename(None)
+
+
+@config.when(feature_store=True)
+def building_features(
+    original_building_id: pd.Series,
+    building_geometry: pd.Series,
+    input_shapefile: Optional[str] = None,
+    feature_store_directory: Optional[str] = None,
+) -> pd.DataFrame:
+    """Static features of each building that only depend on its footprint: area, centroid, wall length in each
+    cardinal direction, vertex count, and bounds. They are kept in a `.features.parquet` store keyed by the ID of
+    the building in the input shapefile and a hash of its geometry. A run loads the stored features of the
+    buildings whose geometry is unchanged, reading only the columns used by the DAG, and computes the features of
+    new or changed buildings, after which the store is rewritten with the buildings of the run. Requires the
+    optional `pyarrow` package.
+
+    :param original_building_id:                    ID of each building in the input shapefile.
+    :type original_building_id:                     pd.Series
+
+    :param building_geometry:                       Geometry field for the buildings.
+    :type building_geometry:                        pd.Series
+
+    :param input_shapefile:                         Full path with file name and extension to the input shapefile,
+                                                    next to which the store is saved.
+                                                    DEFAULT: None
+    :type input_shapefile:                          str
+
+    :param feature_store_directory:                 Directory the store is saved to instead. By default the
+                                                    directory of the input shapefile, or the working directory.
+                                                    DEFAULT: None
+    :type feature_store_directory:                  str
+
+    :return:                                        Pandas DataFrame of the area and wall lengths of each building.
+
+    """
+
+    columns = [Settings.AREA_FIELD, *Settings.WALL_LENGTH_FIELDS]
+    filename = _cache_filename(input_shapefile, feature_store_directory, "features.parquet")
+    key = [Settings.ORIGINAL_ID_FIELD, Settings.GEOMETRY_HASH_FIELD]
+
+    ids = original_building_id.to_numpy()
+    geometry_hash = _geometry_hash(building_geometry)
+
+    position = np.full(len(ids), -1)
+    if os.path.exists(filename):
+        # IDs can repeat in the input, so buildings are matched on their ID and geometry hash together, and rows
+        # repeating a key hold the same features since they have the same geometry
+        stored = pd.MultiIndex.from_frame(pd.read_parquet(filename, columns=key))
+        first = np.flatnonzero(~stored.duplicated())
+        position = stored[first].get_indexer(pd.MultiIndex.from_arrays([ids, geometry_hash]))
+        position = np.where(position < 0, -1, first[position])
+
+    changed = position < 0
+    if not changed.any():
+        features = pd.read_parquet(filename, columns=columns).iloc[position]
+        return features.set_index(building_geometry.index)
+
+    features = pd.DataFrame(
+        index=building_geometry.index, columns=Settings.BUILDING_FEATURE_FIELDS, dtype=np.float64
+    )
+    if not changed.all():
+        stored = pd.read_parquet(filename, columns=Settings.BUILDING_FEATURE_FIELDS)
+        features.loc[~changed] = stored.iloc[position[~changed]].to_numpy(dtype=np.float64)
+    features.loc[changed] = _geometry_features(building_geometry.loc[changed]).to_numpy()
+    features = features.astype({Settings.VERTEX_COUNT_FIELD: np.int64})
+
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    pd.concat(
+        [
+            pd.DataFrame(
+                {Settings.ORIGINAL_ID_FIELD: ids, Settings.GEOMETRY_HASH_FIELD: geometry_hash},
+                index=building_geometry.index,
+            ),
+            features,
+        ],
+        axis=1,
+    ).to_parquet(temporary, index=False)
+    os.replace(temporary, filename)
+
+    return features[columns]
+
+
+@config.when_not(neighbor_cache=True)
 def buildings_intersecting_plan_area(
     building_id: pd.Series,
     building_height: pd.Series,
@@ -132,23 +232,16 @@ def buildings_intersecting_plan_area(
 
     """
 
-    df = pd.DataFrame(
-        {
-            Settings.ID_FIELD: building_id,
-            Settings.HEIGHT_FIELD: building_height,
-            Settings.AREA_FIELD: building_area,
-            Settings.GEOMETRY_FIELD: building_geometry,
-            Settings.BUFFERED_FIELD: total_plan_area_geometry,
-            Settings.WALL_LENGTH_NORTH: wall_length[Settings.WALL_LENGTH_NORTH],
-            Settings.WALL_LENGTH_EAST: wall_length[Settings.WALL_LENGTH_EAST],
-            Settings.WALL_LENGTH_SOUTH: wall_length[Settings.WALL_LENGTH_SOUTH],
-            Settings.WALL_LENGTH_WEST: wall_length[Settings.WALL_LENGTH_WEST],
-        }
-    )
-
     # Create left and right GeoDataFrames.
-    left_gdf = gpd.GeoDataFrame(df, geometry=Settings.BUFFERED_FIELD, crs=target_crs)
-    right_gdf = gpd.GeoDataFrame(df, geometry=Settings.GEOMETRY_FIELD, crs=target_crs)
+    left_gdf, right_gdf = _join_frames(
+        building_id,
+        building_height,
+        building_geometry,
+        building_area,
+        total_plan_area_geometry,
+        wall_length,
+        target_crs,
+    )
 
     # Spatially join the building areas to the target buffered areas.
     xdf = gpd.sjoin(
@@ -160,20 +253,169 @@ def buildings_intersecting_plan_area(
         rsuffix=join_rsuffix,
     )
 
-    # Add the neighbor building geometry.
-    xdf = (
-        xdf.set_index(f"{Settings.ID_FIELD}_{join_rsuffix}")
-        .join(
-            right_gdf.set_index(Settings.ID_FIELD)[Settings.GEOMETRY_FIELD].rename(
-                Settings.NEIGHBOR_GEOMETRY_FIELD
-            )
-        )
-        .sort_index()
+    return _with_neighbor_geometry(xdf, right_gdf, join_rsuffix)
+
+
+@config.when(neighbor_cache=True)
+def buildings_intersecting_plan_area__cached(
+    building_id: pd.Series,
+    building_height: pd.Series,
+    building_geometry: pd.Series,
+    building_area: pd.Series,
+    total_plan_area_geometry: pd.Series,
+    wall_length: pd.DataFrame,
+    target_crs: CRS,
+    radius: int = Settings.RADIUS,
+    cap_style: int = Settings.CAP_STYLE,
+    input_shapefile: Optional[str] = None,
+    neighbor_cache_directory: Optional[str] = None,
+    join_type: str = "left",
+    join_predicate: str = "intersects",
+    join_lsuffix: str = Settings.TARGET,
+    join_rsuffix: str = Settings.NEIGHBOR,
+) -> gpd.GeoDataFrame:
+    """Conduct the spatial join of `buildings_intersecting_plan_area()`, reusing the neighbor pairs of an earlier
+    run when the buildings have not changed. The pairs are saved to a single `.npz` sidecar per input together with
+    a fingerprint of the building IDs, footprints, and plan areas, the radius, the cap style, and the join, so a
+    rerun with the same buildings at another output resolution or with other heights skips the neighbor search. A
+    sidecar with another fingerprint is replaced. The joined attributes are always taken from the current run.
+
+    :param building_id:                         Building ID field.
+    :type building_id:                          pd.Series
+
+    :param building_height:                     Building height field.
+    :type building_height:                      pd.Series
+
+    :param building_geometry:                   Geometry field for the buildings.
+    :type building_geometry:                    pd.Series
+
+    :param building_area:                       Building area field.
+    :type building_area:                        pd.Series
+
+    :param total_plan_area_geometry:            Geometry of the buffered building.
+    :type total_plan_area_geometry:             pd.Series
+
+    :param target_crs:                          Coordinate reference system field of the parent geometry.
+    :type target_crs:                           pd.Series
+
+    :param radius:                              Radius of the plan area, recorded in the sidecar.
+                                                DEFAULT: 100
+    :type radius:                               int
+
+    :param cap_style:                           Cap style of the plan area, recorded in the sidecar.
+                                                DEFAULT: 3
+    :type cap_style:                            int
+
+    :param input_shapefile:                     Full path with file name and extension to the input shapefile, next
+                                                to which the sidecar is saved.
+                                                DEFAULT: None
+    :type input_shapefile:                      str
+
+    :param neighbor_cache_directory:            Directory the sidecar is saved to instead, for example when the
+                                                input is read-only or passed as `input_shapefile_df`. By default the
+                                                directory of the input shapefile, or the working directory.
+                                                DEFAULT: None
+    :type neighbor_cache_directory:             str
+
+    :param join_type:                           Type of join desired. Only "left" and "inner" joins are cached.
+                                                DEFAULT: `left`
+    :type join_type:                            str
+
+    :param join_predicate:                      Selected topology of join.
+                                                DEFAULT: `intersects`
+    :type join_predicate:                       str
+
+    :param join_lsuffix:                        Suffix of the left object in the join.
+                                                DEFAULT: `target`
+    :type join_lsuffix:                         str
+
+    :param join_rsuffix:                        Suffix of the right object in the join.
+                                                DEFAULT: `neighbor`
+    :type join_rsuffix:                         str
+
+    :return:                                    GeoDataFrame of building areas that intersect the buffered target
+                                                buildings and their attributes.
+
+    """
+
+    left_gdf, right_gdf = _join_frames(
+        building_id,
+        building_height,
+        building_geometry,
+        building_area,
+        total_plan_area_geometry,
+        wall_length,
+        target_crs,
     )
 
-    return gpd.GeoDataFrame(xdf).set_geometry(Settings.GEOMETRY_FIELD)
+    fingerprint = hashlib.sha256()
+    fingerprint.update(repr((radius, cap_style, join_type, join_predicate)).encode())
+    fingerprint.update(np.ascontiguousarray(building_id.to_numpy()).tobytes())
+    for geometry in (building_geometry, total_plan_area_geometry):
+        fingerprint.update(b"".join(shapely.to_wkb(np.asarray(geometry))))
+    fingerprint = fingerprint.hexdigest()
+
+    filename = _cache_filename(input_shapefile, neighbor_cache_directory, "neighbors.npz")
+
+    if join_type in ("left", "inner") and os.path.exists(filename):
+        with np.load(filename) as pairs:
+            if str(pairs["fingerprint"]) == fingerprint:
+                xdf = _join_pairs(
+                    left_gdf,
+                    right_gdf,
+                    pairs["target"],
+                    pairs["neighbor"],
+                    join_lsuffix,
+                    join_rsuffix,
+                )
+                return _with_neighbor_geometry(xdf, right_gdf, join_rsuffix)
+
+    xdf = gpd.sjoin(
+        left_df=left_gdf,
+        right_df=right_gdf,
+        how=join_type,
+        predicate=join_predicate,
+        lsuffix=join_lsuffix,
+        rsuffix=join_rsuffix,
+    )
+
+    if join_type in ("left", "inner"):
+        # the positions of the targets and neighbors, with -1 for targets without neighbors in a left join
+        target = left_gdf.index.get_indexer(xdf.index)
+        neighbor = right_gdf.index.get_indexer(xdf[f"index_{join_rsuffix}"])
+        dtype = np.int32 if len(left_gdf) < np.iinfo(np.int32).max else np.int64
+        temporary = f"{filename}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as sidecar:
+            np.savez(
+                sidecar,
+                target=target.astype(dtype),
+                neighbor=neighbor.astype(dtype),
+                radius=radius,
+                cap_style=cap_style,
+                fingerprint=fingerprint,
+            )
+        os.replace(temporary, filename)
+
+    return _with_neighbor_geometry(xdf, right_gdf, join_rsuffix)
+
+
+def building_parts(building_geometry: pd.Series) -> gpd.GeoSeries:
+    """Explode multipart building geometries into their single polygon parts. Each part keeps the index of the
+    building it belongs to so that per-part results can be aggregated back to the original building.
+
+    :param building_geometry:                       Geometry field for the buildings.
+    :type building_geometry:                        pd.Series
+
+    :return:                                        GeoSeries of single polygons indexed by their parent building.
+
+    """
+
+    parts, building_index = shapely.get_parts(np.asarray(building_geometry), return_index=True)
+
+    return gpd.GeoSeries(parts, index=building_geometry.index[building_index])
 
 
+@config.when_not(engine="fast")
 def building_plan_area(
     buildings_intersecting_plan_area: gpd.GeoDataFrame,
     join_predicate: str = "intersection",
@@ -230,6 +472,38 @@ def building_plan_area(
     return pd.Series(building_plan_area)
 
 
+@config.when(engine="fast")
+def building_plan_area__fast(buildings_intersecting_plan_area: gpd.GeoDataFrame) -> pd.Series:
+    """Calculate the building plan area as in `building_plan_area()`. Neighbors that lie entirely within the target
+    plan area contribute their own area, so the overlay is only computed for neighbors crossing its boundary.
+
+    :param buildings_intersecting_plan_area:    Geometry field for the neighboring buildings from the spatially
+                                                joined data.
+    :type buildings_intersecting_plan_area:     gpd.GeoDataFrame
+
+    :return:                                    The building plan area for each unique building in the
+                                                `buildings_intersecting_plan_area` GeoDataFrame.
+
+    """
+
+    target = np.asarray(buildings_intersecting_plan_area[Settings.TARGET_BUFFERED_FIELD])
+    neighbor = np.asarray(buildings_intersecting_plan_area[Settings.NEIGHBOR_GEOMETRY_FIELD])
+
+    shapely.prepare(target)
+    inside = shapely.contains_properly(target, neighbor)
+
+    intersection_area = shapely.area(neighbor)
+    intersection_area[~inside] = shapely.area(
+        shapely.intersection(target[~inside], neighbor[~inside])
+    )
+
+    target_index, targets = pd.factorize(
+        buildings_intersecting_plan_area[Settings.TARGET_ID_FIELD], sort=True
+    )
+
+    return pd.Series(np.bincount(target_index, weights=intersection_area, minlength=len(targets)))
+
+
 def building_surface_area(
     wall_length: pd.DataFrame, building_height: pd.Series, building_area: pd.Series
 ) -> pd.Series:
@@ -294,6 +568,7 @@ def complete_aspect_ratio(
     return (building_surface_area + exposed_ground) / total_plan_area
 
 
+@config.when_not(distance="centroid")
 def distance_between_buildings(buildings_intersecting_plan_area: gpd.GeoDataFrame) -> pd.Series:
     """Calculate the distance between each building and its neighbor as defined in buildings_intersecting_plan_area.
 
@@ -311,26 +586,101 @@ def distance_between_buildings(buildings_intersecting_plan_area: gpd.GeoDataFram
     )
 
 
+@config.when(distance="centroid")
+def distance_between_buildings__centroid(
+    buildings_intersecting_plan_area: gpd.GeoDataFrame,
+    building_id: pd.Series,
+    building_geometry: pd.Series,
+) -> pd.Series:
+    """Approximate the distance between each building and its neighbor as defined in buildings_intersecting_plan_area
+    by the distance between their centroids. The centroids are computed once per building and the distance for each
+    pair is taken from the centroid coordinates, replacing the polygon to polygon distance. This is only an
+    approximation, with no ordering between the two: the centroid distance is usually longer, and buildings that
+    touch or overlap have a polygon distance of 0 but a positive centroid distance, so they count towards the average
+    distance between buildings, but the centroid of a concave footprint can lie outside it, closer to a neighbor than
+    its walls are.
+
+    :param buildings_intersecting_plan_area:    Geometry field for the neighboring buildings from the spatially
+                                                joined data.
+    :type buildings_intersecting_plan_area:     gpd.GeoDataFrame
+
+    :param building_id:                         Building ID field.
+    :type building_id:                          pd.Series
+
+    :param building_geometry:                   Geometry field for the buildings.
+    :type building_geometry:                    pd.Series
+
+    :return:                                    The distance between the centroids of each building and its neighbors
+                                                in a Pandas Series.
+    """
+
+    centroids = shapely.get_coordinates(shapely.centroid(np.asarray(building_geometry)))
+    ids = pd.Index(building_id)
+    target = centroids[ids.get_indexer(buildings_intersecting_plan_area[Settings.TARGET_ID_FIELD])]
+    neighbor = centroids[ids.get_indexer(buildings_intersecting_plan_area.index)]
+
+    return pd.Series(
+        np.hypot(*(target - neighbor).T),
+        index=buildings_intersecting_plan_area.index,
+        name=Settings.DISTANCE_BETWEEN_BUILDINGS,
+    )
+
+
+@config.when_not(building_order="hilbert")
 @extract_columns(*[Settings.ID_FIELD, Settings.HEIGHT_FIELD, Settings.GEOMETRY_FIELD])
-def filter_height_range(standardize_column_names_df: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+def filter_height_range(valid_geometry_df: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     """Filter out any zero height buildings and reindex the data frame.  Extract the building_id,
     building_height, and geometry fields to nodes.
 
-    :param standardize_column_names_df:             GeoDataFrame of the input shapefile with renamed columns.
-    :type standardize_column_names_df:              gpd.GeoDataFrame
+    :param valid_geometry_df:                       GeoDataFrame of the input shapefile with renamed columns and
+                                                    repaired geometry.
+    :type valid_geometry_df:                        gpd.GeoDataFrame
 
     :return:                                        GeoDataFrame
 
     """
 
-    standardize_column_names_df.loc[
-        standardize_column_names_df[Settings.HEIGHT_FIELD] > Settings.MAX_BUILDING_HEIGHT,
+    valid_geometry_df.loc[
+        valid_geometry_df[Settings.HEIGHT_FIELD] > Settings.MAX_BUILDING_HEIGHT,
         Settings.HEIGHT_FIELD,
     ] = Settings.MAX_BUILDING_HEIGHT
 
-    return standardize_column_names_df.loc[
-        standardize_column_names_df[Settings.HEIGHT_FIELD] > 0
-    ].reset_index(drop=True)
+    return valid_geometry_df.loc[valid_geometry_df[Settings.HEIGHT_FIELD] > 0].reset_index(
+        drop=True
+    )
+
+
+@config.when(building_order="hilbert")
+@extract_columns(
+    *[Settings.ID_FIELD, Settings.HEIGHT_FIELD, Settings.GEOMETRY_FIELD, Settings.ORIGINAL_ID_FIELD]
+)
+def filter_height_range__hilbert(valid_geometry_df: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Filter out any zero height buildings like `filter_height_range()`, then order the buildings along a Hilbert
+    curve through their centroids so that buildings near each other are also near each other in memory and in any
+    chunk of consecutive buildings. The nodes that aggregate neighbors by building ID expect the IDs to increase
+    with the rows, so the buildings are numbered again in the new order; their IDs in the input shapefile are
+    kept in the original_building_id field. Extract the building_id, building_height, geometry, and
+    original_building_id fields to nodes.
+
+    :param valid_geometry_df:                       GeoDataFrame of the input shapefile with renamed columns and
+                                                    repaired geometry.
+    :type valid_geometry_df:                        gpd.GeoDataFrame
+
+    :return:                                        GeoDataFrame
+
+    """
+
+    buildings = filter_height_range(valid_geometry_df)
+    centroids = gpd.GeoSeries(buildings.geometry.centroid)
+    order = np.argsort(centroids.hilbert_distance().to_numpy(), kind="stable")
+    buildings = buildings.iloc[order].reset_index(drop=True)
+
+    return buildings.assign(
+        **{
+            Settings.ORIGINAL_ID_FIELD: buildings[Settings.ID_FIELD],
+            Settings.ID_FIELD: np.arange(len(buildings)),
+        }
+    )
 
 
 def frontal_area(frontal_length: pd.DataFrame, building_height: pd.Series) -> pd.DataFrame:
@@ -357,8 +707,12 @@ def frontal_area(frontal_length: pd.DataFrame, building_height: pd.Series) -> pd
     return frontal_area
 
 
+@config.when_not(engine="fast")
 def frontal_area_density(
-    frontal_length: pd.DataFrame, building_height: pd.Series, total_plan_area: pd.Series
+    frontal_length: pd.DataFrame,
+    building_height: pd.Series,
+    total_plan_area: pd.Series,
+    precision: str = Settings.DEFAULT_PRECISION,
 ) -> pd.DataFrame:
     """Calculate the frontal area density for each building in a GeoPandas GeoSeries. Frontal area density is the frontal area of a
     building at a specific height increment divided by the total plan area. naturf calculates frontal area density from the four cardinal
@@ -373,6 +727,10 @@ def frontal_area_density(
     :param total_plan_area:               Total plan area for each building.
     :type total_plan_area:                pd.Series
 
+    :param precision:                     Float dtype of the result, "float64" or "float32".
+                                          DEFAULT: "float64"
+    :type precision:                      str
+
     :return:                              Pandas DataFrame with frontal area density for each cardinal direction and
                                           each BUILDING_HEIGHT_INTERVAL for each building.
     """
@@ -491,7 +849,7 @@ def frontal_area_density(
         ],
     )
 
-    return pd.concat(
+    frontal_area_density = pd.concat(
         [
             pd.DataFrame(frontal_area_north, columns=columns_north),
             pd.DataFrame(frontal_area_east, columns=columns_east),
@@ -501,8 +859,87 @@ def frontal_area_density(
         axis=1,
     )
 
+    return _with_precision(frontal_area_density, precision)
+
+
+@config.when(engine="fast")
+def frontal_area_density__fast(
+    frontal_length: pd.DataFrame,
+    building_height: pd.Series,
+    total_plan_area: pd.Series,
+    precision: str = Settings.DEFAULT_PRECISION,
+) -> pd.DataFrame:
+    """Calculate the frontal area density for each building as in `frontal_area_density()`, for all buildings and
+    height increments at once. The wall height within each increment is the building height above the bottom of the
+    increment clipped to the BUILDING_HEIGHT_INTERVAL.
+
+    :param frontal_length:                Frontal length in each cardinal direction for each building.
+    :type frontal_length:                 pd.DataFrame
+
+    :param building_height:               Building height for each building.
+    :type building_height:                pd.Series
+
+    :param total_plan_area:               Total plan area for each building.
+    :type total_plan_area:                pd.Series
+
+    :param precision:                     Float dtype of the result, "float64" or "float32".
+                                          DEFAULT: "float64"
+    :type precision:                      str
+
+    :return:                              Pandas DataFrame with frontal area density for each cardinal direction and
+                                          each BUILDING_HEIGHT_INTERVAL for each building.
+    """
+
+    cols = int(Settings.MAX_BUILDING_HEIGHT / Settings.BUILDING_HEIGHT_INTERVAL)
+    height = building_height.reindex(frontal_length.index).to_numpy(dtype=np.float64)
+    plan_area = total_plan_area.reindex(frontal_length.index).to_numpy(dtype=np.float64)
+
+    increment_height = np.clip(
+        height[:, np.newaxis] - np.arange(cols) * Settings.BUILDING_HEIGHT_INTERVAL,
+        0,
+        Settings.BUILDING_HEIGHT_INTERVAL,
+    )
+
+    density = np.zeros((len(building_height.index), 4 * cols))
+    frontal_lengths = frontal_length[
+        [
+            Settings.FRONTAL_LENGTH_NORTH,
+            Settings.FRONTAL_LENGTH_EAST,
+            Settings.FRONTAL_LENGTH_SOUTH,
+            Settings.FRONTAL_LENGTH_WEST,
+        ]
+    ].to_numpy(dtype=np.float64)
+
+    for direction in range(4):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            direction_density = (
+                frontal_lengths[:, direction, np.newaxis]
+                * increment_height
+                / plan_area[:, np.newaxis]
+            )
+        density[frontal_length.index, direction * cols : (direction + 1) * cols] = np.where(
+            increment_height > 0, direction_density, 0
+        )
+
+    columns = [
+        f"{frontal_area}_{i}"
+        for frontal_area in [
+            Settings.FRONTAL_AREA_NORTH,
+            Settings.FRONTAL_AREA_EAST,
+            Settings.FRONTAL_AREA_SOUTH,
+            Settings.FRONTAL_AREA_WEST,
+        ]
+        for i in range(cols)
+    ]
+
+    return _with_precision(pd.DataFrame(density, columns=columns), precision)
 
-def frontal_area_index(frontal_area: pd.DataFrame, total_plan_area: pd.Series) -> pd.DataFrame:
+
+def frontal_area_index(
+    frontal_area: pd.DataFrame,
+    total_plan_area: pd.Series,
+    precision: str = Settings.DEFAULT_PRECISION,
+) -> pd.DataFrame:
     """Calculate the frontal area index for each building in a Pandas DataFrame in each cardinal direction.
 
     :param frontal_area:                  Frontal area in each cardinal direction for each building.
@@ -511,6 +948,10 @@ def frontal_area_index(frontal_area: pd.DataFrame, total_plan_area: pd.Series) -
     :param total_plan_area:               Total plan area for each building.
     :type total_plan_area:                pd.Series
 
+    :param precision:                     Float dtype of the result, "float64" or "float32".
+                                          DEFAULT: "float64"
+    :type precision:                      str
+
     :return:                              Pandas DataFrame with frontal area index in each cardinal direction.
     """
 
@@ -522,9 +963,10 @@ def frontal_area_index(frontal_area: pd.DataFrame, total_plan_area: pd.Series) -
         Settings.FRONTAL_AREA_INDEX_WEST,
     ]
 
-    return frontal_area_index
+    return _with_precision(frontal_area_index, precision)
 
 
+@config.when_not(engine="fast")
 def frontal_length(
     buildings_intersecting_plan_area: gpd.GeoDataFrame,
 ) -> pd.DataFrame:
@@ -582,6 +1024,45 @@ def frontal_length(
     )
 
 
+@config.when(engine="fast")
+def frontal_length__fast(
+    buildings_intersecting_plan_area: gpd.GeoDataFrame,
+) -> pd.DataFrame:
+    """Calculate the frontal length for each cardinal direction from the GeoDataFrame of buildings intersecting the
+    plan area, summing the neighbor wall lengths of every target building at once with `np.bincount`.
+
+    :param buildings_intersecting_plan_area:    Geometry field for the neighboring buildings from the spatially
+                                                joined data.
+    :type buildings_intersecting_plan_area:     gpd.GeoDataFrame
+
+    :return:                                    The frontal area for each cardinal direction for each unique building in the
+                                                `buildings_intersecting_plan_area` GeoDataFrame.
+
+    """
+
+    target_index, targets = pd.factorize(
+        buildings_intersecting_plan_area[Settings.TARGET_ID_FIELD], sort=True
+    )
+
+    return pd.DataFrame(
+        {
+            frontal_length: np.bincount(
+                target_index,
+                weights=buildings_intersecting_plan_area[
+                    f"{wall_length}_{Settings.NEIGHBOR}"
+                ].to_numpy(dtype=np.float64, na_value=0.0),
+                minlength=len(targets),
+            )
+            for frontal_length, wall_length in [
+                (Settings.FRONTAL_LENGTH_NORTH, Settings.WALL_LENGTH_NORTH),
+                (Settings.FRONTAL_LENGTH_EAST, Settings.WALL_LENGTH_EAST),
+                (Settings.FRONTAL_LENGTH_SOUTH, Settings.WALL_LENGTH_SOUTH),
+                (Settings.FRONTAL_LENGTH_WEST, Settings.WALL_LENGTH_WEST),
+            ]
+        }
+    )
+
+
 def grimmond_oke_displacement_height(building_height: pd.Series) -> pd.Series:
     """Calculate the Grimmond & Oke displacement height for each building
 
@@ -701,6 +1182,7 @@ def macdonald_roughness_length(
     macdonald_displacement_height: pd.Series,
     frontal_area: pd.DataFrame,
     lot_area: pd.Series,
+    precision: str = Settings.DEFAULT_PRECISION,
 ) -> pd.DataFrame:
     """Calculate the Macdonald et al. roughness length for each building in a Pandas Series.
 
@@ -716,6 +1198,10 @@ def macdonald_roughness_length(
     :param lot_area:                      Lot area for each building.
     :type lot_area:                       pd.Series
 
+    :param precision:                     Float dtype of the result, "float64" or "float32".
+                                          DEFAULT: "float64"
+    :type precision:                      str
+
     :return:                              Panda Series with Macdonald roughness length for each building in each cardinal direction.
     """
 
@@ -746,7 +1232,7 @@ def macdonald_roughness_length(
         Settings.MACDONALD_ROUGHNESS_LENGTH_WEST,
     ]
 
-    return macdonald_roughness_length
+    return _with_precision(macdonald_roughness_length, precision)
 
 
 def mean_building_height(buildings_intersecting_plan_area: gpd.GeoDataFrame) -> pd.Series:
@@ -766,8 +1252,25 @@ def mean_building_height(buildings_intersecting_plan_area: gpd.GeoDataFrame) ->
     return pd.Series(df.values)
 
 
+@config.when_not(building_order="hilbert")
+def original_building_id(building_id: pd.Series) -> pd.Series:
+    """ID of each building in the input shapefile. Buildings keep their input order and IDs unless they are
+    ordered along a Hilbert curve by `filter_height_range__hilbert()`.
+
+    :param building_id:                   Building ID field.
+    :type building_id:                    pd.Series
+
+    :return:                              Pandas Series of the IDs of the buildings in the input shapefile.
+    """
+
+    return building_id.rename(Settings.ORIGINAL_ID_FIELD)
+
+
 def plan_area_density(
-    building_plan_area: pd.Series, building_height: pd.Series, total_plan_area: pd.Series
+    building_plan_area: pd.Series,
+    building_height: pd.Series,
+    total_plan_area: pd.Series,
+    precision: str = Settings.DEFAULT_PRECISION,
 ) -> pd.DataFrame:
     """Calculate the plan area density for each building in a GeoPandas GeoSeries. Plan area density is the building plan area
     at a specific height increment divided by the total plan area. naturf calculates plan area density from the four cardinal
@@ -782,6 +1285,10 @@ def plan_area_density(
     :param total_plan_area:               Total plan area for each building.
     :type total_plan_area:                pd.Series
 
+    :param precision:                     Float dtype of the result, "float64" or "float32".
+                                          DEFAULT: "float64"
+    :type precision:                      str
+
     :return:                              Pandas DataFrame with plan area density for each BUILDING_HEIGHT_INTERVAL for each building.
     """
 
@@ -805,7 +1312,9 @@ def plan_area_density(
         f"{Settings.PLAN_AREA_DENSITY}_{i}"
         for i in range(int(Settings.MAX_BUILDING_HEIGHT / Settings.BUILDING_HEIGHT_INTERVAL))
     ]
-    return pd.DataFrame(plan_area_density, columns=columns_plan_area_density)
+    plan_area_density = pd.DataFrame(plan_area_density, columns=columns_plan_area_density)
+
+    return _with_precision(plan_area_density, precision)
 
 
 def plan_area_fraction(building_plan_area: pd.Series, total_plan_area: pd.Series) -> pd.Series:
@@ -825,7 +1334,9 @@ def plan_area_fraction(building_plan_area: pd.Series, total_plan_area: pd.Series
 
 
 def raupach_displacement_height(
-    building_height: pd.Series, frontal_area_index: pd.DataFrame
+    building_height: pd.Series,
+    frontal_area_index: pd.DataFrame,
+    precision: str = Settings.DEFAULT_PRECISION,
 ) -> pd.DataFrame:
     """Calculate the Raupach displacement height for each building in each cardinal direction in a Panda Series. Default values for constants are set
     in the config file.
@@ -836,6 +1347,10 @@ def raupach_displacement_height(
     :param frontal_area_index:            Frontal area index for each building in each cardinal direction.
     :type frontal_area_index:             pd.DataFrame
 
+    :param precision:                     Float dtype of the result, "float64" or "float32".
+                                          DEFAULT: "float64"
+    :type precision:                      str
+
     :return:                              Pandas DataFrame with Raupach displacement height in each cardinal direction.
     """
 
@@ -856,13 +1371,14 @@ def raupach_displacement_height(
         Settings.RAUPACH_DISPLACEMENT_HEIGHT_WEST,
     ]
 
-    return raupach_displacement_height
+    return _with_precision(raupach_displacement_height, precision)
 
 
 def raupach_roughness_length(
     building_height: pd.Series,
     frontal_area_index: pd.DataFrame,
     raupach_displacement_height: pd.DataFrame,
+    precision: str = Settings.DEFAULT_PRECISION,
 ) -> pd.DataFrame:
     """Calculate the Raupach roughness length for each building in each cardinal direction in a Panda Series. Default values for constants are set
     in the config file.
@@ -876,6 +1392,10 @@ def raupach_roughness_length(
     :param raupach_displacment_height:    Raupach displacment height for each building in each cardinal direction.
     :type raupach_displacment_height:     pd.DataFrame
 
+    :param precision:                     Float dtype of the result, "float64" or "float32".
+                                          DEFAULT: "float64"
+    :type precision:                      str
+
     :return:                              Pandas DataFrame with Raupach roughness length in each cardinal direction.
     """
 
@@ -910,10 +1430,12 @@ def raupach_roughness_length(
     frontal_area_index.columns = cols_fai
     raupach_displacement_height.columns = cols_rdh
 
-    return raupach_roughness_length
+    return _with_precision(raupach_roughness_length, precision)
 
 
-def rooftop_area_density(plan_area_density: pd.DataFrame) -> pd.DataFrame:
+def rooftop_area_density(
+    plan_area_density: pd.DataFrame, precision: str = Settings.DEFAULT_PRECISION
+) -> pd.DataFrame:
     """Calculate the rooftop area density for each building in a Pandas DataFrame. Rooftop area density is the roof area
     of all buildings within the total plan area  at a specified height increment divided by the total plan area. naturf
     projects building footprints vertically to the building height, meaning that rooftop area density is equal to the plan area
@@ -922,6 +1444,10 @@ def rooftop_area_density(plan_area_density: pd.DataFrame) -> pd.DataFrame:
     :param plan_area_density:            Plan area density at each specified height increment.
     :type plan_area_density:             pd.DataFrame
 
+    :param precision:                     Float dtype of the result, "float64" or "float32".
+                                          DEFAULT: "float64"
+    :type precision:                      str
+
     :return:                             Pandas DataFrame with rooftop area density for each BUILDING_HEIGHT_INTERVAL for each building.
     """
 
@@ -930,7 +1456,11 @@ def rooftop_area_density(plan_area_density: pd.DataFrame) -> pd.DataFrame:
         for i in range(int(Settings.MAX_BUILDING_HEIGHT / Settings.BUILDING_HEIGHT_INTERVAL))
     ]
 
-    return pd.DataFrame(plan_area_density.values.tolist(), columns=columns_rooftop_area_density)
+    rooftop_area_density = pd.DataFrame(
+        plan_area_density.values.tolist(), columns=columns_rooftop_area_density
+    )
+
+    return _with_precision(rooftop_area_density, precision)
 
 
 def sky_view_factor(
@@ -984,17 +1514,17 @@ def standardize_column_names_df(input_shapefile_df: gpd.GeoDataFrame) -> gpd.Geo
 
     """
 
-    # standardize field names from data to reference names in code
-    input_shapefile_df.rename(
+    # standardize field names from data to reference names in code; the input is left unchanged so that other
+    # nodes reading it do not depend on the order the DAG runs in
+    standardized = input_shapefile_df.rename(
         columns={
             Settings.DATA_ID_FIELD_NAME: Settings.ID_FIELD,
             Settings.DATA_HEIGHT_FIELD_NAME: Settings.HEIGHT_FIELD,
             Settings.DATA_GEOMETRY_FIELD_NAME: Settings.GEOMETRY_FIELD,
-        },
-        inplace=True,
+        }
     )
 
-    return input_shapefile_df.set_geometry(Settings.GEOMETRY_FIELD)
+    return standardized.set_geometry(Settings.GEOMETRY_FIELD)
 
 
 def target_crs(input_shapefile_df: gpd.GeoDataFrame) -> CRS:
@@ -1007,7 +1537,7 @@ def target_crs(input_shapefile_df: gpd.GeoDataFrame) -> CRS:
 
     """
 
-    return input_shapefile_df.set_geometry(Settings.GEOMETRY_FIELD).crs
+    return input_shapefile_df.crs
 
 
 def total_plan_area(total_plan_area_geometry: gpd.GeoSeries) -> pd.Series:
@@ -1047,13 +1577,58 @@ def total_plan_area_geometry(
     return building_geometry.buffer(distance=radius, cap_style=cap_style)
 
 
-def vertical_distribution_of_building_heights(building_height: pd.Series) -> pd.DataFrame:
+def valid_geometry_df(standardize_column_names_df: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Repair invalid building geometries in one vectorized pass before any geometric analysis. Invalid polygons are
+    passed through `shapely.make_valid`, only the polygonal parts of the repaired geometry are kept, and buildings
+    left without a footprint (missing, empty, or collapsed to lines or points) are dropped. Multipart buildings are
+    kept as one row; see `building_parts()` for the exploded parts.
+
+    :params standardize_column_names_df:            GeoDataFrame of the input shapefile with renamed columns.
+    :type standardize_column_names_df:              gpd.GeoDataFrame
+
+    :return:                                        GeoDataFrame
+
+    """
+
+    geometry = np.array(standardize_column_names_df[Settings.GEOMETRY_FIELD], dtype=object)
+    invalid = ~shapely.is_valid(geometry) & ~shapely.is_missing(geometry)
+
+    # make_valid can return collections that mix polygons with collapsed lines and points, so flatten them twice
+    # to reach the individual polygons and rebuild each building from its polygonal parts only.
+    parts, repaired_index = shapely.get_parts(
+        shapely.make_valid(geometry[invalid]), return_index=True
+    )
+    parts, part_index = shapely.get_parts(parts, return_index=True)
+    repaired_index = repaired_index[part_index]
+    polygonal = shapely.get_type_id(parts) == shapely.GeometryType.POLYGON
+    rows, part_building = np.unique(repaired_index[polygonal], return_inverse=True)
+
+    repaired = np.full(np.count_nonzero(invalid), None, dtype=object)
+    repaired[rows] = shapely.multipolygons(parts[polygonal], indices=part_building)
+    geometry[invalid] = repaired
+
+    standardize_column_names_df[Settings.GEOMETRY_FIELD] = gpd.GeoSeries(
+        geometry, index=standardize_column_names_df.index, crs=standardize_column_names_df.crs
+    )
+
+    return standardize_column_names_df.loc[
+        ~shapely.is_missing(geometry) & ~shapely.is_empty(geometry)
+    ]
+
+
+def vertical_distribution_of_building_heights(
+    building_height: pd.Series, precision: str = Settings.DEFAULT_PRECISION
+) -> pd.DataFrame:
     """Represent the location of buildings at 5m increments from ground level to 75m unless otherwise specified. If is within a
     given height bin, it will be given a 1 and it will be given a 0 otherwise."
 
     :param building_height:               Building height for each building.
     :type building_height:                pd.Series
 
+    :param precision:                     Float dtype of the result, "float64" or "float32".
+                                          DEFAULT: "float64"
+    :type precision:                      str
+
     :return:                              Pandas DataFrame with the distribution of building heights at each
                                           BUILDING_HEIGHT_INTERVAL for each building.
     """
@@ -1078,30 +1653,38 @@ def vertical_distribution_of_building_heights(building_height: pd.Series) -> pd.
         for i in range(int(Settings.MAX_BUILDING_HEIGHT / Settings.BUILDING_HEIGHT_INTERVAL))
     ]
 
-    return pd.DataFrame(
+    vertical_distribution_of_building_heights = pd.DataFrame(
         vertical_distribution_of_building_heights,
         columns=columns_vertical_distribution_of_building_heights,
     )
 
+    return _with_precision(vertical_distribution_of_building_heights, precision)
 
-def wall_angle_direction_length(building_geometry: pd.Series) -> pd.DataFrame:
-    """Calculate the wall angle, direction, and length for each building in a GeoPandas GeoSeries.
 
-    :param geometry:                    Geometry for a series of buildings.
-    :type geometry:                     pd.Series
+@config.when_not(engine="fast")
+def wall_angle_direction_length(building_parts: gpd.GeoSeries) -> pd.DataFrame:
+    """Calculate the wall angle, direction, and length for each building in a GeoPandas GeoSeries. The walls of every
+    single polygon part are gathered in the lists of the building it belongs to.
+
+    :param building_parts:              Single polygon parts indexed by the building they belong to.
+    :type building_parts:               gpd.GeoSeries
 
     :return:                            Pandas DataFrame with wall angle, direction, and length for each building.
 
     """
 
+    buildings = building_parts.index.unique()
+    part_building = buildings.get_indexer(building_parts.index)
+
     wall_angle, wall_direction, wall_length = (
-        [[] for x in range(building_geometry.size)],
-        [[] for x in range(building_geometry.size)],
-        [[] for x in range(building_geometry.size)],
+        [[] for x in range(buildings.size)],
+        [[] for x in range(buildings.size)],
+        [[] for x in range(buildings.size)],
     )
 
-    for building in range(building_geometry.size):
-        points_in_polygon = building_geometry.values[building].exterior.xy
+    for part in range(building_parts.size):
+        building = part_building[part]
+        points_in_polygon = building_parts.values[part].exterior.xy
 
         for index, item in enumerate(zip(points_in_polygon[0], points_in_polygon[1])):
             x, y = item
@@ -1118,19 +1701,19 @@ def wall_angle_direction_length(building_geometry: pd.Series) -> pd.DataFrame:
                 # For each direction, the start degree (from counterclockwise) is included (<=) and the end degree is not included (<).
                 if (
                     Settings.NORTHEAST_DEGREES
-                    <= wall_angle[building][index - 1]
+                    <= wall_angle[building][-1]
                     < Settings.NORTHWEST_DEGREES
                 ):
                     wall_direction[building].append(Settings.WEST)
                 elif (
                     Settings.SOUTHEAST_DEGREES_ARCTAN
-                    <= wall_angle[building][index - 1]
+                    <= wall_angle[building][-1]
                     < Settings.NORTHEAST_DEGREES
                 ):
                     wall_direction[building].append(Settings.NORTH)
                 elif (
                     Settings.SOUTHWEST_DEGREES_ARCTAN
-                    <= wall_angle[building][index - 1]
+                    <= wall_angle[building][-1]
                     < Settings.SOUTHEAST_DEGREES_ARCTAN
                 ):
                     wall_direction[building].append(Settings.EAST)
@@ -1144,14 +1727,44 @@ def wall_angle_direction_length(building_geometry: pd.Series) -> pd.DataFrame:
 
     return pd.concat(
         [
-            pd.Series(wall_angle, name=Settings.WALL_ANGLE),
-            pd.Series(wall_direction, name=Settings.WALL_DIRECTION),
-            pd.Series(wall_length, name=Settings.WALL_LENGTH),
+            pd.Series(wall_angle, name=Settings.WALL_ANGLE, index=buildings),
+            pd.Series(wall_direction, name=Settings.WALL_DIRECTION, index=buildings),
+            pd.Series(wall_length, name=Settings.WALL_LENGTH, index=buildings),
         ],
         axis=1,
     )
 
 
+@config.when(engine="fast")
+def wall_angle_direction_length__fast(building_parts: gpd.GeoSeries) -> pd.DataFrame:
+    """Calculate the wall angle, direction, and length for each building from its single polygon parts. The walls of
+    every exterior ring are computed at once by `_walls()`, sorted by building, and split into the per-building lists.
+
+    :param building_parts:              Single polygon parts indexed by the building they belong to.
+    :type building_parts:               gpd.GeoSeries
+
+    :return:                            Pandas DataFrame with wall angle, direction, and length for each building.
+
+    """
+
+    wall_building, wall_angle, wall_direction, wall_length = _walls(building_parts)
+
+    # Sort the walls by building, keeping their order within a building, and split at each new building.
+    building_index, buildings = pd.factorize(wall_building, sort=True)
+    order = np.argsort(building_index, kind="stable")
+    splits = np.flatnonzero(np.diff(building_index[order])) + 1
+
+    return pd.DataFrame(
+        {
+            Settings.WALL_ANGLE: np.split(wall_angle[order], splits),
+            Settings.WALL_DIRECTION: np.split(wall_direction[order], splits),
+            Settings.WALL_LENGTH: np.split(wall_length[order], splits),
+        },
+        index=buildings,
+    )
+
+
+@config.when_not(feature_store=True)
 def wall_length(wall_angle_direction_length: pd.DataFrame) -> pd.DataFrame:
     """Calculate the wall length for each building in a GeoPandas GeoSeries.
 
@@ -1162,30 +1775,220 @@ def wall_length(wall_angle_direction_length: pd.DataFrame) -> pd.DataFrame:
 
     """
 
-    wall_length_north, wall_length_east, wall_length_south, wall_length_west = (
-        [0] * len(wall_angle_direction_length.index),
-        [0] * len(wall_angle_direction_length.index),
-        [0] * len(wall_angle_direction_length.index),
-        [0] * len(wall_angle_direction_length.index),
+    directions = [Settings.NORTH, Settings.EAST, Settings.SOUTH, Settings.WEST]
+    number_of_buildings = len(wall_angle_direction_length.index)
+
+    walls = wall_angle_direction_length[[Settings.WALL_DIRECTION, Settings.WALL_LENGTH]].explode(
+        [Settings.WALL_DIRECTION, Settings.WALL_LENGTH]
     )
+    walls = walls.loc[walls[Settings.WALL_LENGTH].notna()]
 
-    for index, row in wall_angle_direction_length.iterrows():
-        for j in range(len(row[Settings.WALL_DIRECTION])):
-            if row[Settings.WALL_DIRECTION][j] == Settings.NORTH:
-                wall_length_north[index] += row[Settings.WALL_LENGTH][j]
-            elif row[Settings.WALL_DIRECTION][j] == Settings.EAST:
-                wall_length_east[index] += row[Settings.WALL_LENGTH][j]
-            elif row[Settings.WALL_DIRECTION][j] == Settings.SOUTH:
-                wall_length_south[index] += row[Settings.WALL_LENGTH][j]
-            else:
-                wall_length_west[index] += row[Settings.WALL_LENGTH][j]
+    # Any direction that is not north, east, or south is counted as west.
+    direction_index = pd.Categorical(walls[Settings.WALL_DIRECTION], categories=directions).codes
+    direction_index = np.where(
+        direction_index < 0, directions.index(Settings.WEST), direction_index
+    )
+    building_index = wall_angle_direction_length.index.get_indexer(walls.index)
 
-    return pd.concat(
+    wall_length = np.bincount(
+        building_index * len(directions) + direction_index,
+        weights=walls[Settings.WALL_LENGTH].to_numpy(dtype=np.float64),
+        minlength=number_of_buildings * len(directions),
+    ).reshape(number_of_buildings, len(directions))
+
+    return pd.DataFrame(
+        wall_length,
+        columns=[
+            Settings.WALL_LENGTH_NORTH,
+            Settings.WALL_LENGTH_EAST,
+            Settings.WALL_LENGTH_SOUTH,
+            Settings.WALL_LENGTH_WEST,
+        ],
+    )
+
+
+@config.when(feature_store=True)
+def wall_length__stored(building_features: pd.DataFrame) -> pd.DataFrame:
+    """Wall length in each cardinal direction for each building, taken from the feature store.
+
+    :param building_features:                          Static features of each building.
+    :type building_features:                           pd.DataFrame
+
+    :return:                                           Pandas DataFrame with wall area for each cardinal direction for each building.
+
+    """
+
+    return building_features[Settings.WALL_LENGTH_FIELDS]
+
+
+def _cache_filename(input_shapefile: Optional[str], directory: Optional[str], suffix: str) -> str:
+    """Path of a file named after the input shapefile in `directory`, by default the directory of the input."""
+
+    stem = "naturf"
+    if input_shapefile is not None:
+        stem = os.path.splitext(os.path.basename(input_shapefile))[0]
+    directory = directory or os.path.dirname(input_shapefile or "")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    return os.path.join(directory, f"{stem}.{suffix}")
+
+
+def _geometry_hash(building_geometry: pd.Series) -> np.ndarray:
+    """64 bit hash of the WKB of each geometry, computed for all geometries at once."""
+
+    wkb = shapely.to_wkb(np.asarray(building_geometry))
+
+    return pd.util.hash_array(wkb, categorize=False).view(np.int64)
+
+
+def _walls(building_parts: gpd.GeoSeries) -> tuple:
+    """Building index, angle, direction, and length of every wall of the exterior rings of the parts, computed at
+    once from the flattened vertex coordinates."""
+
+    coordinates, ring_index = shapely.get_coordinates(
+        shapely.get_exterior_ring(np.asarray(building_parts)), return_index=True
+    )
+
+    # Consecutive vertices of the same ring form a wall.
+    same_ring = ring_index[1:] == ring_index[:-1]
+    x1, y1 = coordinates[:-1][same_ring].T
+    x2, y2 = coordinates[1:][same_ring].T
+
+    wall_angle = np.degrees(np.arctan2(y2 - y1, x2 - x1))
+
+    # For each direction, the start degree (from counterclockwise) is included (<=) and the end degree is not included (<).
+    wall_direction = np.select(
         [
-            pd.Series(wall_length_north, name=Settings.WALL_LENGTH_NORTH),
-            pd.Series(wall_length_east, name=Settings.WALL_LENGTH_EAST),
-            pd.Series(wall_length_south, name=Settings.WALL_LENGTH_SOUTH),
-            pd.Series(wall_length_west, name=Settings.WALL_LENGTH_WEST),
+            (Settings.NORTHEAST_DEGREES <= wall_angle) & (wall_angle < Settings.NORTHWEST_DEGREES),
+            (Settings.SOUTHEAST_DEGREES_ARCTAN <= wall_angle)
+            & (wall_angle < Settings.NORTHEAST_DEGREES),
+            (Settings.SOUTHWEST_DEGREES_ARCTAN <= wall_angle)
+            & (wall_angle < Settings.SOUTHEAST_DEGREES_ARCTAN),
+        ],
+        [Settings.WEST, Settings.NORTH, Settings.EAST],
+        default=Settings.SOUTH,
+    )
+
+    wall_length = np.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
+
+    return building_parts.index[ring_index[:-1][same_ring]], wall_angle, wall_direction, wall_length
+
+
+def _geometry_features(building_geometry: pd.Series) -> pd.DataFrame:
+    """Compute the columns of `Settings.BUILDING_FEATURE_FIELDS` for each geometry, in order."""
+
+    geometry = np.asarray(building_geometry)
+    centroid = shapely.centroid(geometry)
+    walls = wall_length(
+        wall_angle_direction_length__fast(building_parts(building_geometry.reset_index(drop=True)))
+    )
+
+    return pd.DataFrame(
+        {
+            Settings.AREA_FIELD: shapely.area(geometry),
+            Settings.CENTROID_FIELDS[0]: shapely.get_x(centroid),
+            Settings.CENTROID_FIELDS[1]: shapely.get_y(centroid),
+            **{field: walls[field].to_numpy() for field in Settings.WALL_LENGTH_FIELDS},
+            Settings.VERTEX_COUNT_FIELD: shapely.get_num_coordinates(geometry),
+            **dict(zip(Settings.GEOMETRY_BOUNDS_FIELDS, shapely.bounds(geometry).T)),
+        }
+    )
+
+
+def _with_precision(df: pd.DataFrame, precision: str) -> pd.DataFrame:
+    """Cast `df`, computed in float64, to float32 in float32 mode so that the table kept for downstream nodes is
+    narrowed. In float64 mode the values are returned as computed."""
+
+    if precision == "float32":
+        return df.astype(np.float32)
+
+    return df
+
+
+def _join_frames(
+    building_id: pd.Series,
+    building_height: pd.Series,
+    building_geometry: pd.Series,
+    building_area: pd.Series,
+    total_plan_area_geometry: pd.Series,
+    wall_length: pd.DataFrame,
+    target_crs: CRS,
+) -> tuple:
+    """Frames of the buffered target buildings and of the neighbor buildings joined by
+    `buildings_intersecting_plan_area()`."""
+
+    df = pd.DataFrame(
+        {
+            Settings.ID_FIELD: building_id,
+            Settings.HEIGHT_FIELD: building_height,
+            Settings.AREA_FIELD: building_area,
+            Settings.GEOMETRY_FIELD: building_geometry,
+            Settings.BUFFERED_FIELD: total_plan_area_geometry,
+            Settings.WALL_LENGTH_NORTH: wall_length[Settings.WALL_LENGTH_NORTH],
+            Settings.WALL_LENGTH_EAST: wall_length[Settings.WALL_LENGTH_EAST],
+            Settings.WALL_LENGTH_SOUTH: wall_length[Settings.WALL_LENGTH_SOUTH],
+            Settings.WALL_LENGTH_WEST: wall_length[Settings.WALL_LENGTH_WEST],
+        }
+    )
+
+    left_gdf = gpd.GeoDataFrame(df, geometry=Settings.BUFFERED_FIELD, crs=target_crs)
+    right_gdf = gpd.GeoDataFrame(df, geometry=Settings.GEOMETRY_FIELD, crs=target_crs)
+
+    return left_gdf, right_gdf
+
+
+def _join_pairs(
+    left_gdf: gpd.GeoDataFrame,
+    right_gdf: gpd.GeoDataFrame,
+    target: np.ndarray,
+    neighbor: np.ndarray,
+    lsuffix: str,
+    rsuffix: str,
+) -> gpd.GeoDataFrame:
+    """Rebuild the frame returned by `gpd.sjoin()` from the row positions of the joined targets and neighbors, in
+    the same row order: the target columns, the neighbor index, and the neighbor columns without the neighbor geometry,
+    with the suffixes added to the names they share."""
+
+    right_df = pd.DataFrame(right_gdf.drop(columns=right_gdf.geometry.name))
+    shared = left_gdf.columns.intersection(right_df.columns)
+
+    # positions of -1 mark targets without neighbors, which a left join keeps with missing neighbor values
+    left_part = pd.DataFrame(left_gdf).take(target).reset_index(drop=True)
+    right_part = right_df.reset_index(drop=True).reindex(neighbor).reset_index(drop=True)
+    index_right = pd.Series(right_gdf.index[np.maximum(neighbor, 0)], name=f"index_{rsuffix}")
+    if (neighbor < 0).any():
+        index_right = index_right.where(neighbor >= 0)
+
+    xdf = pd.concat(
+        [
+            left_part.rename(columns={column: f"{column}_{lsuffix}" for column in shared}),
+            index_right,
+            right_part.rename(columns={column: f"{column}_{rsuffix}" for column in shared}),
         ],
         axis=1,
+    ).set_index(left_gdf.index[target].rename(left_gdf.index.name))
+
+    geometry = left_gdf.geometry.name
+    if geometry in shared:
+        geometry = f"{geometry}_{lsuffix}"
+
+    return gpd.GeoDataFrame(xdf, geometry=geometry, crs=left_gdf.crs)
+
+
+def _with_neighbor_geometry(
+    xdf: gpd.GeoDataFrame, right_gdf: gpd.GeoDataFrame, join_rsuffix: str
+) -> gpd.GeoDataFrame:
+    """Add the neighbor building geometry to the spatially joined buildings and index them by neighbor ID."""
+
+    xdf = (
+        xdf.set_index(f"{Settings.ID_FIELD}_{join_rsuffix}")
+        .join(
+            right_gdf.set_index(Settings.ID_FIELD)[Settings.GEOMETRY_FIELD].rename(
+                Settings.NEIGHBOR_GEOMETRY_FIELD
+            )
+        )
+        .sort_index()
     )
+
+    return gpd.GeoDataFrame(xdf).set_geometry(Settings.GEOMETRY_FIELD)
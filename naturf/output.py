@@ -1,16 +1,26 @@
 import geopandas as gpd
 import numpy as np
+import os
 import pandas as pd
+from pyproj import Transformer
 from pyproj.crs import CRS
+import rasterio.features
+import shapely
 import struct
 import xarray as xr
 
-from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import List, Optional, Sequence, Tuple, Union
+from hamilton.function_modifiers import config
 from rasterio.enums import MergeAlg
+from shapely.geometry import mapping
 from geocube.api.core import make_geocube
+from geocube.geo_utils.geobox import GeoBoxMaker
 from geocube.rasterize import rasterize_image
 
 from .config import Settings
+from .grid import Grid
 
 
 def aggregate_rasters(rasterize_parameters: xr.Dataset) -> xr.Dataset:
@@ -45,8 +55,8 @@ def merge_parameters(
     macdonald_roughness_length: pd.DataFrame,
     macdonald_displacement_height: pd.Series,
     vertical_distribution_of_building_heights: pd.DataFrame,
-    building_geometry: pd.Series,
-    target_crs: CRS,
+    output_geometry: gpd.GeoSeries,
+    precision: str = Settings.DEFAULT_PRECISION,
 ) -> gpd.GeoDataFrame:
     """Merge all parameters into one Pandas DataFrame.
 
@@ -108,69 +118,82 @@ def merge_parameters(
     :param vertical_distribution_of_building_heights:  Distribution of building heights for each building ata each height increment.
     :type vertical_distribution_of_building_heights:   pd.DataFrame
 
-    :param building_geometry:                          Geometry field for the buildings.
-    :type building_geometry:                           pd.Series
+    :param output_geometry:                            Geometry of the buildings in Settings.OUTPUT_CRS.
+    :type output_geometry:                             gpd.GeoSeries
 
-    :param target_crs:                                 Coordinate reference system field of the parent geometry.
-    :type target_crs:                                  CRS
+    :param precision:                                  Float dtype of the parameter columns, "float64" or "float32".
+                                                       DEFAULT: "float64"
+    :type precision:                                   str
 
     :return:                                           Pandas DataFrame with all parameters merged together.
     """
 
-    df = pd.concat([frontal_area_density, plan_area_density, rooftop_area_density], axis=1)
-
-    df[Settings.PLAN_AREA_FRACTION] = plan_area_fraction
-    df[Settings.MEAN_BUILDING_HEIGHT] = mean_building_height
-    df[Settings.STANDARD_DEVIATION_OF_BUILDING_HEIGHTS] = standard_deviation_of_building_heights
-    df[Settings.AREA_WEIGHTED_MEAN_OF_BUILDING_HEIGHTS] = area_weighted_mean_of_building_heights
-    df[Settings.BUILDING_SURFACE_AREA_TO_PLAN_AREA_RATIO] = building_surface_area_to_plan_area_ratio
-
-    df = pd.concat([df, frontal_area_index], axis=1)
-
-    df[Settings.COMPLETE_ASPECT_RATIO] = complete_aspect_ratio
-    df[Settings.HEIGHT_TO_WIDTH_RATIO] = height_to_width_ratio
-    df[Settings.SKY_VIEW_FACTOR] = sky_view_factor
-    df[Settings.GRIMMOND_OKE_ROUGHNESS_LENGTH] = grimmond_oke_roughness_length
-    df[Settings.GRIMMOND_OKE_DISPLACEMENT_HEIGHT] = grimmond_oke_displacement_height
-
-    df[Settings.RAUPACH_ROUGHNESS_LENGTH_NORTH] = raupach_roughness_length[
-        Settings.RAUPACH_ROUGHNESS_LENGTH_NORTH
-    ]
-    df[Settings.RAUPACH_DISPLACEMENT_HEIGHT_NORTH] = raupach_displacement_height[
-        Settings.RAUPACH_DISPLACEMENT_HEIGHT_NORTH
-    ]
-    df[Settings.RAUPACH_ROUGHNESS_LENGTH_EAST] = raupach_roughness_length[
-        Settings.RAUPACH_ROUGHNESS_LENGTH_EAST
-    ]
-    df[Settings.RAUPACH_DISPLACEMENT_HEIGHT_EAST] = raupach_displacement_height[
-        Settings.RAUPACH_DISPLACEMENT_HEIGHT_EAST
+    # parameters to merge; each is a Series or a DataFrame whose columns are all used
+    parameters = [
+        frontal_area_density,
+        plan_area_density,
+        rooftop_area_density,
+        plan_area_fraction.rename(Settings.PLAN_AREA_FRACTION),
+        mean_building_height.rename(Settings.MEAN_BUILDING_HEIGHT),
+        standard_deviation_of_building_heights.rename(
+            Settings.STANDARD_DEVIATION_OF_BUILDING_HEIGHTS
+        ),
+        area_weighted_mean_of_building_heights.rename(
+            Settings.AREA_WEIGHTED_MEAN_OF_BUILDING_HEIGHTS
+        ),
+        building_surface_area_to_plan_area_ratio.rename(
+            Settings.BUILDING_SURFACE_AREA_TO_PLAN_AREA_RATIO
+        ),
+        frontal_area_index,
+        complete_aspect_ratio.rename(Settings.COMPLETE_ASPECT_RATIO),
+        height_to_width_ratio.rename(Settings.HEIGHT_TO_WIDTH_RATIO),
+        sky_view_factor.rename(Settings.SKY_VIEW_FACTOR),
+        grimmond_oke_roughness_length.rename(Settings.GRIMMOND_OKE_ROUGHNESS_LENGTH),
+        grimmond_oke_displacement_height.rename(Settings.GRIMMOND_OKE_DISPLACEMENT_HEIGHT),
     ]
-    df[Settings.RAUPACH_ROUGHNESS_LENGTH_SOUTH] = raupach_roughness_length[
-        Settings.RAUPACH_ROUGHNESS_LENGTH_SOUTH
+    raupach = pd.concat([raupach_roughness_length, raupach_displacement_height], axis=1)
+    parameters += [raupach[field] for field in Settings.RAUPACH_FIELDS]
+    parameters += [
+        macdonald_roughness_length,
+        macdonald_displacement_height.rename(Settings.MACDONALD_DISPLACEMENT_HEIGHT),
+        vertical_distribution_of_building_heights,
     ]
-    df[Settings.RAUPACH_DISPLACEMENT_HEIGHT_SOUTH] = raupach_displacement_height[
-        Settings.RAUPACH_DISPLACEMENT_HEIGHT_SOUTH
-    ]
-    df[Settings.RAUPACH_ROUGHNESS_LENGTH_WEST] = raupach_roughness_length[
-        Settings.RAUPACH_ROUGHNESS_LENGTH_WEST
-    ]
-    df[Settings.RAUPACH_DISPLACEMENT_HEIGHT_WEST] = raupach_displacement_height[
-        Settings.RAUPACH_DISPLACEMENT_HEIGHT_WEST
-    ]
-
-    df = pd.concat([df, macdonald_roughness_length], axis=1)
 
-    df[Settings.MACDONALD_DISPLACEMENT_HEIGHT] = macdonald_displacement_height
+    # Fill one preallocated block instead of growing a fragmented frame, placing each column at its level in
+    # `_parameter_columns()`, the order the reader also uses.
+    index = frontal_area_density.index
+    columns = _parameter_columns()
+    names = [
+        list(parameter.columns) if isinstance(parameter, pd.DataFrame) else [parameter.name]
+        for parameter in parameters
+    ]
+    if sorted(sum(names, [])) != sorted(columns):
+        raise ValueError(
+            "The merged parameters do not match the output levels: "
+            f"{sorted(set(sum(names, [])).symmetric_difference(columns))}"
+        )
+    position = {column: i for i, column in enumerate(columns)}
+    block = np.empty((len(index), len(columns)), dtype=precision)
 
-    df = pd.concat([df, vertical_distribution_of_building_heights], axis=1)
+    for parameter, parameter_names in zip(parameters, names):
+        if not parameter.index.equals(index):
+            parameter = parameter.reindex(index)
+        values = parameter.to_numpy(dtype=precision)
+        levels = [position[name] for name in parameter_names]
+        block[:, levels] = values.reshape(len(index), len(levels))
 
-    df[Settings.GEOMETRY_FIELD] = building_geometry
+    # the geometry is attached on its own so that the parameter block is never copied
+    geometry = output_geometry
+    if not geometry.index.equals(index):
+        geometry = geometry.reindex(index)
 
-    gdf = gpd.GeoDataFrame(df, geometry=Settings.GEOMETRY_FIELD, crs=target_crs)
+    df = pd.DataFrame(block, index=index, columns=columns, copy=False)
+    df[Settings.GEOMETRY_FIELD] = geometry.values
 
-    return gdf.to_crs(Settings.OUTPUT_CRS)
+    return gpd.GeoDataFrame(df, geometry=Settings.GEOMETRY_FIELD, copy=False)
 
 
+@config.when_not(engine="fast")
 def numpy_to_binary(raster_to_numpy: np.ndarray) -> bytes:
     """Turn the master numpy array containing all 132 aggregated parameters into a binary stream.
 
@@ -197,6 +220,62 @@ def numpy_to_binary(raster_to_numpy: np.ndarray) -> bytes:
     return master_out_final
 
 
+@config.when(engine="fast")
+def numpy_to_binary__fast(raster_to_numpy: np.ndarray) -> bytes:
+    """Turn the master numpy array containing all 132 aggregated parameters into a binary stream by converting the
+    whole array to 4 byte big-endian integers at once. The values are truncated toward zero as in `numpy_to_binary()`.
+
+    :param raster_to_numpy:         132 level numpy array with each level being an aggregated parameter.
+    :type raster_to_numpy:          np.ndarray
+
+    :return:                        Binary object containing the parameter data.
+    """
+
+    return np.asarray(raster_to_numpy).astype(">i4").tobytes()
+
+
+def output_bounds(output_geometry: gpd.GeoSeries) -> np.ndarray:
+    """Bounds of all buildings in Settings.OUTPUT_CRS, which is all that the index file needs from the geometry.
+
+    :param output_geometry:                 Geometry of the buildings in Settings.OUTPUT_CRS.
+    :type output_geometry:                  gpd.GeoSeries
+
+    :return:                                Array of minx, miny, maxx, maxy.
+    """
+
+    return output_geometry.total_bounds
+
+
+def output_geometry(building_geometry: pd.Series, target_crs: CRS) -> gpd.GeoSeries:
+    """Reproject the buildings to Settings.OUTPUT_CRS once, transforming the coordinates of all buildings in one
+    vectorized call with a cached transformer.
+
+    :param building_geometry:               Geometry field for the buildings.
+    :type building_geometry:                pd.Series
+
+    :param target_crs:                      Coordinate reference system field of the parent geometry.
+    :type target_crs:                       CRS
+
+    :return:                                GeoSeries of the buildings in Settings.OUTPUT_CRS.
+    """
+
+    source_crs = CRS.from_user_input(target_crs)
+    output_crs = CRS.from_user_input(Settings.OUTPUT_CRS)
+    geometry = np.asarray(building_geometry, dtype=object)
+
+    if source_crs != output_crs:
+        transformer = _transformer(source_crs, output_crs)
+        geometry = shapely.transform(
+            geometry,
+            lambda coords: np.column_stack(transformer.transform(coords[:, 0], coords[:, 1])),
+        )
+
+    return gpd.GeoSeries(
+        geometry, index=building_geometry.index, crs=output_crs, name=Settings.GEOMETRY_FIELD
+    )
+
+
+@config.when_not(streaming=True)
 def raster_to_numpy(aggregate_rasters: xr.Dataset) -> np.ndarray:
     """Stack all 132 rasterized parameters into one numpy array for conversion to a binary file.
 
@@ -219,21 +298,136 @@ def raster_to_numpy(aggregate_rasters: xr.Dataset) -> np.ndarray:
     return master * 10**Settings.SCALING_FACTOR
 
 
-def rasterize_parameters(merge_parameters: gpd.GeoDataFrame) -> xr.Dataset:
-    """Rasterize parameters in preparation for conversion to numpy arrays. Raster will be of resolution Settings.DEFAULT_OUTPUT_RESOLUTION
+@config.when(streaming=True)
+def raster_to_numpy__streaming(
+    merge_parameters: gpd.GeoDataFrame,
+    parameter_group_size: int = Settings.DEFAULT_PARAMETER_GROUP_SIZE,
+    building_chunk_size: int = Settings.DEFAULT_BUILDING_CHUNK_SIZE,
+    target_grid: Optional[Grid] = None,
+    output_resolution: Union[float, Sequence[float]] = Settings.DEFAULT_OUTPUT_RESOLUTION,
+    precision: str = Settings.DEFAULT_PRECISION,
+) -> np.ndarray:
+    """Rasterize, aggregate, and stack all parameters straight into one preallocated float32 array. Parameters are
+    rasterized in groups of `parameter_group_size` and buildings in chunks of `building_chunk_size`, so peak memory
+    is about the output array plus one group of float64 sums and one chunk of buildings. The grid and the resulting
+    values match `rasterize_parameters()`, `aggregate_rasters()`, and `raster_to_numpy()`.
+
+    :param merge_parameters:                Pandas.GeoDataFrame with all selected urban parameters for each building.
+    :type merge_parameters:                 Pandas.GeoDataFrame
+
+    :param parameter_group_size:            Number of parameters rasterized together before being averaged into the output.
+                                            DEFAULT: 16
+    :type parameter_group_size:             int
+
+    :param building_chunk_size:             Number of buildings rasterized at a time.
+                                            DEFAULT: 100000
+    :type building_chunk_size:              int
+
+    :param target_grid:                     Grid to rasterize onto instead of the grid fitted to the buildings.
+                                            DEFAULT: None
+    :type target_grid:                      Grid
+
+    :param output_resolution:               (y, x) size of an output cell in degrees, or a single size for both.
+                                            DEFAULT: Settings.DEFAULT_OUTPUT_RESOLUTION
+    :type output_resolution:                float, tuple
+
+    :param precision:                       Float dtype of the group sums, "float64" or "float32".
+                                            DEFAULT: "float64"
+    :type precision:                        str
+
+    :return:                                132 level numpy array with each level being an aggregated parameter.
+    """
+
+    vector_data = merge_parameters.set_geometry(Settings.GEOMETRY_FIELD)
+    parameters = [column for column in vector_data.columns if column != Settings.GEOMETRY_FIELD]
+
+    if target_grid is None:
+        geobox = GeoBoxMaker(
+            output_crs=None,
+            resolution=_resolution(output_resolution),
+            align=None,
+            geom=None,
+            like=None,
+        ).from_vector(vector_data)
+        shape = (geobox.height, geobox.width)
+        transform = geobox.affine
+    else:
+        vector_data = vector_data.to_crs(target_grid.crs)
+        shape = target_grid.shape
+        transform = target_grid.transform
+
+    rasterize = partial(
+        rasterio.features.rasterize,
+        transform=transform,
+        all_touched=True,
+        merge_alg=MergeAlg.add,
+    )
+
+    building_count = np.zeros(shape, dtype=np.float64)
+    master = np.zeros((len(parameters), *shape), dtype=np.float32)
+
+    for group_start in range(0, len(parameters), parameter_group_size):
+        group = parameters[group_start : group_start + parameter_group_size]
+        group_sum = np.zeros((len(group), *shape), dtype=precision)
+
+        for chunk_start in range(0, len(vector_data.index), building_chunk_size):
+            chunk = vector_data.iloc[chunk_start : chunk_start + building_chunk_size]
+            shapes = [mapping(geometry) for geometry in chunk.geometry]
+            values = chunk[group].to_numpy(dtype=precision)
+
+            if group_start == 0:
+                rasterize(((geometry, 1) for geometry in shapes), out=building_count)
+            for i in range(len(group)):
+                rasterize(zip(shapes, values[:, i]), out=group_sum[i])
+
+            del chunk, shapes, values
+
+        # Average each cell over the buildings within it, leaving empty cells at the fill value.
+        np.divide(group_sum, building_count, out=group_sum, where=building_count > 0)
+        master[group_start : group_start + len(group)] = group_sum
+        del group_sum
+
+    master *= 10**Settings.SCALING_FACTOR
+
+    return master
+
+
+@config.when_not(engine="fast")
+def rasterize_parameters(
+    merge_parameters: gpd.GeoDataFrame,
+    target_grid: Optional[Grid] = None,
+    output_resolution: Union[float, Sequence[float]] = Settings.DEFAULT_OUTPUT_RESOLUTION,
+) -> xr.Dataset:
+    """Rasterize parameters in preparation for conversion to numpy arrays. Raster will be of resolution `output_resolution`
     and each cell will be the sum of each parameter value within. By default all_touched is True so that every building that is within a cell is
-    included in the sum.
+    included in the sum. If `target_grid` is given, the buildings are reprojected and burned directly onto that grid instead.
 
     :param merge_parameters:             Pandas.GeoDataFrame with all selected urban parameters for each building.
     :type merge_parameters:              Pandas.GeoDataFrame
 
+    :param target_grid:                  Grid to rasterize onto, such as a WRF domain from `Grid.from_namelist()`.
+                                         DEFAULT: None
+    :type target_grid:                   Grid
+
+    :param output_resolution:            (y, x) size of an output cell in degrees, or a single size for both.
+                                         DEFAULT: Settings.DEFAULT_OUTPUT_RESOLUTION
+    :type output_resolution:             float, tuple
+
     :return:                             Xr.Dataset containing rasterization of selected urban parameters.
     """
 
-    merge_parameters["building_count"] = 1
-    resolution = Settings.DEFAULT_OUTPUT_RESOLUTION
+    resolution = _resolution(output_resolution)
     fill = Settings.DEFAULT_FILL_VALUE
     vector_data = merge_parameters.set_geometry(Settings.GEOMETRY_FIELD).rename_geometry("geometry")
+    vector_data["building_count"] = 1
+
+    if target_grid is not None:
+        return make_geocube(
+            vector_data=vector_data,
+            like=target_grid.template(),
+            fill=fill,
+            rasterize_function=partial(rasterize_image, all_touched=True, merge_alg=MergeAlg.add),
+        )
 
     return make_geocube(
         vector_data=vector_data,
@@ -243,40 +437,508 @@ def rasterize_parameters(merge_parameters: gpd.GeoDataFrame) -> xr.Dataset:
     )
 
 
+@config.when(engine="fast")
+def rasterize_parameters__fast(
+    merge_parameters: gpd.GeoDataFrame,
+    target_grid: Optional[Grid] = None,
+    output_resolution: Union[float, Sequence[float]] = Settings.DEFAULT_OUTPUT_RESOLUTION,
+) -> xr.Dataset:
+    """Rasterize parameters as in `rasterize_parameters()`, converting the building geometries to GeoJSON-like
+    mappings once and reusing them for every parameter instead of converting them again for each raster.
+
+    :param merge_parameters:             Pandas.GeoDataFrame with all selected urban parameters for each building.
+    :type merge_parameters:              Pandas.GeoDataFrame
+
+    :param target_grid:                  Grid to rasterize onto, such as a WRF domain from `Grid.from_namelist()`.
+                                         DEFAULT: None
+    :type target_grid:                   Grid
+
+    :param output_resolution:            (y, x) size of an output cell in degrees, or a single size for both.
+                                         DEFAULT: Settings.DEFAULT_OUTPUT_RESOLUTION
+    :type output_resolution:             float, tuple
+
+    :return:                             Xr.Dataset containing rasterization of selected urban parameters.
+    """
+
+    vector_data = merge_parameters.set_geometry(Settings.GEOMETRY_FIELD).rename_geometry("geometry")
+    vector_data["building_count"] = 1
+
+    geometry = vector_data.geometry
+    if target_grid is not None:
+        geometry = geometry.to_crs(target_grid.crs)
+    shapes = pd.Series([mapping(shape) for shape in geometry], index=vector_data.index)
+
+    def rasterize_function(geometry_array, **kwargs):
+        return rasterize_image(
+            geometry_array=shapes, all_touched=True, merge_alg=MergeAlg.add, **kwargs
+        )
+
+    if target_grid is not None:
+        return make_geocube(
+            vector_data=vector_data,
+            like=target_grid.template(),
+            fill=Settings.DEFAULT_FILL_VALUE,
+            rasterize_function=rasterize_function,
+        )
+
+    return make_geocube(
+        vector_data=vector_data,
+        resolution=_resolution(output_resolution),
+        fill=Settings.DEFAULT_FILL_VALUE,
+        rasterize_function=rasterize_function,
+    )
+
+
 def write_index(
     raster_to_numpy: np.ndarray,
-    building_geometry: pd.Series,
-    target_crs: CRS,
+    output_bounds: np.ndarray,
     index_filename: str = "index",
+    target_grid: Optional[Grid] = None,
+    output_resolution: Union[float, Sequence[float]] = Settings.DEFAULT_OUTPUT_RESOLUTION,
+    output_directory: str = ".",
 ) -> str:
     """Write the index file that will accompany the output binary file.
 
     :param raster_to_numpy:                 132 level numpy array with each level being an aggregated parameter.
     :type raster_to_numpy:                  np.ndarray
 
-    :param building_geometry:               Geometry field for the buildings.
-    :type building_geometry:                pd.Series
+    :param output_bounds:                   Bounds of all buildings in Settings.OUTPUT_CRS.
+    :type output_bounds:                    np.ndarray
 
-    :param target_crs:                      Coordinate reference system field of the parent geometry.
-    :type target_crs:                       crs
+    :param target_grid:                     Grid the parameters were rasterized onto. If given, the projection, grid
+                                            spacing, and known point are taken from the grid instead of the buildings.
+                                            DEFAULT: None
+    :type target_grid:                      Grid
+
+    :param output_resolution:               (y, x) size of an output cell in degrees, or a single size for both.
+                                            DEFAULT: Settings.DEFAULT_OUTPUT_RESOLUTION
+    :type output_resolution:                float, tuple
+
+    :param output_directory:                Directory the index file is written to.
+                                            DEFAULT: "."
+    :type output_directory:                 str
+
+    :return:                                Path of the written file.
     """
 
-    dy = float(Settings.DEFAULT_OUTPUT_RESOLUTION[0])
-    dx = float(Settings.DEFAULT_OUTPUT_RESOLUTION[1])
+    index_filename = os.path.join(output_directory, index_filename)
+
+    tile_x = raster_to_numpy.shape[2]
+    tile_y = raster_to_numpy.shape[1]
+
+    _write_index_file(
+        index_filename,
+        *_index_georeference(output_bounds, target_grid, output_resolution),
+        tile_x,
+        tile_y,
+    )
+
+    return index_filename
+
+
+def write_tiled_index(
+    output_bounds: np.ndarray,
+    index_filename: str = "index",
+    target_grid: Optional[Grid] = None,
+    output_resolution: Union[float, Sequence[float]] = Settings.DEFAULT_OUTPUT_RESOLUTION,
+    output_directory: str = ".",
+    tile_x: int = Settings.DEFAULT_TILE_SIZE,
+    tile_y: int = Settings.DEFAULT_TILE_SIZE,
+) -> str:
+    """Write the index file that will accompany the tiles from `write_tiled_binary()`.
+
+    :param output_bounds:                   Bounds of all buildings in Settings.OUTPUT_CRS.
+    :type output_bounds:                    np.ndarray
+
+    :param target_grid:                     Grid the parameters were rasterized onto. If given, the projection, grid
+                                            spacing, and known point are taken from the grid instead of the buildings.
+                                            DEFAULT: None
+    :type target_grid:                      Grid
+
+    :param output_resolution:               (y, x) size of an output cell in degrees, or a single size for both.
+                                            DEFAULT: Settings.DEFAULT_OUTPUT_RESOLUTION
+    :type output_resolution:                float, tuple
 
-    building_geometry = gpd.GeoSeries(building_geometry, crs=target_crs)
+    :param output_directory:                Directory the index file is written to.
+                                            DEFAULT: "."
+    :type output_directory:                 str
 
-    building_geometry_project = building_geometry.to_crs(crs=4326)
+    :param tile_x:                          Number of columns in each tile.
+                                            DEFAULT: 1000
+    :type tile_x:                           int
+
+    :param tile_y:                          Number of rows in each tile.
+                                            DEFAULT: 1000
+    :type tile_y:                           int
+
+    :return:                                Path of the written file.
+    """
+
+    index_filename = os.path.join(output_directory, index_filename)
+
+    _write_index_file(
+        index_filename,
+        *_index_georeference(output_bounds, target_grid, output_resolution),
+        tile_x,
+        tile_y,
+    )
+
+    return index_filename
+
+
+def write_tiled_binary(
+    raster_to_numpy: np.ndarray,
+    output_directory: str = ".",
+    tile_x: int = Settings.DEFAULT_TILE_SIZE,
+    tile_y: int = Settings.DEFAULT_TILE_SIZE,
+    tile_workers: Optional[int] = None,
+) -> List[str]:
+    """Write the parameters as geogrid tiles of `tile_y` rows by `tile_x` columns, each named after the range of
+    grid cells it covers. Tiles are written concurrently from views of the array. Tiles on the north and east edges
+    are padded with Settings.DEFAULT_FILL_VALUE to the full tile size, so cropping them to the domain reconstructs
+    the binary file from `write_binary()`.
+
+    :param raster_to_numpy:                 132 level numpy array with each level being an aggregated parameter.
+    :type raster_to_numpy:                  np.ndarray
 
-    bounds = building_geometry_project.total_bounds
+    :param output_directory:                Directory the tiles are written to.
+                                            DEFAULT: "."
+    :type output_directory:                 str
+
+    :param tile_x:                          Number of columns in each tile.
+                                            DEFAULT: 1000
+    :type tile_x:                           int
+
+    :param tile_y:                          Number of rows in each tile.
+                                            DEFAULT: 1000
+    :type tile_y:                           int
+
+    :param tile_workers:                    Number of threads writing tiles. By default the thread pool chooses.
+                                            DEFAULT: None
+    :type tile_workers:                     int
+
+    :return:                                Paths of the written tiles.
+    """
+
+    levels, rows, cols = raster_to_numpy.shape
+
+    def write_tile(first_row: int, first_col: int) -> str:
+        view = raster_to_numpy[:, first_row : first_row + tile_y, first_col : first_col + tile_x]
+        tile = np.full((levels, tile_y, tile_x), Settings.DEFAULT_FILL_VALUE, dtype=">i4")
+        tile[:, : view.shape[1], : view.shape[2]] = view
+
+        filename = _tile_filename(
+            first_row + 1, first_row + tile_y, first_col + 1, first_col + tile_x
+        )
+        path = os.path.join(output_directory, filename)
+        with open(path, "wb") as tile_file:
+            tile.tofile(tile_file)
+
+        return path
+
+    with ThreadPoolExecutor(max_workers=tile_workers) as executor:
+        futures = [
+            executor.submit(write_tile, first_row, first_col)
+            for first_row in range(0, rows, tile_y)
+            for first_col in range(0, cols, tile_x)
+        ]
+        return [future.result() for future in futures]
+
+
+def write_parameters(
+    merge_parameters: gpd.GeoDataFrame,
+    output_directory: str = ".",
+    parameters_filename: str = "parameters.parquet",
+    parquet_row_group_size: int = Settings.DEFAULT_PARQUET_ROW_GROUP_SIZE,
+) -> str:
+    """Write the parameters of every building to GeoParquet so that they can be rasterized again with
+    `Model.from_parameters()` without recomputing them. Buildings are sorted along a Hilbert curve so that each row
+    group covers a compact area and its bounding box statistics let readers skip row groups outside a region.
+    Requires the optional `pyarrow` package.
+
+    :param merge_parameters:                Pandas.GeoDataFrame with all selected urban parameters for each building.
+    :type merge_parameters:                 Pandas.GeoDataFrame
+
+    :param output_directory:                Directory the GeoParquet file is written to.
+                                            DEFAULT: "."
+    :type output_directory:                 str
+
+    :param parameters_filename:             Name of the GeoParquet file.
+                                            DEFAULT: "parameters.parquet"
+    :type parameters_filename:              str
+
+    :param parquet_row_group_size:          Number of buildings in each row group.
+                                            DEFAULT: 100000
+    :type parquet_row_group_size:           int
+
+    :return:                                Path of the written file.
+    """
+
+    path = os.path.join(output_directory, parameters_filename)
+
+    order = np.argsort(merge_parameters.geometry.hilbert_distance().to_numpy(), kind="stable")
+    parameters = merge_parameters.iloc[order]
+
+    # the bounds of each building are stored as columns so that the row group statistics describe its extent
+    bounds = parameters.geometry.bounds.to_numpy()
+    parameters = parameters.assign(
+        **{field: bounds[:, i] for i, field in enumerate(Settings.GEOMETRY_BOUNDS_FIELDS)}
+    )
+
+    parameters.to_parquet(path, row_group_size=parquet_row_group_size)
+
+    return path
+
+
+def write_dataset(
+    aggregate_rasters: xr.Dataset,
+    output_directory: str = ".",
+    dataset_format: str = "zarr",
+    dataset_filename: Optional[str] = None,
+    dataset_chunk_size: int = Settings.DEFAULT_DATASET_CHUNK_SIZE,
+    compression_level: int = Settings.DEFAULT_COMPRESSION_LEVEL,
+) -> str:
+    """Write the aggregated rasters to a chunked, compressed Zarr store or NetCDF4 file with one named variable per
+    parameter, the x and y coordinates, and the CRS. Variables are written one at a time so that only a single
+    layer is encoded at once. Requires the optional `zarr` or `netCDF4` package.
+
+    :param aggregate_rasters:               Dataset with rasterized parameter values averaged at the defined resolution.
+    :type aggregate_rasters:                xr.Dataset
+
+    :param output_directory:                Directory the dataset is written to.
+                                            DEFAULT: "."
+    :type output_directory:                 str
+
+    :param dataset_format:                  Either "zarr" or "netcdf".
+                                            DEFAULT: "zarr"
+    :type dataset_format:                   str
+
+    :param dataset_filename:                Name of the store or file. By default "naturf.zarr" or "naturf.nc".
+                                            DEFAULT: None
+    :type dataset_filename:                 str
+
+    :param dataset_chunk_size:              Number of cells along each side of a chunk.
+                                            DEFAULT: 512
+    :type dataset_chunk_size:               int
+
+    :param compression_level:               Compression level of the NetCDF4 zlib filter. Zarr stores use the default
+                                            compressor of the installed zarr version.
+                                            DEFAULT: 4
+    :type compression_level:                int
+
+    :return:                                Path of the written dataset.
+    """
+
+    if dataset_format not in ("zarr", "netcdf"):
+        raise ValueError(f"Unknown dataset format '{dataset_format}', expected 'zarr' or 'netcdf'.")
+
+    if dataset_filename is None:
+        dataset_filename = "naturf.zarr" if dataset_format == "zarr" else "naturf.nc"
+    path = os.path.join(output_directory, dataset_filename)
+
+    chunks = tuple(min(dataset_chunk_size, aggregate_rasters.sizes[dim]) for dim in ("y", "x"))
+
+    # start from the coordinates and CRS alone, then append the variables one by one
+    coordinates = xr.Dataset(coords=aggregate_rasters.coords)
+    if dataset_format == "zarr":
+        coordinates.to_zarr(path, mode="w")
+    else:
+        coordinates.to_netcdf(path, mode="w", format="NETCDF4")
+
+    for name, variable in aggregate_rasters.data_vars.items():
+        # zero is a valid parameter value, so it is not marked as missing; empty cells have a building count of zero
+        variable = variable.copy()
+        variable.attrs.pop("_FillValue", None)
+        encoding = {
+            "chunks" if dataset_format == "zarr" else "chunksizes": chunks,
+            "_FillValue": None,
+        }
+        if dataset_format == "netcdf":
+            encoding.update(zlib=True, complevel=compression_level)
+
+        layer = variable.to_dataset(name=name)
+        if dataset_format == "zarr":
+            layer.to_zarr(path, mode="a", encoding={name: encoding})
+        else:
+            layer.to_netcdf(path, mode="a", encoding={name: encoding})
+
+    return path
+
+
+@config.when_not(streaming=True)
+def write_binary(
+    numpy_to_binary: bytes, raster_to_numpy: np.ndarray, output_directory: str = "."
+) -> str:
+    """Write the binary file that will be input to WRF.
+
+    :param numpy_to_binary:                 Binary object containing the parameter data.
+    :type numpy_to_binary:                  bytes
+
+    :param raster_to_numpy:                 132 level numpy array with each level being an aggregated parameter.
+    :type raster_to_numpy:                  np.ndarray
+
+    :param output_directory:                Directory the binary file is written to.
+                                            DEFAULT: "."
+    :type output_directory:                 str
+
+    :return:                                Path of the written file.
+    """
+
+    rows = raster_to_numpy.shape[1]
+    cols = raster_to_numpy.shape[2]
+    path = os.path.join(output_directory, _binary_filename(rows, cols))
+
+    with open(path, "wb") as tile:
+        tile.write(numpy_to_binary)
+        tile.close()
+
+    return path
+
+
+@config.when(streaming=True)
+def write_binary__streaming(raster_to_numpy: np.ndarray, output_directory: str = ".") -> str:
+    """Write the binary file that will be input to WRF one level at a time, so that only a single level is converted
+    to big-endian integers at once instead of the whole array.
+
+    :param raster_to_numpy:                 132 level numpy array with each level being an aggregated parameter.
+    :type raster_to_numpy:                  np.ndarray
+
+    :param output_directory:                Directory the binary file is written to.
+                                            DEFAULT: "."
+    :type output_directory:                 str
+
+    :return:                                Path of the written file.
+    """
+
+    rows = raster_to_numpy.shape[1]
+    cols = raster_to_numpy.shape[2]
+    path = os.path.join(output_directory, _binary_filename(rows, cols))
+
+    with open(path, "wb") as tile:
+        for level in raster_to_numpy:
+            level.astype(">i4").tofile(tile)
+
+    return path
+
+
+def _parameter_columns() -> List[str]:
+    """Names of the columns of `merge_parameters()`, in the order of the levels of the output binary."""
+
+    heights = range(Settings.MAX_BUILDING_HEIGHT // Settings.BUILDING_HEIGHT_INTERVAL)
+
+    return (
+        [
+            f"{frontal_area}_{height}"
+            for frontal_area in [
+                Settings.FRONTAL_AREA_NORTH,
+                Settings.FRONTAL_AREA_EAST,
+                Settings.FRONTAL_AREA_SOUTH,
+                Settings.FRONTAL_AREA_WEST,
+            ]
+            for height in heights
+        ]
+        + [f"{Settings.PLAN_AREA_DENSITY}_{height}" for height in heights]
+        + [f"{Settings.ROOFTOP_AREA_DENSITY}_{height}" for height in heights]
+        + [
+            Settings.PLAN_AREA_FRACTION,
+            Settings.MEAN_BUILDING_HEIGHT,
+            Settings.STANDARD_DEVIATION_OF_BUILDING_HEIGHTS,
+            Settings.AREA_WEIGHTED_MEAN_OF_BUILDING_HEIGHTS,
+            Settings.BUILDING_SURFACE_AREA_TO_PLAN_AREA_RATIO,
+            Settings.FRONTAL_AREA_INDEX_NORTH,
+            Settings.FRONTAL_AREA_INDEX_EAST,
+            Settings.FRONTAL_AREA_INDEX_SOUTH,
+            Settings.FRONTAL_AREA_INDEX_WEST,
+            Settings.COMPLETE_ASPECT_RATIO,
+            Settings.HEIGHT_TO_WIDTH_RATIO,
+            Settings.SKY_VIEW_FACTOR,
+            Settings.GRIMMOND_OKE_ROUGHNESS_LENGTH,
+            Settings.GRIMMOND_OKE_DISPLACEMENT_HEIGHT,
+        ]
+        + Settings.RAUPACH_FIELDS
+        + [
+            Settings.MACDONALD_ROUGHNESS_LENGTH_NORTH,
+            Settings.MACDONALD_ROUGHNESS_LENGTH_EAST,
+            Settings.MACDONALD_ROUGHNESS_LENGTH_SOUTH,
+            Settings.MACDONALD_ROUGHNESS_LENGTH_WEST,
+            Settings.MACDONALD_DISPLACEMENT_HEIGHT,
+        ]
+        + [f"{Settings.VERTICAL_DISTRIBUTION_OF_BUILDING_HEIGHTS}_{height}" for height in heights]
+    )
+
+
+def _binary_filename(rows: int, cols: int) -> str:
+    """Name of the WRF binary file covering `rows` by `cols` cells."""
+
+    return _tile_filename(1, rows, 1, cols)
+
+
+def _tile_filename(first_row: int, last_row: int, first_col: int, last_col: int) -> str:
+    """Name of the geogrid tile covering the 1-based, inclusive range of rows and columns."""
+
+    first_y_index = "{:05d}".format(first_row)
+    second_y_index = "{:05d}".format(last_row)
+
+    first_x_index = "{:05d}".format(first_col)
+    second_x_index = "{:05d}".format(last_col)
+
+    return first_x_index + "-" + second_x_index + "." + first_y_index + "-" + second_y_index
+
+
+def _index_georeference(
+    output_bounds: np.ndarray,
+    target_grid: Optional[Grid],
+    output_resolution: Union[float, Sequence[float]],
+) -> tuple:
+    """Projection entries, dx, dy, known_lat, and known_lon of the index file, taken from the target grid if there is
+    one and otherwise from the bounds of the buildings."""
+
+    if target_grid is not None:
+        dx, dy = target_grid.resolution
+        known_lat, known_lon = target_grid.known_point()
+        return target_grid.index_projection(), dx, dy, known_lat, known_lon
+
+    dy, dx = _resolution(output_resolution)
+
+    bounds = output_bounds
 
     known_lat = bounds[1]
     known_lon = bounds[0]
 
     stdlon = (bounds[0] + bounds[2]) / 2
 
-    tile_x = raster_to_numpy.shape[2]
-    tile_y = raster_to_numpy.shape[1]
+    projection = {
+        "projection": "albers_nad83",
+        "truelat1": 45.5,
+        "truelat2": 29.5,
+        "stdlon": stdlon,
+    }
+
+    return projection, dx, dy, known_lat, known_lon
+
+
+@lru_cache(maxsize=None)
+def _transformer(source_crs: CRS, output_crs: CRS) -> Transformer:
+    """Transformer between two CRSs, created once per pair."""
+
+    return Transformer.from_crs(source_crs, output_crs, always_xy=True)
+
+
+def _write_index_file(
+    index_filename: str,
+    projection: dict,
+    dx: float,
+    dy: float,
+    known_lat: float,
+    known_lon: float,
+    tile_x: int,
+    tile_y: int,
+) -> None:
+    """Write a geogrid index file. `projection` holds the `projection` entry and whichever of `truelat1`,
+    `truelat2`, and `stdlon` the projection needs."""
+
+    projection = dict(projection)
+    projection_name = projection.pop("projection")
 
     scale_factor = 10**-Settings.SCALING_FACTOR
 
@@ -284,7 +946,7 @@ def write_index(
         index.writelines(
             [
                 "type=continuous\n",
-                "  projection=albers_nad83\n",
+                "  projection=" + projection_name + "\n",
                 "  missing_value=-999900.\n",
                 "  dy=" + str(dy) + "\n",
                 "  dx=" + str(dx) + "\n",
@@ -292,9 +954,9 @@ def write_index(
                 "  known_y=1\n",
                 "  known_lat=" + str(known_lat) + "\n",
                 "  known_lon=" + str(known_lon) + "\n",
-                "  truelat1=45.5\n",
-                "  truelat2=29.5\n",
-                "  stdlon=" + str(stdlon) + "\n",
+            ]
+            + ["  " + key + "=" + str(value) + "\n" for key, value in projection.items()]
+            + [
                 "  wordsize=4\n",
                 "  endian=big\n",
                 "  signed=no\n",
@@ -308,29 +970,10 @@ def write_index(
         )
 
 
-def write_binary(numpy_to_binary: bytes, raster_to_numpy: np.ndarray) -> None:
-    """Write the binary file that will be input to WRF.
+def _resolution(output_resolution: Union[float, Sequence[float]]) -> Tuple[float, float]:
+    """(y, x) output cell size from a single size or a pair of sizes."""
 
-    :param numpy_to_binary:                 Binary object containing the parameter data.
-    :type numpy_to_binary:                  bytes
+    if np.isscalar(output_resolution):
+        return float(output_resolution), float(output_resolution)
 
-    :param raster_to_numpy:                 132 level numpy array with each level being an aggregated parameter.
-    :type raster_to_numpy:                  np.ndarray
-    """
-
-    rows = raster_to_numpy.shape[1]
-    cols = raster_to_numpy.shape[2]
-
-    first_y_index = "{:05d}".format(1)
-    second_y_index = "{:05d}".format(rows)
-
-    first_x_index = "{:05d}".format(1)
-    second_x_index = "{:05d}".format(cols)
-
-    out_binary_name = (
-        first_x_index + "-" + second_x_index + "." + first_y_index + "-" + second_y_index
-    )
-
-    with open(out_binary_name, "wb") as tile:
-        tile.write(numpy_to_binary)
-        tile.close()
+    return float(output_resolution[0]), float(output_resolution[1])
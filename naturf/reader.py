@@ -0,0 +1,163 @@
+import os
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .config import Settings
+from .output import _binary_filename, _parameter_columns
+
+
+def read_index(index_filename: str) -> dict:
+    """Parse a geogrid index file such as the one written by `write_index()`.
+
+    :param index_filename:                  Full path with file name to the index file.
+    :type index_filename:                   str
+
+    :return:                                Dictionary of index entries with numbers converted to int or float.
+    """
+
+    index = {}
+
+    with open(index_filename) as index_file:
+        for line in index_file:
+            if "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            index[key.strip()] = _index_value(value.strip().strip('"'))
+
+    return index
+
+
+def level_names() -> List[str]:
+    """Names of the 132 parameters in the order of the levels of the output binary, which is also the order of the
+    columns of `merge_parameters()`."""
+
+    return _parameter_columns()
+
+
+class BinaryOutput:
+    """Read-only view of a binary file written by `write_binary()` and its index file. The binary is memory mapped,
+    so levels and regions are only read from disk, and scaled by the index `scale_factor`, when they are indexed.
+
+    :param index_filename:                  Full path with file name to the index file.
+    :type index_filename:                   str
+
+    :param binary_filename:                 Full path with file name to the binary file. By default the file named
+                                            after the `tile_x` and `tile_y` of the index in the index's directory.
+                                            DEFAULT: None
+    :type binary_filename:                  str
+
+    """
+
+    def __init__(self, index_filename: str, binary_filename: Optional[str] = None):
+        self.index = read_index(index_filename)
+        self.shape = (self.index["tile_z"], self.index["tile_y"], self.index["tile_x"])
+        self.scale_factor = float(self.index.get("scale_factor", 1))
+
+        if binary_filename is None:
+            binary_filename = os.path.join(
+                os.path.dirname(index_filename), _binary_filename(self.shape[1], self.shape[2])
+            )
+        self.binary_filename = binary_filename
+
+        if self.index.get("endian", "big") != "big" or self.index.get("wordsize", 4) != 4:
+            raise ValueError("Only 4 byte big-endian binary files can be read.")
+
+        self.raw = np.memmap(binary_filename, dtype=">i4", mode="r", shape=self.shape)
+
+        names = level_names()
+        self.parameters = names if len(names) == self.shape[0] else list(range(self.shape[0]))
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, key) -> np.ndarray:
+        """Scaled float64 values of the indexed levels, rows, and columns."""
+
+        return self.raw[key] * self.scale_factor
+
+    def level(self, parameter: Union[int, str]) -> np.ndarray:
+        """Scaled float64 values of one level, selected by position or parameter name."""
+
+        if isinstance(parameter, str):
+            parameter = self.parameters.index(parameter)
+
+        return self[parameter]
+
+
+def compare_outputs(
+    expected: BinaryOutput,
+    actual: BinaryOutput,
+    block_rows: int = Settings.DEFAULT_COMPARE_BLOCK_ROWS,
+    rtol: float = Settings.DEFAULT_COMPARE_RTOL,
+    atol: float = Settings.DEFAULT_COMPARE_ATOL,
+) -> pd.DataFrame:
+    """Compare two outputs level by level, reading `block_rows` rows of one level at a time so that memory stays
+    bounded regardless of the size of the outputs. A cell differs when its scaled values are not within
+    `atol + rtol * abs(actual)` of each other, as in `np.isclose()`, so that rounding to the scaled integers of the
+    binary, as in float32 or fast engine runs, is not reported by default.
+
+    :param expected:                        Reference output.
+    :type expected:                         BinaryOutput
+
+    :param actual:                          Output compared against the reference.
+    :type actual:                           BinaryOutput
+
+    :param block_rows:                      Number of rows of a level read at once.
+                                            DEFAULT: 1024
+    :type block_rows:                       int
+
+    :param rtol:                            Relative tolerance of a cell.
+                                            DEFAULT: 1e-5
+    :type rtol:                             float
+
+    :param atol:                            Absolute tolerance of a cell, by default one unit of the 0.0001 scale
+                                            factor.
+                                            DEFAULT: 1e-4
+    :type atol:                             float
+
+    :return:                                Pandas DataFrame indexed by parameter with the maximum and mean absolute
+                                            difference and the number of cells differing beyond the tolerance.
+    """
+
+    if expected.shape != actual.shape:
+        raise ValueError(f"Output shapes differ: {expected.shape} and {actual.shape}.")
+
+    levels, rows, cols = expected.shape
+    max_abs_diff = np.zeros(levels)
+    sum_abs_diff = np.zeros(levels)
+    differing_cells = np.zeros(levels, dtype=np.int64)
+
+    for level in range(levels):
+        for first_row in range(0, rows, block_rows):
+            block = np.s_[level, first_row : first_row + block_rows]
+            expected_block, actual_block = expected[block], actual[block]
+            abs_diff = np.abs(expected_block - actual_block)
+            if abs_diff.size:
+                max_abs_diff[level] = max(max_abs_diff[level], abs_diff.max())
+            sum_abs_diff[level] += abs_diff.sum()
+            differing_cells[level] += np.count_nonzero(
+                ~np.isclose(expected_block, actual_block, rtol, atol)
+            )
+
+    return pd.DataFrame(
+        {
+            "max_abs_diff": max_abs_diff,
+            "mean_abs_diff": sum_abs_diff / max(rows * cols, 1),
+            "differing_cells": differing_cells,
+        },
+        index=pd.Index(expected.parameters, name="parameter"),
+    )
+
+
+def _index_value(value: str) -> Union[int, float, str]:
+    """Convert an index value to an int or float when possible."""
+
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+
+    return value
@@ -0,0 +1,331 @@
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+from .driver import Model
+
+# driver of a worker process, built once by `_start_worker()` and reused by every job the process runs
+_DRIVER = None
+# start time of each job taken by a worker, by job ID, shared with the queue by `_start_worker()`
+_STARTED = None
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while `max_queued` jobs are already waiting."""
+
+
+class JobQueue:
+    """Run jobs in a pool of `workers` processes that are started, and have their driver built, up front. A job
+    computes the `outputs` of one input shapefile into an output directory with the given node `inputs`. At most
+    `workers` jobs run at once and at most `max_queued` wait for a worker. The configuration of the model, such as
+    the engine, is fixed for the pool, and `inputs` are the node inputs of every job unless the job overrides them.
+
+    :param workers:                         Number of worker processes.
+                                            DEFAULT: 1
+    :type workers:                          int
+
+    :param max_queued:                      Number of jobs that can wait for a worker before submissions are refused.
+                                            DEFAULT: 100
+    :type max_queued:                       int
+
+    :param inputs:                          Node inputs shared by every job, such as `radius`.
+                                            DEFAULT: None
+    :type inputs:                           dict
+
+    :param kwargs:                          Options of `Model`, such as `engine`.
+
+    """
+
+    def __init__(
+        self, workers: int = 1, max_queued: int = 100, inputs: Optional[dict] = None, **kwargs
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.inputs = dict(inputs or {})
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+        # the executor already reports a future as running while it waits in its call queue, so the workers record
+        # the jobs they actually start in a dictionary shared through a manager process
+        self._manager = multiprocessing.Manager()
+        self._started = self._manager.dict()
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_start_worker, initargs=(kwargs, self._started)
+        )
+
+        # every submission while no worker is idle starts another process, so these start the whole pool
+        wait([self._executor.submit(os.getpid) for _ in range(workers)])
+
+    def submit(self, job: dict) -> dict:
+        """Queue a job and return its record.
+
+        :param job:                         Job with the `input_shapefile` and `output_directory` to write to, and
+                                            optionally the `outputs` to compute and the node `inputs`.
+        :type job:                          dict
+
+        :return:                            Record of the job with its `id` and `status`.
+        """
+
+        missing = [field for field in ("input_shapefile", "output_directory") if field not in job]
+        if missing:
+            raise ValueError(f"Job without {', '.join(missing)}.")
+
+        job = {
+            "input_shapefile": os.path.abspath(job["input_shapefile"]),
+            "output_directory": os.path.abspath(job["output_directory"]),
+            "outputs": list(job.get("outputs", ["write_binary", "write_index"])),
+            "inputs": {**self.inputs, **job.get("inputs", {})},
+        }
+
+        with self._lock:
+            if self.counts()["queued"] >= self.max_queued:
+                raise QueueFullError(f"{self.max_queued} jobs are already queued.")
+            job_id = str(next(self._ids))
+            self.jobs[job_id] = {
+                "id": job_id,
+                **job,
+                "submitted": time.time(),
+                "future": self._executor.submit(_run_job, job_id, job),
+            }
+
+        return self.record(job_id)
+
+    def record(self, job_id: str, wait_for: bool = False, timeout: Optional[float] = None) -> dict:
+        """Return the record of a job: its status (queued, running, done, or failed), and once finished the
+        written files, the seconds it waited for a worker and ran, or the error.
+
+        :param job_id:                      ID of the job.
+        :type job_id:                       str
+
+        :param wait_for:                    Wait for the job to finish before returning its record.
+                                            DEFAULT: False
+        :type wait_for:                     bool
+
+        :param timeout:                     Seconds to wait at most, or None to wait as long as the job takes.
+                                            DEFAULT: None
+        :type timeout:                      float
+
+        :return:                            Record of the job.
+        """
+
+        job = self.jobs[job_id]
+        future = job["future"]
+        if wait_for:
+            wait([future], timeout=timeout)
+
+        record = {key: value for key, value in job.items() if key != "future"}
+        if not future.done():
+            record["status"] = "running" if job_id in self._started else "queued"
+        elif future.exception() is not None:
+            error = future.exception()
+            record.update(status="failed", error=f"{type(error).__name__}: {error}")
+        else:
+            result = future.result()
+            record.update(
+                status="done",
+                files=result["files"],
+                queued_seconds=result["started"] - job["submitted"],
+                seconds=result["seconds"],
+                worker=result["worker"],
+            )
+
+        return record
+
+    def counts(self) -> dict:
+        """Number of jobs in each status."""
+
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        started = set(self._started.keys())
+        for job_id, job in list(self.jobs.items()):
+            future = job["future"]
+            if not future.done():
+                counts["running" if job_id in started else "queued"] += 1
+            else:
+                counts["failed" if future.exception() is not None else "done"] += 1
+
+        return counts
+
+    def shutdown(self):
+        """Wait for the submitted jobs and stop the worker processes."""
+
+        self._executor.shutdown()
+        self._manager.shutdown()
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    workers: int = 1,
+    max_queued: int = 100,
+    ready=None,
+    inputs: Optional[dict] = None,
+    **kwargs,
+):
+    """Serve a `JobQueue` over HTTP until interrupted. Jobs are submitted as JSON with `POST /jobs`, or
+    `POST /jobs?wait=1` to answer once the job finished, and followed with `GET /jobs/<id>`, also accepting
+    `?wait=1`. `GET /jobs` lists every job and `GET /health` counts them. A submission while the queue is full is
+    answered with 503. Nothing is sent beyond the local socket.
+
+    :param host:                            Address to listen on. The default only accepts local connections.
+                                            DEFAULT: "127.0.0.1"
+    :type host:                             str
+
+    :param port:                            Port to listen on, or 0 for any free port.
+                                            DEFAULT: 8765
+    :type port:                             int
+
+    :param workers:                         Number of worker processes.
+                                            DEFAULT: 1
+    :type workers:                          int
+
+    :param max_queued:                      Number of jobs that can wait for a worker before submissions are refused.
+                                            DEFAULT: 100
+    :type max_queued:                       int
+
+    :param ready:                           Called with the server once it accepts connections.
+                                            DEFAULT: None
+    :type ready:                            Callable
+
+    :param inputs:                          Node inputs shared by every job, such as `radius`.
+                                            DEFAULT: None
+    :type inputs:                           dict
+
+    :param kwargs:                          Options of `Model`, such as `engine`.
+
+    """
+
+    queue = JobQueue(workers, max_queued, inputs, **kwargs)
+    server = ThreadingHTTPServer((host, port), _JobHandler)
+    server.daemon_threads = True
+    server.queue = queue
+    if ready is not None:
+        ready(server)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        queue.shutdown()
+
+
+class _JobHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        queue = self.server.queue
+
+        if parts == ["health"]:
+            self._send(HTTPStatus.OK, {"workers": queue.workers, **queue.counts()})
+        elif parts == ["jobs"]:
+            self._send(HTTPStatus.OK, [queue.record(job_id) for job_id in list(queue.jobs)])
+        elif len(parts) == 2 and parts[0] == "jobs" and parts[1] in queue.jobs:
+            try:
+                wait_for, timeout = _wait(url.query)
+            except ValueError as error:
+                self._send(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            else:
+                self._send(HTTPStatus.OK, queue.record(parts[1], wait_for, timeout))
+        else:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {url.path}."})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {url.path}."})
+            return
+
+        try:
+            wait_for, timeout = _wait(url.query)
+            job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            record = self.server.queue.submit(job)
+        except QueueFullError as error:
+            self._send(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(error)})
+            return
+        except (ValueError, TypeError, AttributeError) as error:
+            self._send(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return
+
+        if wait_for:
+            self._send(HTTPStatus.OK, self.server.queue.record(record["id"], wait_for, timeout))
+        else:
+            self._send(HTTPStatus.ACCEPTED, record)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: HTTPStatus, content):
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _wait(query: str) -> Tuple[bool, Optional[float]]:
+    """Whether to wait for a job and for how many seconds at most, from the `wait` query parameter. `wait=1` waits
+    as long as the job takes, and any other number for that many seconds."""
+
+    values = parse_qs(query).get("wait")
+    if not values or values[0] in ("", "0", "false"):
+        return False, None
+    if values[0] in ("1", "true"):
+        return True, None
+
+    return True, float(values[0])
+
+
+def _start_worker(options: dict, started: dict):
+    """Build the driver of a worker process once, before it takes any job, and keep the shared dictionary its jobs
+    record their start in."""
+
+    global _DRIVER, _STARTED
+    _DRIVER = Model({}, [], **{**options, "headless": True}).dr
+    _STARTED = started
+
+
+def _run_job(job_id: str, job: dict) -> dict:
+    """Run a job in a worker process and return the files it wrote with its timing."""
+
+    started = time.time()
+    _STARTED[job_id] = started
+    start = time.perf_counter()
+    os.makedirs(job["output_directory"], exist_ok=True)
+    results = _DRIVER.execute(
+        job["outputs"],
+        inputs=dict(
+            job["inputs"],
+            input_shapefile=job["input_shapefile"],
+            output_directory=job["output_directory"],
+        ),
+    )
+
+    return {
+        "files": _written_files(results),
+        "started": started,
+        "seconds": time.perf_counter() - start,
+        "worker": os.getpid(),
+    }
+
+
+def _written_files(results: dict) -> List[str]:
+    """Paths returned by the write nodes of a job, in alphabetical order."""
+
+    files = []
+    for name, value in results.items():
+        if name.startswith("write_"):
+            files += value if isinstance(value, list) else [value]
+
+    return sorted(files)
@@ -0,0 +1,463 @@
+import heapq
+import json
+import os
+import time
+from typing import List, Optional, Sequence
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from .config import Settings
+from .driver import Model
+from .output import write_parameters
+
+# name of the manifest written by `plan_tiles()` and of the directory holding the per-tile results
+MANIFEST_FILENAME = "manifest.json"
+TILE_RESULTS_DIRECTORY = "tiles"
+
+# ways of partitioning the buildings into tiles: a regular grid of `tile_size`, or `tile_count` tiles of balanced cost
+TILING_METHODS = ("grid", "balanced")
+
+
+def plan_tiles(
+    input_shapefile: str,
+    manifest_directory: str,
+    inputs: Optional[dict] = None,
+    tile_size: float = Settings.DEFAULT_SPATIAL_TILE_SIZE,
+    method: str = "grid",
+    tile_count: int = Settings.DEFAULT_SPATIAL_TILE_COUNT,
+    **kwargs,
+) -> str:
+    """Partition the buildings of the input shapefile into spatial tiles and write a manifest of one job per tile to
+    `manifest_directory`, which must be on a filesystem shared by every worker. Each building belongs to the tile
+    that contains the center of its bounding box. The halo of a tile is the extent of its buildings grown by the
+    plan area `radius`, so that it holds every neighbor of every building of the tile. Tiles without buildings are
+    left out, and the jobs are numbered from 0 so that they map onto the task IDs of an array job.
+
+    The "grid" method cuts square tiles of `tile_size`. The "balanced" method splits the buildings into
+    `tile_count` rectangular tiles of about equal cost, where the cost of a building is 1 plus an estimate of its
+    neighbor pairs, because the pair based nodes dominate the run time in dense areas. The manifest records the
+    estimated cost and neighbor pairs of each tile, including its halo, which `tile_report()` compares with the
+    measured ones.
+
+    :param input_shapefile:                 Full path with file name and extension to the input shapefile.
+    :type input_shapefile:                  str
+
+    :param manifest_directory:              Shared directory the manifest and the tile results are written to.
+    :type manifest_directory:               str
+
+    :param inputs:                          Inputs of the model run by every worker and by the reducer, such as
+                                            `radius`, `cap_style`, and `output_resolution`.
+                                            DEFAULT: None
+    :type inputs:                           dict
+
+    :param tile_size:                       Length of the side of a tile in units of the input coordinate reference
+                                            system.
+                                            DEFAULT: 10000
+    :type tile_size:                        float
+
+    :param method:                          Either "grid" or "balanced".
+                                            DEFAULT: "grid"
+    :type method:                           str
+
+    :param tile_count:                      Number of tiles of the "balanced" method.
+                                            DEFAULT: 100
+    :type tile_count:                       int
+
+    :param kwargs:                          Options of the model such as `engine`, `precision`, or `distance`.
+
+    :return:                                Path of the written manifest.
+    """
+
+    if method not in TILING_METHODS:
+        raise ValueError(f"Unknown tiling method '{method}', expected one of {TILING_METHODS}.")
+
+    inputs = dict(inputs or {})
+    radius = inputs.get("radius", Settings.RADIUS)
+
+    buildings = gpd.read_file(input_shapefile)
+    buildings = buildings.loc[
+        buildings[Settings.DATA_HEIGHT_FIELD_NAME].gt(0).to_numpy()
+        & ~(buildings.geometry.isna() | buildings.geometry.is_empty).to_numpy()
+    ]
+    bounds = buildings.geometry.bounds.to_numpy()
+    centers = _centers(bounds)
+    pairs = _estimated_pairs(bounds, centers, radius)
+    costs = 1 + pairs
+    boxes = shapely.STRtree(shapely.box(*bounds.T))
+
+    if method == "grid":
+        tile_bounds_list = _grid_tiles(centers, tile_size)
+    else:
+        tile_bounds_list = _balanced_tiles(centers, costs, tile_count)
+
+    tiles = []
+    for tile_bounds in tile_bounds_list:
+        in_tile = _in_bounds(centers, tile_bounds)
+        if not in_tile.any():
+            continue
+        extent = bounds[in_tile]
+        halo = [
+            float(extent[:, 0].min() - radius),
+            float(extent[:, 1].min() - radius),
+            float(extent[:, 2].max() + radius),
+            float(extent[:, 3].max() + radius),
+        ]
+        # every building read by the worker is computed, so the cost of a tile includes its halo
+        in_halo = boxes.query(shapely.box(*halo))
+        tiles.append(
+            {
+                "task_id": len(tiles),
+                "bounds": [float(value) for value in tile_bounds],
+                "halo_bounds": halo,
+                "buildings": int(in_tile.sum()),
+                "estimated_pairs": float(pairs[in_halo].sum()),
+                "estimated_cost": float(costs[in_halo].sum()),
+            }
+        )
+
+    os.makedirs(os.path.join(manifest_directory, TILE_RESULTS_DIRECTORY), exist_ok=True)
+    manifest = {
+        "input_shapefile": os.path.abspath(input_shapefile),
+        "inputs": inputs,
+        "options": kwargs,
+        "method": method,
+        "tile_size": tile_size,
+        "tile_count": tile_count,
+        "tiles": tiles,
+    }
+
+    manifest_filename = os.path.join(manifest_directory, MANIFEST_FILENAME)
+    _write_atomically(manifest_filename, lambda path: _dump(manifest, path))
+
+    return manifest_filename
+
+
+def run_tile(manifest_filename: str, task_id: int) -> str:
+    """Compute the parameters of the buildings of one tile of the manifest and write them to the tile results
+    directory. Only the buildings within the halo of the tile are read, and only the buildings of the tile itself
+    are kept. The results are written under a temporary name and renamed once complete, so that a tile either has a
+    complete result or none; a tile with a result is not computed again, which lets failed jobs be resubmitted. The
+    run time and the number of neighbor pairs of the tile are written next to the result for `tile_report()`.
+
+    :param manifest_filename:               Full path with file name to the manifest written by `plan_tiles()`.
+    :type manifest_filename:                str
+
+    :param task_id:                         Task ID of the tile in the manifest.
+    :type task_id:                          int
+
+    :return:                                Path of the tile result.
+    """
+
+    manifest = read_manifest(manifest_filename)
+    tile = manifest["tiles"][task_id]
+    tile_filename = _tile_filename(manifest_filename, task_id)
+    if os.path.exists(tile_filename):
+        return tile_filename
+
+    buildings = gpd.read_file(manifest["input_shapefile"], bbox=tuple(tile["halo_bounds"]))
+    centers = _centers(buildings.geometry.bounds.to_numpy())
+    tile_ids = buildings.loc[_in_bounds(centers, tile["bounds"]), Settings.DATA_ID_FIELD_NAME]
+
+    options = {**manifest["options"], "headless": True}
+    dr = Model(manifest["inputs"], ["merge_parameters"], **options).dr
+    start = time.perf_counter()
+    results = dr.execute(
+        ["merge_parameters", "original_building_id", "buildings_intersecting_plan_area"],
+        inputs=manifest["inputs"],
+        overrides={"input_shapefile_df": _input_columns(buildings)},
+    )
+    seconds = time.perf_counter() - start
+    in_tile = results["original_building_id"].isin(tile_ids).to_numpy()
+    parameters = results["merge_parameters"].loc[in_tile]
+
+    statistics = {
+        "seconds": seconds,
+        "pairs": len(results["buildings_intersecting_plan_area"]),
+    }
+    _write_atomically(_statistics_filename(tile_filename), lambda path: _dump(statistics, path))
+    _write_atomically(
+        tile_filename,
+        lambda path: write_parameters(
+            parameters, os.path.dirname(path), parameters_filename=os.path.basename(path)
+        ),
+    )
+
+    return tile_filename
+
+
+def reduce_tiles(
+    manifest_filename: str,
+    outputs: Sequence[str] = ("write_binary", "write_index"),
+    output_directory: Optional[str] = None,
+):
+    """Merge the results of every tile of the manifest and rasterize them into the final outputs.
+
+    :param manifest_filename:               Full path with file name to the manifest written by `plan_tiles()`.
+    :type manifest_filename:                str
+
+    :param outputs:                         Output nodes to compute from the merged parameters.
+                                            DEFAULT: ("write_binary", "write_index")
+    :type outputs:                          Sequence[str]
+
+    :param output_directory:                Directory the outputs are written to. By default the `output_directory`
+                                            of the manifest inputs.
+                                            DEFAULT: None
+    :type output_directory:                 str
+
+    :return:                                Results of the output nodes.
+    """
+
+    manifest = read_manifest(manifest_filename)
+    missing = missing_tiles(manifest_filename)
+    if missing:
+        raise FileNotFoundError(f"Tiles {missing} of {manifest_filename} have no results.")
+
+    inputs = dict(manifest["inputs"])
+    if output_directory is not None:
+        inputs["output_directory"] = output_directory
+    if "output_directory" in inputs:
+        os.makedirs(inputs["output_directory"], exist_ok=True)
+
+    tile_filenames = [
+        _tile_filename(manifest_filename, tile["task_id"]) for tile in manifest["tiles"]
+    ]
+    model = Model.from_parameters(tile_filenames, list(outputs), inputs, **manifest["options"])
+
+    return model.execute()
+
+
+def read_manifest(manifest_filename: str) -> dict:
+    """Read a manifest written by `plan_tiles()`.
+
+    :param manifest_filename:               Full path with file name to the manifest.
+    :type manifest_filename:                str
+
+    :return:                                Dictionary of the manifest.
+    """
+
+    with open(manifest_filename) as manifest_file:
+        return json.load(manifest_file)
+
+
+def tile_report(manifest_filename: str) -> pd.DataFrame:
+    """Compare the estimated cost of each tile of the manifest with the run time and neighbor pairs measured by the
+    worker, to check how well the cost model balances the tiles. The estimated cost is converted to seconds with a
+    least squares line through the computed tiles. Tiles without results have no measured values.
+
+    :param manifest_filename:               Full path with file name to the manifest written by `plan_tiles()`.
+    :type manifest_filename:                str
+
+    :return:                                DataFrame indexed by task ID with the buildings of the tile, the
+                                            estimated and measured neighbor pairs of the tile and its halo, the
+                                            estimated cost, and the estimated and measured seconds.
+    """
+
+    manifest = read_manifest(manifest_filename)
+    report = pd.DataFrame(
+        manifest["tiles"], columns=["task_id", "buildings", "estimated_pairs", "estimated_cost"]
+    ).set_index("task_id")
+
+    statistics = {}
+    for task_id in report.index:
+        statistics_filename = _statistics_filename(_tile_filename(manifest_filename, task_id))
+        if os.path.exists(statistics_filename):
+            with open(statistics_filename) as statistics_file:
+                statistics[task_id] = json.load(statistics_file)
+    measured = pd.DataFrame.from_dict(statistics, orient="index", columns=["pairs", "seconds"])
+    report = report.join(measured)
+
+    # fixed costs such as reading the halo make a line with an intercept fit the run times better than a ratio
+    computed = report.loc[report["seconds"].notna()]
+    if computed["estimated_cost"].nunique() > 1:
+        slope, intercept = np.polyfit(computed["estimated_cost"], computed["seconds"], 1)
+    else:
+        slope, intercept = computed["seconds"].sum() / computed["estimated_cost"].sum(), 0.0
+    report.insert(
+        len(report.columns) - 1, "estimated_seconds", intercept + slope * report["estimated_cost"]
+    )
+
+    return report
+
+
+def missing_tiles(manifest_filename: str) -> List[int]:
+    """Task IDs of the tiles of the manifest that have no result yet.
+
+    :param manifest_filename:               Full path with file name to the manifest.
+    :type manifest_filename:                str
+
+    :return:                                List of task IDs.
+    """
+
+    return [
+        tile["task_id"]
+        for tile in read_manifest(manifest_filename)["tiles"]
+        if not os.path.exists(_tile_filename(manifest_filename, tile["task_id"]))
+    ]
+
+
+def _centers(bounds: np.ndarray) -> np.ndarray:
+    """Centers of the (minx, miny, maxx, maxy) bounding boxes, which assign each building to a single tile."""
+
+    return np.column_stack([(bounds[:, 0] + bounds[:, 2]) / 2, (bounds[:, 1] + bounds[:, 3]) / 2])
+
+
+def _in_bounds(centers: np.ndarray, bounds: Sequence[float]) -> np.ndarray:
+    """Whether each center lies in the tile, including its west and south edges but not its east and north edges
+    so that a center on the edge between two tiles belongs to one of them."""
+
+    minx, miny, maxx, maxy = bounds
+
+    return (
+        (centers[:, 0] >= minx)
+        & (centers[:, 0] < maxx)
+        & (centers[:, 1] >= miny)
+        & (centers[:, 1] < maxy)
+    )
+
+
+def _grid_tiles(centers: np.ndarray, tile_size: float) -> List[List[float]]:
+    """Bounds of the square tiles of a grid starting at the south-west center, row by row from the south."""
+
+    minx, miny = centers.min(axis=0)
+    maxx, maxy = centers.max(axis=0)
+    x_edges = minx + tile_size * np.arange(int((maxx - minx) // tile_size) + 2)
+    y_edges = miny + tile_size * np.arange(int((maxy - miny) // tile_size) + 2)
+
+    return [
+        [x_edges[col], y_edges[row], x_edges[col + 1], y_edges[row + 1]]
+        for row in range(len(y_edges) - 1)
+        for col in range(len(x_edges) - 1)
+    ]
+
+
+def _balanced_tiles(centers: np.ndarray, costs: np.ndarray, tile_count: int) -> List[List[float]]:
+    """Bounds of `tile_count` tiles of about equal cost from a k-d split of the extent of the centers. The tile
+    with the highest cost is split in two at the cost weighted median of its centers across its longer side until
+    there are `tile_count` tiles or no tile holds two distinct centers."""
+
+    # the east and north edges are excluded from a tile, so the extent is nudged past the last centers
+    minx, miny = centers.min(axis=0)
+    maxx, maxy = np.nextafter(centers.max(axis=0), np.inf)
+    heap = [(-costs.sum(), 0, [minx, miny, maxx, maxy], np.arange(len(centers)))]
+    tiles = []
+    splits = 0
+    while heap and len(tiles) + len(heap) < tile_count:
+        cost, _, bounds, indices = heapq.heappop(heap)
+        halves = _split(centers, costs, bounds, indices)
+        if halves is None:
+            tiles.append(bounds)
+            continue
+        for half_bounds, half_indices in halves:
+            splits += 1
+            heapq.heappush(heap, (-costs[half_indices].sum(), splits, half_bounds, half_indices))
+
+    return sorted(tiles + [bounds for _, _, bounds, _ in heap], key=lambda bounds: bounds[1::-1])
+
+
+def _split(centers: np.ndarray, costs: np.ndarray, bounds: List[float], indices: np.ndarray):
+    """Split a tile at the cost weighted median of its centers across its longer side, or across the other side if
+    all centers share the same coordinate along it. Return None if all centers are at the same point.
+    """
+
+    minx, miny, maxx, maxy = bounds
+    axes = [0, 1] if maxx - minx >= maxy - miny else [1, 0]
+    for axis in axes:
+        coordinates = centers[indices, axis]
+        order = np.argsort(coordinates, kind="stable")
+        coordinates = coordinates[order]
+        if coordinates[0] == coordinates[-1]:
+            continue
+
+        # the split falls between two distinct coordinates at or after the weighted median
+        cumulative = np.cumsum(costs[indices[order]])
+        median = np.searchsorted(cumulative, cumulative[-1] / 2)
+        distinct = np.flatnonzero(coordinates[1:] != coordinates[:-1])
+        after = distinct[np.searchsorted(distinct, median) :]
+        position = after[0] if len(after) else distinct[-1]
+        split = (coordinates[position] + coordinates[position + 1]) / 2
+        if split == coordinates[position]:
+            # the coordinates are adjacent floats, so the midpoint rounds onto the lower one
+            split = coordinates[position + 1]
+
+        lower = list(bounds)
+        upper = list(bounds)
+        lower[axis + 2] = split
+        upper[axis] = split
+        return [
+            (lower, indices[order[: position + 1]]),
+            (upper, indices[order[position + 1 :]]),
+        ]
+
+    return None
+
+
+def _estimated_pairs(bounds: np.ndarray, centers: np.ndarray, radius: float) -> np.ndarray:
+    """Estimate the number of neighbors of each building as the density of buildings around it times the area of
+    its plan area. The density is counted on a coarse grid of cells the size of the radius, averaged over the cell
+    of the building and the 8 cells around it, and the plan area is taken as the bounding box grown by the radius.
+    """
+
+    cells = np.floor((centers - centers.min(axis=0)) / radius).astype(np.int64)
+    counts = pd.Series(1, index=pd.MultiIndex.from_arrays(cells.T)).groupby(level=[0, 1]).sum()
+
+    around = np.zeros(len(centers))
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            index = pd.MultiIndex.from_arrays([cells[:, 0] + dx, cells[:, 1] + dy])
+            around += counts.reindex(index, fill_value=0).to_numpy()
+    density = around / (9 * radius**2)
+
+    plan_area = (bounds[:, 2] - bounds[:, 0] + 2 * radius) * (
+        bounds[:, 3] - bounds[:, 1] + 2 * radius
+    )
+
+    return density * plan_area
+
+
+def _input_columns(buildings: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Select the columns read by `input_shapefile_df()`."""
+
+    return buildings[
+        [
+            Settings.DATA_ID_FIELD_NAME,
+            Settings.DATA_HEIGHT_FIELD_NAME,
+            Settings.DATA_GEOMETRY_FIELD_NAME,
+        ]
+    ].set_geometry(Settings.DATA_GEOMETRY_FIELD_NAME)
+
+
+def _tile_filename(manifest_filename: str, task_id: int) -> str:
+    """Path of the result of a tile next to the manifest."""
+
+    return os.path.join(
+        os.path.dirname(manifest_filename), TILE_RESULTS_DIRECTORY, f"tile_{task_id:06d}.parquet"
+    )
+
+
+def _statistics_filename(tile_filename: str) -> str:
+    """Path of the run time and neighbor pairs measured by the worker next to the result of a tile."""
+
+    return f"{os.path.splitext(tile_filename)[0]}.json"
+
+
+def _write_atomically(filename: str, write) -> None:
+    """Call `write` with a temporary path next to `filename` and rename the result to `filename`, so that readers on
+    the shared filesystem never see a partially written file."""
+
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    try:
+        write(temporary)
+        os.replace(temporary, filename)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def _dump(content: dict, path: str) -> None:
+    """Write a manifest or tile statistics as indented JSON."""
+
+    with open(path, "w") as json_file:
+        json.dump(content, json_file, indent=2)
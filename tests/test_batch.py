@@ -0,0 +1,121 @@
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from naturf import batch, cli, driver
+
+
+class TestBatch(unittest.TestCase):
+    INPUT_SHAPEFILE = os.path.join("naturf", "data", "C-5.shp")
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.input_directory = os.path.join(self.directory, "inputs")
+        os.makedirs(self.input_directory)
+
+    def copy_input(self, name: str) -> str:
+        """Copy the files of the sample shapefile into the input directory under another name."""
+
+        for filename in glob.glob(os.path.splitext(TestBatch.INPUT_SHAPEFILE)[0] + ".*"):
+            extension = os.path.splitext(filename)[1]
+            shutil.copy(filename, os.path.join(self.input_directory, f"{name}{extension}"))
+
+        return os.path.join(self.input_directory, f"{name}.shp")
+
+    def test_run(self):
+        """Test that a batch run writes the same outputs as a single run for every input and reports failures."""
+
+        expected_directory = os.path.join(self.directory, "expected")
+        os.makedirs(expected_directory)
+        driver.Model(
+            {
+                "input_shapefile": TestBatch.INPUT_SHAPEFILE,
+                "radius": 100,
+                "cap_style": 1,
+                "output_directory": expected_directory,
+            },
+            ["write_binary", "write_index"],
+        ).execute()
+
+        for name in ["north", "south"]:
+            self.copy_input(name)
+        with open(os.path.join(self.input_directory, "broken.shp"), "w") as broken:
+            broken.write("not a shapefile")
+
+        output_directory = os.path.join(self.directory, "output")
+        summary_filename = os.path.join(self.directory, "summary.csv")
+        exit_code = cli.main(
+            [
+                "run",
+                self.input_directory,
+                "--output-directory",
+                output_directory,
+                "--workers",
+                "2",
+                "--cap-style",
+                "1",
+                "--summary",
+                summary_filename,
+            ]
+        )
+
+        assert exit_code == 1, "A failed input did not fail the run"
+        summary = pd.read_csv(summary_filename, index_col="input")
+        assert list(summary.index) == ["broken", "north", "south"]
+        assert list(summary["status"]) == ["failed", "ok", "ok"]
+        assert "broken.shp" in summary.loc["broken", "error"]
+        assert (summary.loc[["north", "south"], "buildings"] == 192).all()
+        assert summary.loc[["north", "south"], "compute_seconds"].notna().all()
+
+        for name in ["north", "south"]:
+            for filename in ["00001-00035.00001-00026", "index"]:
+                with open(os.path.join(expected_directory, filename), "rb") as expected:
+                    with open(os.path.join(output_directory, name, filename), "rb") as actual:
+                        assert actual.read() == expected.read(), f"{name}/{filename} differs"
+
+        os.remove(os.path.join(self.input_directory, "broken.shp"))
+        assert cli.main(["run", self.input_directory, "--output-directory", output_directory]) == 0
+        assert cli.main(["run", self.directory, "--output-directory", output_directory]) == 2
+
+    def test_assign(self):
+        """Test that the largest inputs are spread over the workers first and duplicate names are rejected."""
+
+        sizes = {"a": 10, "b": 60, "c": 30, "d": 25, "e": 5}
+        for name, size in sizes.items():
+            with open(os.path.join(self.input_directory, f"{name}.shp"), "wb") as shapefile:
+                shapefile.write(b"\0" * size)
+
+        filenames = batch.input_files([self.input_directory])
+        assigned = batch._assign(filenames, 2)
+
+        assert [os.path.basename(filename) for filename in filenames] == [
+            f"{name}.shp" for name in sorted(sizes)
+        ]
+        assert [[os.path.basename(filename)[0] for filename in files] for files in assigned] == [
+            ["b", "e"],
+            ["c", "d", "a"],
+        ]
+
+        with self.assertRaises(ValueError):
+            batch.run_inputs(
+                [filenames[0], TestBatch.INPUT_SHAPEFILE, self.copy_input("C-5")], self.directory
+            )
+
+    def test_run_no_inputs(self):
+        """Test that a batch run over a directory without shapefiles returns an empty summary."""
+
+        summary = batch.run_inputs([self.input_directory], self.directory, workers=2)
+
+        assert summary.empty
+        assert list(summary.columns) == batch.SUMMARY_COLUMNS
+        assert summary.index.name == "input"
+        assert summary["buildings"].dtype == "Int64"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,17 @@
+import asyncio
+import importlib.util
 import os
+import shutil
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch
 
+import geopandas as gpd
+import pandas as pd
+
 from naturf import driver
+from naturf.config import Settings
 
 
 class TestDriverGuardAgainstSDK(unittest.TestCase):
@@ -29,5 +38,322 @@ class TestDriverGuardAgainstSDK(unittest.TestCase):
         driver.Model(inputs=TestDriverGuardAgainstSDK.INPUTS, outputs=["input_shapefile_df"])
 
 
+class TestDriverConfig(unittest.TestCase):
+    INPUTS = {
+        "input_shapefile": os.path.join("naturf", "data", "C-5.shp"),
+        "radius": 100,
+        "cap_style": 1,
+    }
+
+    def test_streaming(self):
+        """tests that streaming mode writes the binary without the geocube rasterization nodes"""
+        model = driver.Model(TestDriverConfig.INPUTS, ["write_binary"], streaming=True)
+
+        upstream = {node.name for node in model.dr.what_is_upstream_of("write_binary")}
+
+        assert "raster_to_numpy" in upstream
+        assert "rasterize_parameters" not in upstream
+        assert "numpy_to_binary" not in upstream
+
+    def test_precision(self):
+        """tests that the precision reaches the config and that unknown precisions are rejected"""
+        model = driver.Model(TestDriverConfig.INPUTS, ["merge_parameters"], precision="float32")
+
+        assert model.config["precision"] == "float32"
+
+        with self.assertRaises(ValueError):
+            driver.Model(TestDriverConfig.INPUTS, ["merge_parameters"], precision="float16")
+
+    def test_engine(self):
+        """tests that the fast engine swaps in the fast implementations and the reference engine keeps the originals"""
+        heavy_nodes = [
+            "building_plan_area",
+            "frontal_length",
+            "frontal_area_density",
+            "wall_angle_direction_length",
+            "rasterize_parameters",
+            "numpy_to_binary",
+        ]
+
+        for engine, suffix in [("reference", ""), ("fast", "__fast")]:
+            model = driver.Model(TestDriverConfig.INPUTS, ["write_binary"], engine=engine)
+            for node in heavy_nodes:
+                assert model.dr.graph.nodes[node].callable.__qualname__ == f"{node}{suffix}"
+
+        with self.assertRaises(ValueError):
+            driver.Model(TestDriverConfig.INPUTS, ["write_binary"], engine="numba")
+
+    def test_distance(self):
+        """tests that the centroid distance swaps in the centroid implementation and unknown distances are rejected"""
+        for distance, suffix in [("polygon", ""), ("centroid", "__centroid")]:
+            model = driver.Model(TestDriverConfig.INPUTS, ["write_binary"], distance=distance)
+            node = model.dr.graph.nodes["distance_between_buildings"]
+            assert node.callable.__qualname__ == f"distance_between_buildings{suffix}"
+
+        with self.assertRaises(ValueError):
+            driver.Model(TestDriverConfig.INPUTS, ["write_binary"], distance="hausdorff")
+
+    def test_building_order(self):
+        """tests that ordering the buildings along a Hilbert curve keeps the binary and maps back to the input IDs"""
+        input_ids = gpd.read_file(TestDriverConfig.INPUTS["input_shapefile"])[
+            Settings.DATA_ID_FIELD_NAME
+        ]
+        binaries = {}
+        for building_order in ["file", "hilbert"]:
+            output_directory = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, output_directory)
+            inputs = dict(TestDriverConfig.INPUTS, output_directory=output_directory)
+            model = driver.Model(inputs, ["write_binary"], building_order=building_order)
+            model.execute()
+            with open(os.path.join(output_directory, "00001-00035.00001-00026"), "rb") as binary:
+                binaries[building_order] = binary.read()
+
+            ids = model.dr.execute(["building_id", "original_building_id"], inputs=inputs)
+            assert ids["original_building_id"].is_unique
+            assert ids["original_building_id"].isin(input_ids).all()
+            assert ids["building_id"].is_monotonic_increasing
+
+        assert binaries["file"] == binaries["hilbert"]
+
+        with self.assertRaises(ValueError):
+            driver.Model(TestDriverConfig.INPUTS, ["write_binary"], building_order="zorder")
+
+    def test_neighbor_cache(self):
+        """tests that the neighbor cache swaps in the cached join and that a cached rerun writes the same binary"""
+        output_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_directory)
+        inputs = dict(
+            TestDriverConfig.INPUTS,
+            output_directory=output_directory,
+            neighbor_cache_directory=output_directory,
+        )
+        binary_filename = os.path.join(output_directory, "00001-00035.00001-00026")
+
+        driver.Model(inputs, ["write_binary"]).execute()
+        with open(binary_filename, "rb") as binary:
+            expected = binary.read()
+
+        for _ in range(2):
+            model = driver.Model(inputs, ["write_binary"], neighbor_cache=True)
+            node = model.dr.graph.nodes["buildings_intersecting_plan_area"]
+            assert node.callable.__qualname__ == "buildings_intersecting_plan_area__cached"
+            model.execute()
+            with open(binary_filename, "rb") as binary:
+                assert binary.read() == expected
+
+        sidecars = [name for name in os.listdir(output_directory) if name.endswith(".npz")]
+        assert sidecars == ["C-5.neighbors.npz"]
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_feature_store(self):
+        """tests that the feature store swaps in the stored static features without changing the binary"""
+        output_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_directory)
+        inputs = dict(
+            TestDriverConfig.INPUTS,
+            output_directory=output_directory,
+            feature_store_directory=output_directory,
+        )
+        binary_filename = os.path.join(output_directory, "00001-00035.00001-00026")
+
+        driver.Model(inputs, ["write_binary"]).execute()
+        with open(binary_filename, "rb") as binary:
+            expected = binary.read()
+
+        for _ in range(2):
+            model = driver.Model(inputs, ["write_binary"], feature_store=True)
+            upstream = {node.name for node in model.dr.what_is_upstream_of("write_binary")}
+            assert "building_features" in upstream
+            assert "wall_angle_direction_length" not in upstream
+            model.execute()
+            with open(binary_filename, "rb") as binary:
+                assert binary.read() == expected
+
+        assert os.path.exists(os.path.join(output_directory, "C-5.features.parquet"))
+
+    def test_aexecute(self):
+        """tests that an asynchronous execution streams node events, returns the results, and can be cancelled"""
+        outputs = ["building_id", "average_distance_between_buildings"]
+
+        async def run():
+            model = driver.Model(TestDriverConfig.INPUTS, outputs)
+            assert model._node_events is None, "The node event hook was attached before aexecute"
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                execution = model.aexecute(executor)
+                with self.assertRaises(RuntimeError):
+                    model.aexecute()
+                events = [event async for event in execution]
+                results = await execution
+
+            started = [event["node"] for event in events if event["event"] == "started"]
+            finished = [event["node"] for event in events if event["event"] == "finished"]
+            assert sorted(started) == sorted(finished)
+            assert set(outputs) <= set(finished)
+            assert all(event["succeeded"] for event in events if event["event"] == "finished")
+            pd.testing.assert_frame_equal(results, model.execute())
+
+            execution = model.aexecute()
+            task = asyncio.ensure_future(execution)
+            finished = []
+            async for event in execution:
+                if event["event"] == "finished":
+                    finished.append(event["node"])
+                    if len(finished) == 2:
+                        task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # the thread may finish the nodes it started before the cancellation reaches it, but no more
+            assert 2 <= len(finished) < len(started)
+
+            execution = model.aexecute()
+            execution.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await execution
+
+        asyncio.run(run())
+
+    def test_headless(self):
+        """tests that a headless model skips the progress bar and trackers and writes the same outputs"""
+        output_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_directory)
+        inputs = dict(TestDriverConfig.INPUTS, output_directory=output_directory)
+        binary_filename = os.path.join(output_directory, "00001-00035.00001-00026")
+
+        driver.Model(inputs, ["write_binary"]).execute()
+        with open(binary_filename, "rb") as binary:
+            expected = binary.read()
+        os.remove(binary_filename)
+
+        with patch("naturf.driver._tracker_adapters") as tracker_adapters:
+            with patch("naturf.driver.h_tqdm.ProgressBar") as progress_bar:
+                model = driver.Model(inputs, ["write_binary", "building_id"], headless=True)
+        tracker_adapters.assert_not_called()
+        progress_bar.assert_not_called()
+        assert model._node_events is None
+
+        results = model.execute()
+        assert isinstance(results, dict)
+        assert len(results["building_id"]) == 192
+        with open(binary_filename, "rb") as binary:
+            assert binary.read() == expected
+
+    def test_resolutions(self):
+        """tests that fanning out over resolutions computes the buildings once and writes a directory per resolution"""
+        output_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_directory)
+        inputs = dict(TestDriverConfig.INPUTS, output_directory=output_directory)
+        model = driver.Model(
+            inputs, ["write_binary", "write_index"], resolutions=[0.00083333333, [0.0025, 0.0025]]
+        )
+
+        with patch.object(model.shared_dr, "execute", wraps=model.shared_dr.execute) as shared:
+            with patch.object(model.dr, "execute", wraps=model.dr.execute) as per_resolution:
+                results = model.execute()
+
+        assert shared.call_count == 1
+        assert per_resolution.call_count == 2
+        for call in per_resolution.call_args_list:
+            assert set(driver.Model.SHARED_NODES) <= set(call.kwargs["overrides"])
+        assert list(results) == ["0.00083333333", "0.0025x0.0025"]
+        assert os.path.exists(
+            os.path.join(output_directory, "0.00083333333", "00001-00035.00001-00026")
+        )
+        assert os.path.exists(
+            os.path.join(output_directory, "0.0025x0.0025", "00001-00012.00001-00009")
+        )
+        assert os.path.exists(os.path.join(output_directory, "0.0025x0.0025", "index"))
+
+    def test_height_scenarios(self):
+        """tests that height scenarios share the footprint nodes and match a run with the same heights"""
+        output_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_directory)
+        inputs = dict(TestDriverConfig.INPUTS, output_directory=output_directory)
+        buildings = gpd.read_file(TestDriverConfig.INPUTS["input_shapefile"])
+        heights = buildings.set_index(Settings.DATA_ID_FIELD_NAME)[Settings.DATA_HEIGHT_FIELD_NAME]
+        height_scenarios = pd.DataFrame({"base": heights, "taller": heights * 1.5})
+
+        driver.Model(inputs, ["write_binary"]).execute()
+        with open(os.path.join(output_directory, "00001-00035.00001-00026"), "rb") as binary:
+            expected = binary.read()
+
+        model = driver.Model(inputs, ["write_binary"], height_scenarios=height_scenarios)
+        with patch.object(model.shared_dr, "execute", wraps=model.shared_dr.execute) as shared:
+            with patch.object(model.dr, "execute", wraps=model.dr.execute) as per_scenario:
+                results = model.execute()
+
+        assert shared.call_count == 1
+        assert per_scenario.call_count == 2
+        assert list(results) == ["base", "taller"]
+        overrides = per_scenario.call_args.kwargs["overrides"]
+        assert set(driver.Model.GEOMETRY_NODES) <= set(overrides)
+        assert (overrides["building_height"] > 0).all()
+        with open(
+            os.path.join(output_directory, "base", "00001-00035.00001-00026"), "rb"
+        ) as binary:
+            assert binary.read() == expected
+        assert os.path.exists(os.path.join(output_directory, "taller", "00001-00035.00001-00026"))
+
+        with self.assertRaises(ValueError):
+            driver.Model(
+                inputs, ["write_binary"], height_scenarios=height_scenarios.drop(heights.idxmax())
+            ).execute()
+
+    def test_radii(self):
+        """tests that a radius sweep joins the neighbors once and matches a run at each radius"""
+        output_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_directory)
+        inputs = dict(TestDriverConfig.INPUTS, output_directory=output_directory)
+
+        driver.Model(dict(inputs, radius=50), ["write_binary"]).execute()
+        with open(os.path.join(output_directory, "00001-00035.00001-00026"), "rb") as binary:
+            expected = binary.read()
+
+        model = driver.Model(inputs, ["write_binary"], radii=[50, 100])
+        with patch.object(model.shared_dr, "execute", wraps=model.shared_dr.execute) as shared:
+            with patch.object(model.dr, "execute", wraps=model.dr.execute) as per_radius:
+                results = model.execute()
+
+        joins = [
+            call
+            for call in shared.call_args_list
+            if "buildings_intersecting_plan_area" in call.args[0]
+        ]
+        assert len(joins) == 1
+        assert joins[0].kwargs["inputs"]["radius"] == 100
+        assert per_radius.call_count == 2
+        assert list(results) == ["radius_50", "radius_100"]
+        with open(
+            os.path.join(output_directory, "radius_50", "00001-00035.00001-00026"), "rb"
+        ) as binary:
+            assert binary.read() == expected
+
+        with self.assertRaises(ValueError):
+            driver.Model(inputs, ["write_binary"], radii=[50], height_scenarios=pd.DataFrame())
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_from_parameters(self):
+        """tests that a model started from written parameters reproduces the binary without the building nodes"""
+        output_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_directory)
+        inputs = dict(TestDriverConfig.INPUTS, output_directory=output_directory)
+        driver.Model(inputs, ["write_parameters", "write_binary"]).execute()
+        binary_filename = os.path.join(output_directory, "00001-00035.00001-00026")
+        with open(binary_filename, "rb") as binary:
+            expected = binary.read()
+        os.remove(binary_filename)
+
+        model = driver.Model.from_parameters(
+            os.path.join(output_directory, "parameters.parquet"),
+            ["write_binary"],
+            {"output_directory": output_directory},
+        )
+        with patch.object(model.dr, "execute", wraps=model.dr.execute) as execute:
+            model.execute()
+
+        assert set(execute.call_args.kwargs["overrides"]) == set(driver.Model.SHARED_NODES)
+        with open(binary_filename, "rb") as binary:
+            assert binary.read() == expected
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,100 @@
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+from shapely.geometry import Polygon
+
+import naturf.equivalence as equivalence
+from naturf.config import Settings
+
+
+class TestEquivalence(unittest.TestCase):
+    INPUTS = {
+        "input_shapefile": os.path.join("naturf", "data", "C-5.shp"),
+        "radius": 100,
+        "cap_style": 1,
+    }
+
+    def test_synthetic_city(self):
+        """Test that `synthetic_city()` generates the requested number of buildings reproducibly."""
+
+        city = equivalence.synthetic_city(blocks=2, buildings_per_block=3, seed=4)
+
+        assert list(city.columns) == [
+            Settings.DATA_ID_FIELD_NAME,
+            Settings.DATA_HEIGHT_FIELD_NAME,
+            Settings.DATA_GEOMETRY_FIELD_NAME,
+        ], "Columns are not as expected"
+        assert len(city) == 36, "Number of buildings is not as expected"
+        assert city.is_valid.all(), "Buildings are not valid"
+        assert (city.geom_type == "MultiPolygon").sum() == 4, "Multipart buildings are missing"
+        assert np.isclose(city.geometry.unary_union.area, city.area.sum()), "Buildings overlap"
+        assert city.geom_equals(equivalence.synthetic_city(2, 3, seed=4)).all(), "Not reproducible"
+
+    def test_compare_engines(self):
+        """Test that the fast engine matches the reference engine node by node on C-5 and a synthetic city."""
+
+        report = equivalence.compare_engines(TestEquivalence.INPUTS)
+
+        assert "frontal_length" in report.index, "Intermediate nodes are not compared"
+        assert "numpy_to_binary" in report.index, "Final nodes are not compared"
+        assert equivalence.first_divergent_node(report) is None, report[~report["equivalent"]]
+
+        city = equivalence.synthetic_city(blocks=4, seed=1)
+        report = equivalence.compare_engines(
+            {"radius": 100, "cap_style": 1}, overrides={"input_shapefile_df": city}
+        )
+
+        assert equivalence.first_divergent_node(report) is None, report[~report["equivalent"]]
+
+    def test_compare_engines_divergence(self):
+        """Test that the first node outside its tolerance is reported."""
+
+        report = equivalence.compare_engines(
+            TestEquivalence.INPUTS,
+            # the runs are always headless, whatever the configuration says
+            reference={"engine": "reference", "headless": False},
+            candidate={"engine": "fast"},
+            final_vars=["frontal_area"],
+            tolerances={"frontal_length": (0, 0), "frontal_area": (0, 0)},
+        )
+
+        assert list(report.index[-2:]) == [
+            "frontal_length",
+            "frontal_area",
+        ], "Order not topological"
+        assert equivalence.first_divergent_node(report) == "frontal_length"
+
+    def test_compare(self):
+        """Test that `_compare()` handles the output types of the nodes."""
+
+        polygon = Polygon([[0, 0], [0, 1], [1, 1], [1, 0]])
+        shifted = Polygon([[0, 0], [0, 1], [1.5, 1], [1, 0]])
+        cases = [
+            (pd.Series([1.0, np.nan]), pd.Series([1.0 + 1e-12, np.nan]), (1e-12, True)),
+            (pd.Series([1.0]), pd.Series([1.0], index=[1]), (np.inf, False)),
+            (
+                pd.DataFrame({"a": [[1.0, 2.0]]}),
+                pd.DataFrame({"a": [np.array([1.0, 2.5])]}),
+                (0.5, False),
+            ),
+            (pd.Series([polygon]), pd.Series([shifted]), (0.5, False)),
+            (
+                np.arange(3, dtype=">i4").tobytes(),
+                np.arange(1, 4, dtype=">i4").tobytes(),
+                (1.0, False),
+            ),
+            ("EPSG:4326", "EPSG:4326", (0.0, True)),
+        ]
+
+        for expected, actual, (max_abs_diff, equivalent) in cases:
+            result = equivalence._compare(expected, actual, 0, 1e-9)
+            np.testing.assert_allclose(result[0], max_abs_diff, rtol=1e-3)
+            assert (
+                result[1] == equivalent
+            ), f"Comparison of {expected} and {actual} is not as expected"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from pyproj import Transformer
+
+from naturf.grid import Grid
+
+
+class TestGrid(unittest.TestCase):
+    NAMELIST = """&share
+ wrf_core = 'ARW',
+ max_dom = 2,
+/
+
+&geogrid
+ parent_id         =   1,   1,
+ parent_grid_ratio =   1,   3,
+ i_parent_start    =   1,  31,
+ j_parent_start    =   1,  17,
+ e_we              =  74, 112,
+ e_sn              =  61,  97,
+ dx = 30000,
+ dy = 30000,
+ map_proj = 'lambert',
+ ref_lat   =  34.83,
+ ref_lon   = -81.03,
+ truelat1  =  30.0,
+ truelat2  =  60.0,
+ stand_lon = -98.0,
+ geog_data_path = '/glade/work/wrfhelp/WPS_GEOG/'
+/
+"""
+
+    def setUp(self):
+        # Create a temporary directory
+        self.test_dir = tempfile.mkdtemp()
+        self.namelist = os.path.join(self.test_dir, "namelist.wps")
+        with open(self.namelist, "w") as namelist:
+            namelist.write(TestGrid.NAMELIST)
+
+    def tearDown(self):
+        # Remove the directory after the test
+        shutil.rmtree(self.test_dir)
+
+    def test_grid(self):
+        """Test that the transform, bounds, and cell centers of a `Grid` run south to north."""
+
+        grid = Grid("EPSG:4326", (-77.0, 38.8), (0.001, 0.002), (5, 7))
+
+        x, y = grid.cell_centers()
+
+        self.assertEqual(grid.transform * (0, 0), (-77.0, 38.8))
+        np.testing.assert_allclose(grid.bounds, (-77.0, 38.8, -76.993, 38.81))
+        np.testing.assert_allclose(x[[0, -1]], [-76.9995, -76.9935])
+        np.testing.assert_allclose(y[[0, -1]], [38.801, 38.809])
+        self.assertEqual(grid.template().shape, (5, 7))
+        self.assertEqual(grid.index_projection(), {"projection": "regular_ll"})
+        np.testing.assert_allclose(grid.known_point(), (38.801, -76.9995))
+
+    def test_from_namelist(self):
+        """Test that `Grid.from_namelist()` centers the parent domain on the reference point and places the nest."""
+
+        parent = Grid.from_namelist(self.namelist)
+        nest = Grid.from_namelist(self.namelist, domain=2)
+
+        self.assertEqual(parent.shape, (60, 73))
+        self.assertEqual(parent.resolution, (30000.0, 30000.0))
+        self.assertEqual(
+            parent.index_projection(),
+            {"projection": "lambert", "truelat1": 30.0, "truelat2": 60.0, "stdlon": -98.0},
+        )
+
+        minx, miny, maxx, maxy = parent.bounds
+        transformer = Transformer.from_crs(parent.crs, parent.crs.geodetic_crs, always_xy=True)
+        np.testing.assert_allclose(
+            transformer.transform((minx + maxx) / 2, (miny + maxy) / 2), (-81.03, 34.83)
+        )
+
+        self.assertEqual(nest.shape, (96, 111))
+        self.assertEqual(nest.resolution, (10000.0, 10000.0))
+        np.testing.assert_allclose(
+            nest.origin, (parent.origin[0] + 30 * 30000, parent.origin[1] + 16 * 30000)
+        )
+
+    def test_from_namelist_unsupported(self):
+        """Test that `Grid.from_namelist()` raises for an unknown map projection."""
+
+        with open(self.namelist, "w") as namelist:
+            namelist.write(TestGrid.NAMELIST.replace("'lambert'", "'rotated_ll'"))
+
+        with self.assertRaises(ValueError):
+            Grid.from_namelist(self.namelist)
+
+
+if __name__ == "__main__":
+    unittest.main()
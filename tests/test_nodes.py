@@ -1,13 +1,18 @@
+import importlib.util
 import math
 import os
+import shutil
+import tempfile
 import unittest
 
 from dataclasses import dataclass
 import numpy as np
 import geopandas as gpd
 import pandas as pd
-from shapely.geometry import Polygon, JOIN_STYLE
+from shapely.affinity import translate
+from shapely.geometry import MultiPolygon, Polygon, JOIN_STYLE
 from typing import List
+from unittest.mock import patch
 
 from naturf.driver import Model
 import naturf.nodes as nodes
@@ -71,6 +76,98 @@ class TestNodes(unittest.TestCase):
             f"average_distance_between_buildings test failed, expected {expected}, actual {actual}",
         )
 
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_building_features(self):
+        """Test that `building_features()` stores the static features and only recomputes changed buildings."""
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        polygons = [
+            Polygon([[0, 0], [0, 1], [2, 1], [2, 0]]),
+            MultiPolygon(
+                [Polygon([[3, 0], [3, 1], [4, 1], [4, 0]]), Polygon([[5, 0], [5, 2], [6, 0]])]
+            ),
+            Polygon([[0, 3], [0, 6], [3, 6], [3, 3]]),
+        ]
+        original_building_id = pd.Series([30, 10, 20], name=Settings.ORIGINAL_ID_FIELD)
+        building_geometry = gpd.GeoSeries(polygons, name=Settings.GEOMETRY_FIELD)
+        expected_wall_length = nodes.wall_length(
+            nodes.wall_angle_direction_length(nodes.building_parts(building_geometry))
+        )
+
+        features = nodes.building_features(
+            original_building_id, building_geometry, feature_store_directory=directory
+        )
+        pd.testing.assert_series_equal(
+            nodes.building_area__stored(features), nodes.building_area(building_geometry)
+        )
+        pd.testing.assert_frame_equal(nodes.wall_length__stored(features), expected_wall_length)
+
+        stored = pd.read_parquet(os.path.join(directory, "naturf.features.parquet"))
+        assert list(stored.columns) == [
+            Settings.ORIGINAL_ID_FIELD,
+            Settings.GEOMETRY_HASH_FIELD,
+            *Settings.BUILDING_FEATURE_FIELDS,
+        ]
+        assert stored[Settings.VERTEX_COUNT_FIELD].tolist() == [5, 9, 5]
+        np.testing.assert_array_equal(stored[Settings.CENTROID_FIELDS].iloc[2], [1.5, 4.5])
+        np.testing.assert_array_equal(stored[Settings.GEOMETRY_BOUNDS_FIELDS].iloc[1], [3, 0, 6, 2])
+
+        with patch("naturf.nodes._geometry_features") as geometry_features:
+            reloaded = nodes.building_features(
+                original_building_id[::-1].reset_index(drop=True),
+                building_geometry[::-1].reset_index(drop=True),
+                feature_store_directory=directory,
+            )
+        geometry_features.assert_not_called()
+        pd.testing.assert_frame_equal(reloaded, features[::-1].reset_index(drop=True))
+
+        moved = building_geometry.copy()
+        moved[2] = translate(polygons[2], xoff=10)
+        with patch(
+            "naturf.nodes._geometry_features", wraps=nodes._geometry_features
+        ) as geometry_features:
+            features = nodes.building_features(
+                original_building_id, moved, feature_store_directory=directory
+            )
+        assert len(geometry_features.call_args.args[0]) == 1
+        pd.testing.assert_frame_equal(nodes.wall_length__stored(features), expected_wall_length)
+        np.testing.assert_array_equal(
+            pd.read_parquet(os.path.join(directory, "naturf.features.parquet"))[
+                Settings.CENTROID_FIELDS
+            ].iloc[2],
+            [11.5, 4.5],
+        )
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_building_features_duplicate_ids(self):
+        """Test that `building_features()` matches buildings sharing an ID in the input by their geometry."""
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        square = Polygon([[0, 0], [0, 1], [1, 1], [1, 0]])
+        rectangle = Polygon([[3, 0], [3, 1], [5, 1], [5, 0]])
+        original_building_id = pd.Series([7, 7, 7, 8], name=Settings.ORIGINAL_ID_FIELD)
+        building_geometry = gpd.GeoSeries(
+            [square, rectangle, square, translate(square, xoff=10)], name=Settings.GEOMETRY_FIELD
+        )
+
+        features = nodes.building_features(
+            original_building_id, building_geometry, feature_store_directory=directory
+        )
+        assert features[Settings.AREA_FIELD].tolist() == [1.0, 2.0, 1.0, 1.0]
+
+        with patch("naturf.nodes._geometry_features") as geometry_features:
+            reloaded = nodes.building_features(
+                original_building_id[::-1].reset_index(drop=True),
+                building_geometry[::-1].reset_index(drop=True),
+                feature_store_directory=directory,
+            )
+        geometry_features.assert_not_called()
+        pd.testing.assert_frame_equal(reloaded, features[::-1].reset_index(drop=True))
+
     def test_buildings_intersecting_plan_area(self):
         """Test that the function `buildings_intersecting_plan_area()` returns the correct intersecting buildings."""
 
@@ -275,6 +372,94 @@ class TestNodes(unittest.TestCase):
                 f"buildings_intersecting_plan_area test {case.name} failed, expected {expected}, actual {actual}",
             )
 
+    def test_buildings_intersecting_plan_area_cached(self):
+        """Test that `buildings_intersecting_plan_area__cached()` saves the neighbor pairs once and rebuilds the
+        same join from them until the buildings or the radius change."""
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        polygons = [
+            Polygon([[x, y], [x, y + 1], [x + 1, y + 1], [x + 1, y]])
+            for x in (0, 3, 6)
+            for y in (0, 3)
+        ]
+        building_id = pd.Series(range(len(polygons)))
+        building_geometry = gpd.GeoSeries(polygons)
+        wall_length = pd.DataFrame(
+            {
+                name: np.ones(len(polygons))
+                for name in [
+                    Settings.WALL_LENGTH_NORTH,
+                    Settings.WALL_LENGTH_EAST,
+                    Settings.WALL_LENGTH_SOUTH,
+                    Settings.WALL_LENGTH_WEST,
+                ]
+            }
+        )
+        kwargs = dict(
+            building_id=building_id,
+            building_height=pd.Series(np.arange(len(polygons)) + 5.0),
+            building_geometry=building_geometry,
+            building_area=building_geometry.area,
+            total_plan_area_geometry=building_geometry.buffer(2.5),
+            wall_length=wall_length,
+            target_crs="epsg:3857",
+        )
+
+        expected = nodes.buildings_intersecting_plan_area(**kwargs)
+
+        nodes.buildings_intersecting_plan_area__cached(**kwargs, neighbor_cache_directory=directory)
+        sidecars = os.listdir(directory)
+        assert len(sidecars) == 1 and sidecars[0].endswith(".npz")
+
+        with patch("naturf.nodes.gpd.sjoin") as sjoin:
+            cached = nodes.buildings_intersecting_plan_area__cached(
+                **dict(kwargs, building_height=kwargs["building_height"] * 2),
+                neighbor_cache_directory=directory,
+            )
+        sjoin.assert_not_called()
+        pd.testing.assert_frame_equal(
+            cached.drop(columns=["building_height_target", "building_height_neighbor"]),
+            expected.drop(columns=["building_height_target", "building_height_neighbor"]),
+        )
+        np.testing.assert_array_equal(
+            cached["building_height_target"], expected["building_height_target"] * 2
+        )
+
+        nodes.buildings_intersecting_plan_area__cached(
+            **kwargs, radius=50, neighbor_cache_directory=directory
+        )
+        nodes.buildings_intersecting_plan_area__cached(
+            **dict(kwargs, total_plan_area_geometry=building_geometry.buffer(4)),
+            neighbor_cache_directory=directory,
+        )
+        assert os.listdir(directory) == sidecars, "A stale sidecar was kept"
+
+        with patch("naturf.nodes.gpd.sjoin", wraps=gpd.sjoin) as sjoin:
+            nodes.buildings_intersecting_plan_area__cached(
+                **kwargs, neighbor_cache_directory=directory
+            )
+        sjoin.assert_called_once()
+
+    def test_building_parts(self):
+        """Test that the function `building_parts()` explodes multipart buildings and keeps the building index."""
+
+        polygon1 = Polygon([[0, 0], [0, 1], [1, 1], [1, 0]])
+        polygon2 = Polygon([[3, 3], [3, 4], [4, 4], [4, 3]])
+        polygon3 = Polygon([[5, 5], [5, 6], [6, 6], [6, 5]])
+        building_geometry = gpd.GeoSeries([polygon1, MultiPolygon([polygon2, polygon3])])
+
+        actual = nodes.building_parts(building_geometry)
+
+        assert list(actual.index) == [0, 1, 1], "Part index does not map back to the buildings"
+        assert list(actual.geom_type) == [
+            "Polygon",
+            "Polygon",
+            "Polygon",
+        ], "Parts are not single polygons"
+        assert actual.values[2].equals(polygon3), "Part geometry is not as expected"
+
     def test_building_plan_area(self):
         """Test that the function `building_plan_area()` returns the correct area."""
 
@@ -421,6 +606,11 @@ class TestNodes(unittest.TestCase):
                 actual,
                 f"building_plan_area test {case.name} failed, expected {expected}, actual {actual}",
             )
+            pd.testing.assert_series_equal(
+                expected,
+                nodes.building_plan_area__fast(case.input),
+                f"building_plan_area__fast test {case.name} failed",
+            )
 
     def test_building_surface_area_to_plan_area_ratio(self):
         """Test that the function `building_surface_area_to_plan_area_ratio()` returns the correct value."""
@@ -468,6 +658,69 @@ class TestNodes(unittest.TestCase):
             f"complete_aspect_ratio test failed, expected {expected}, actual {actual}",
         )
 
+    def test_distance_between_buildings(self):
+        """Test that `distance_between_buildings()` returns the polygon distance and the centroid variant returns the
+        centroid distance for each pair."""
+
+        # Building 0 and 1 are 1 apart from edge to edge and 2 apart from centroid to centroid. Building 2 touches
+        # building 0, a polygon distance of 0 but a centroid distance of 1.5.
+        polygon0 = Polygon([[0, 0], [0, 1], [1, 1], [1, 0]])
+        polygon1 = Polygon([[2, 0], [2, 1], [3, 1], [3, 0]])
+        polygon2 = Polygon([[0, 1], [0, 3], [1, 3], [1, 1]])
+        building_id = pd.Series([10, 11, 12])
+        building_geometry = gpd.GeoSeries([polygon0, polygon1, polygon2])
+
+        index = pd.Index([10, 11, 12, 10, 11], name=Settings.NEIGHBOR_ID_FIELD)
+        pairs = gpd.GeoDataFrame(
+            {
+                Settings.TARGET_ID_FIELD: [10, 10, 10, 11, 11],
+                Settings.GEOMETRY_FIELD: [polygon0, polygon0, polygon0, polygon1, polygon1],
+                Settings.NEIGHBOR_GEOMETRY_FIELD: gpd.GeoSeries(
+                    [polygon0, polygon1, polygon2, polygon0, polygon1], index
+                ),
+            },
+            index=index,
+            geometry=Settings.GEOMETRY_FIELD,
+        )
+
+        expected = pd.Series([0, 1, 0, 1, 0], index, name=Settings.DISTANCE_BETWEEN_BUILDINGS)
+        actual = nodes.distance_between_buildings(pairs)
+
+        pd.testing.assert_series_equal(expected, actual, check_dtype=False)
+
+        expected = pd.Series([0, 2, 1.5, 2, 0], index, name=Settings.DISTANCE_BETWEEN_BUILDINGS)
+        actual = nodes.distance_between_buildings__centroid(pairs, building_id, building_geometry)
+
+        pd.testing.assert_series_equal(expected, actual)
+
+    def test_distance_between_buildings_concave(self):
+        """Test that the centroid variant of `distance_between_buildings()` can be shorter than the polygon distance
+        when a footprint is concave."""
+
+        # The U-shaped building 0 has its centroid at (2.5, 26.5 / 13), in the gap of the U. Building 1 sits in the
+        # gap 1 away from the walls of the U, but only 6 / 13 away from its centroid.
+        polygon0 = Polygon([[0, 0], [5, 0], [5, 5], [4, 5], [4, 1], [1, 1], [1, 5], [0, 5]])
+        polygon1 = Polygon([[2, 2], [2, 3], [3, 3], [3, 2]])
+        building_id = pd.Series([10, 11])
+        building_geometry = gpd.GeoSeries([polygon0, polygon1])
+
+        index = pd.Index([11], name=Settings.NEIGHBOR_ID_FIELD)
+        pairs = gpd.GeoDataFrame(
+            {
+                Settings.TARGET_ID_FIELD: [10],
+                Settings.GEOMETRY_FIELD: [polygon0],
+                Settings.NEIGHBOR_GEOMETRY_FIELD: gpd.GeoSeries([polygon1], index),
+            },
+            index=index,
+            geometry=Settings.GEOMETRY_FIELD,
+        )
+
+        polygon = nodes.distance_between_buildings(pairs)
+        centroid = nodes.distance_between_buildings__centroid(pairs, building_id, building_geometry)
+
+        self.assertAlmostEqual(1, polygon.iloc[0])
+        self.assertAlmostEqual(6 / 13, centroid.iloc[0])
+
     def test_input_shapefile_df(self):
         """Test that the function `input_shapefile_df()` creates the right shape and type of DataFrame."""
 
@@ -501,6 +754,51 @@ class TestNodes(unittest.TestCase):
             "`input_shapefile_df` doesn't match expected data type.",
         )
 
+    def test_filter_height_range(self):
+        """Test that `filter_height_range()` drops buildings without height and that the Hilbert variant orders the
+        buildings along the curve, numbers them again, and keeps their input IDs."""
+
+        # four unit squares in the corners of a square, listed out of order along the curve, and one without height
+        corners = [(0, 0), (10, 10), (0, 10), (10, 0), (5, 5)]
+        valid_geometry_df = gpd.GeoDataFrame(
+            {
+                Settings.ID_FIELD: [7, 3, 9, 5, 1],
+                Settings.HEIGHT_FIELD: [10.0, 20.0, 30.0, 100.0, 0.0],
+                Settings.GEOMETRY_FIELD: [
+                    Polygon([(x, y), (x + 1, y), (x + 1, y + 1), (x, y + 1)]) for x, y in corners
+                ],
+            },
+            geometry=Settings.GEOMETRY_FIELD,
+        )
+
+        actual = nodes.filter_height_range(valid_geometry_df.copy())
+
+        assert list(actual[Settings.ID_FIELD]) == [7, 3, 9, 5]
+        assert list(actual[Settings.HEIGHT_FIELD]) == [
+            10.0,
+            20.0,
+            30.0,
+            Settings.MAX_BUILDING_HEIGHT,
+        ]
+
+        actual = nodes.filter_height_range__hilbert(valid_geometry_df.copy())
+        expected_order = [7, 9, 3, 5]
+
+        assert list(actual[Settings.ORIGINAL_ID_FIELD]) == expected_order
+        assert list(actual[Settings.ID_FIELD]) == [0, 1, 2, 3]
+        assert list(actual.index) == [0, 1, 2, 3]
+        assert list(actual[Settings.HEIGHT_FIELD]) == [
+            10.0,
+            30.0,
+            20.0,
+            Settings.MAX_BUILDING_HEIGHT,
+        ]
+        assert actual.geometry.geom_equals(
+            valid_geometry_df.set_index(Settings.ID_FIELD)
+            .geometry.loc[expected_order]
+            .reset_index(drop=True)
+        ).all()
+
     def test_frontal_area(self):
         """Test that the function `frontal_area()` returns the correct values."""
         frontal_length = pd.DataFrame([[0, 0.25, 0.5, 7500], [0, 3.14159, 10.5, 100]])
@@ -651,6 +949,9 @@ class TestNodes(unittest.TestCase):
             actual,
         )
 
+        actual = nodes.frontal_area_density__fast(frontal_lengths, heights, total_plan_area)
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+
     def test_frontal_area_index(self):
         """Test that the function `frontal_area_index()` returns the correct value in each cardinal direction."""
 
@@ -746,6 +1047,9 @@ class TestNodes(unittest.TestCase):
             actual,
         )
 
+        actual = nodes.frontal_length__fast(input_gdf)
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+
     def test_grimmond_oke_displacement_height(self):
         """Test that the function `grimmond_oke_displacement_height()` returns the correct value."""
         building_height = pd.Series([0, 1, 10.5, 75])
@@ -1226,6 +1530,39 @@ class TestNodes(unittest.TestCase):
             ),
         ]
 
+        multipart = nodes.building_parts(
+            gpd.GeoSeries(
+                [
+                    MultiPolygon(
+                        [Polygon(polygon_exterior), Polygon([[2, 1], [3, 1], [3, 0], [2, 0]])]
+                    ),
+                    Polygon(polygon_exterior),
+                ]
+            )
+        )
+        actual = nodes.wall_angle_direction_length(multipart)
+        expected = pd.concat(
+            [
+                pd.Series(
+                    [[0.0, -90.0, 180.0, 90.0] * 2, [0.0, -90.0, 180.0, 90.0]], name=wall_angle
+                ),
+                pd.Series(
+                    [[north, east, south, west] * 2, [north, east, south, west]],
+                    name=wall_direction,
+                ),
+                pd.Series([[1.0] * 8, [1.0] * 4], name=wall_length),
+            ],
+            axis=1,
+        )
+        pd.testing.assert_frame_equal(
+            expected, actual, "wall_angle_direction_length multipart test failed"
+        )
+        pd.testing.assert_frame_equal(
+            expected,
+            nodes.wall_angle_direction_length__fast(multipart).map(list),
+            "wall_angle_direction_length__fast multipart test failed",
+        )
+
         for case in testcases:
             actual = nodes.wall_angle_direction_length(gpd.GeoSeries(case.input))
             expected = case.expected
@@ -1234,6 +1571,42 @@ class TestNodes(unittest.TestCase):
                 actual,
                 f"wall_angle_direction_length test {case.name} failed, expected {expected}, actual {actual}",
             )
+            actual = nodes.wall_angle_direction_length__fast(gpd.GeoSeries(case.input))
+            pd.testing.assert_frame_equal(
+                expected,
+                actual.map(list),
+                f"wall_angle_direction_length__fast test {case.name} failed",
+            )
+
+    def test_valid_geometry_df(self):
+        """Test that the function `valid_geometry_df()` repairs invalid geometry and drops buildings without a footprint."""
+
+        square = Polygon([[0, 0], [0, 1], [1, 1], [1, 0]])
+        bowtie = Polygon([[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]])
+        collapsed = Polygon([[0, 0], [1, 0], [2, 0], [0, 0]])
+        standardize_column_names_df = gpd.GeoDataFrame(
+            {
+                Settings.ID_FIELD: [0, 1, 2, 3],
+                Settings.HEIGHT_FIELD: [5, 10, 15, 20],
+                Settings.GEOMETRY_FIELD: [square, bowtie, collapsed, None],
+            },
+            geometry=Settings.GEOMETRY_FIELD,
+            crs="epsg:3857",
+        )
+
+        actual = nodes.valid_geometry_df(standardize_column_names_df)
+
+        assert list(actual[Settings.ID_FIELD]) == [
+            0,
+            1,
+        ], "Buildings without a footprint were not dropped"
+        assert actual.is_valid.all(), "Geometry was not repaired"
+        assert actual.geometry.values[0].equals(square), "Valid geometry was modified"
+        assert (
+            actual.geometry.values[1].geom_type == "MultiPolygon"
+        ), "Repaired bowtie is not multipart"
+        assert math.isclose(actual.geometry.values[1].area, 0.5), "Repaired area is not as expected"
+        assert actual.crs == "epsg:3857", "CRS is not as expected"
 
     def test_vertical_distribution_of_building_heights(self):
         """Test that the function `vertical_distribution_of_building_heights()` returns the correct dataframe."""
@@ -1265,6 +1638,11 @@ class TestNodes(unittest.TestCase):
             actual,
         )
 
+        actual = nodes.vertical_distribution_of_building_heights(
+            building_height, precision="float32"
+        )
+        pd.testing.assert_frame_equal(expected.astype("float32"), actual)
+
     def test_wall_length(self):
         """Test that the function `wall_length()` returns the correct length."""
 
@@ -1336,7 +1714,7 @@ class TestNodes(unittest.TestCase):
                 input=triangle_input,
                 expected=pd.concat(
                     [
-                        pd.Series([0], name=wall_length_north),
+                        pd.Series([0.0], name=wall_length_north),
                         pd.Series([square_root_one_half], name=wall_length_east),
                         pd.Series([square_root_one_half], name=wall_length_south),
                         pd.Series([1.0], name=wall_length_west),
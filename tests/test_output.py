@@ -1,3 +1,4 @@
+import importlib.util
 import math
 import os
 import shutil
@@ -12,6 +13,8 @@ import xarray as xr
 
 import naturf.output as output
 from naturf.config import Settings
+from naturf.grid import Grid
+from naturf.reader import level_names
 
 
 class TestNodes(unittest.TestCase):
@@ -59,16 +62,21 @@ class TestNodes(unittest.TestCase):
     def test_merge_parameters(self):
         """Test the function `merge_parameters()` to ensure it outputs the right type and shape GeoDataFrame."""
 
-        frontal_area_density = pd.DataFrame(
-            {
-                Settings.FRONTAL_AREA_NORTH: [0.1, 0.2],
-                Settings.FRONTAL_AREA_EAST: [0.3, 0.4],
-                Settings.FRONTAL_AREA_SOUTH: [0.5, 0.6],
-                Settings.FRONTAL_AREA_WEST: [0.7, 0.8],
-            }
+        heights = range(Settings.MAX_BUILDING_HEIGHT // Settings.BUILDING_HEIGHT_INTERVAL)
+
+        def by_height(*names):
+            return pd.DataFrame(
+                {f"{name}_{height}": [0.1, 0.2] for name in names for height in heights}
+            )
+
+        frontal_area_density = by_height(
+            Settings.FRONTAL_AREA_NORTH,
+            Settings.FRONTAL_AREA_EAST,
+            Settings.FRONTAL_AREA_SOUTH,
+            Settings.FRONTAL_AREA_WEST,
         )
-        plan_area_density = pd.DataFrame({Settings.PLAN_AREA_DENSITY: [0.5, 0.6]})
-        rooftop_area_density = pd.DataFrame({Settings.ROOFTOP_AREA_DENSITY: [0.9, 1.0]})
+        plan_area_density = by_height(Settings.PLAN_AREA_DENSITY)
+        rooftop_area_density = by_height(Settings.ROOFTOP_AREA_DENSITY)
         plan_area_fraction = pd.Series([0.5, 0.5])
         mean_building_height = pd.Series([10, 20])
         standard_deviation_of_building_heights = pd.Series([2, 3])
@@ -112,13 +120,13 @@ class TestNodes(unittest.TestCase):
             }
         )
         macdonald_displacement_height = pd.Series([0.8, 0.9])
-        vertical_distribution_of_building_heights = pd.DataFrame(
-            {Settings.VERTICAL_DISTRIBUTION_OF_BUILDING_HEIGHTS: [10, 20]}
+        vertical_distribution_of_building_heights = by_height(
+            Settings.VERTICAL_DISTRIBUTION_OF_BUILDING_HEIGHTS
         )
-        building_geometry = pd.Series([Point(0, 0), Point(1, 1)])
+        output_geometry = gpd.GeoSeries([Point(0, 0), Point(1, 1)], crs=Settings.OUTPUT_CRS)
         target_crs = Settings.OUTPUT_CRS
 
-        result = output.merge_parameters(
+        parameters = [
             frontal_area_density,
             plan_area_density,
             rooftop_area_density,
@@ -138,18 +146,15 @@ class TestNodes(unittest.TestCase):
             macdonald_roughness_length,
             macdonald_displacement_height,
             vertical_distribution_of_building_heights,
-            building_geometry,
-            target_crs,
-        )
+            output_geometry,
+        ]
+        result = output.merge_parameters(*parameters)
 
         assert isinstance(result, gpd.GeoDataFrame), "Output is not a GeoDataFrame"
-        assert list(result.columns) == [
-            "frontal_area_north",
-            "frontal_area_east",
-            "frontal_area_south",
-            "frontal_area_west",
-            "plan_area_density",
-            "rooftop_area_density",
+        assert list(result.columns) == level_names() + [
+            "building_geometry"
+        ], "Output columns are not in the order of the binary levels"
+        assert list(result.columns[90:117]) == [
             "plan_area_fraction",
             "mean_building_height",
             "standard_deviation_of_building_heights",
@@ -177,10 +182,20 @@ class TestNodes(unittest.TestCase):
             "macdonald_roughness_length_south",
             "macdonald_roughness_length_west",
             "macdonald_displacement_height",
-            "vertical_distribution_of_building_heights",
-            "building_geometry",
         ], "Output columns are not as expected"
         assert result.crs == target_crs, "Output CRS is not as expected"
+        assert (
+            result.drop(columns="building_geometry").dtypes == np.float64
+        ).all(), "Output parameters are not float64"
+        assert result[Settings.RAUPACH_DISPLACEMENT_HEIGHT_EAST].tolist() == [
+            0.2,
+            0.3,
+        ], "Output values are not under their column"
+
+        # a level missing from the parameters would leave its column unset
+        parameters[-2] = vertical_distribution_of_building_heights.iloc[:, 1:]
+        with self.assertRaises(ValueError):
+            output.merge_parameters(*parameters)
 
     def test_numpy_to_binary(self):
         """Test the function `numpy_to_binary()` to ensure it outputs the right type and length binary file."""
@@ -191,6 +206,39 @@ class TestNodes(unittest.TestCase):
 
         assert isinstance(binary_output, bytes), "Output is not of type 'bytes'"
         assert len(binary_output) == 48, "Binary output length is not as expected"
+        assert binary_output == output.numpy_to_binary__fast(
+            test_array
+        ), "Fast binary output is not as expected"
+
+    def test_output_bounds(self):
+        """Test that the function `output_bounds()` returns the total bounds of the buildings."""
+
+        output_geometry = gpd.GeoSeries(
+            [Polygon([[0, 0], [0, 1], [1, 1], [1, 0]]), Polygon([[3, 3], [3, 4], [4, 4], [4, 3]])]
+        )
+
+        np.testing.assert_array_equal(output.output_bounds(output_geometry), [0, 0, 4, 4])
+
+    def test_output_geometry(self):
+        """Test that the function `output_geometry()` matches reprojecting with GeoPandas."""
+
+        building_geometry = pd.Series(
+            [
+                Polygon([[0, 0], [0, 1000], [1000, 1000], [1000, 0]]),
+                Polygon(
+                    [[3000, 3000], [3000, 4000], [4000, 4000], [4000, 3000]],
+                    [[[3200, 3200], [3200, 3400], [3400, 3400]]],
+                ),
+            ],
+            index=[5, 7],
+        )
+
+        expected = gpd.GeoSeries(building_geometry, crs="epsg:3857").to_crs(Settings.OUTPUT_CRS)
+        actual = output.output_geometry(building_geometry, "epsg:3857")
+
+        assert actual.crs == Settings.OUTPUT_CRS, "Output CRS is not as expected"
+        assert list(actual.index) == [5, 7], "Output index is not as expected"
+        assert actual.geom_equals_exact(expected, tolerance=0).all(), "Geometry is not as expected"
 
     def test_raster_to_numpy(self):
         """Test the function `raster_to_numpy()` to ensure it outputs the right type and shape numpy array."""
@@ -210,6 +258,35 @@ class TestNodes(unittest.TestCase):
         assert result.shape == (132, 5, 5), "Output shape is not as expected"
         assert result.dtype == np.float32, "Output dtype is not np.float32"
 
+    def test_raster_to_numpy__streaming(self):
+        """Test that the function `raster_to_numpy__streaming()` matches rasterizing, aggregating, and stacking."""
+
+        merge_parameters = gpd.GeoDataFrame(
+            {
+                "parameter1": [1.5, 2.0, 3.25, 4.0],
+                "parameter2": [4.0, 5.5, 6.0, 0.5],
+                Settings.GEOMETRY_FIELD: [
+                    Polygon([[0, 0], [0, 0.002], [0.002, 0.002], [0.002, 0]]),
+                    Polygon([[0.001, 0.001], [0.001, 0.003], [0.003, 0.003], [0.003, 0.001]]),
+                    Polygon([[0.004, 0], [0.004, 0.001], [0.005, 0.001], [0.005, 0]]),
+                    Polygon([[0, 0.004], [0, 0.005], [0.001, 0.005], [0.001, 0.004]]),
+                ],
+            },
+            geometry=Settings.GEOMETRY_FIELD,
+            crs=Settings.OUTPUT_CRS,
+        )
+
+        expected = output.raster_to_numpy(
+            output.aggregate_rasters(output.rasterize_parameters(merge_parameters.copy()))
+        )
+        actual = output.raster_to_numpy__streaming(
+            merge_parameters, parameter_group_size=1, building_chunk_size=3
+        )
+
+        assert actual.dtype == np.float32, "Output dtype is not np.float32"
+        assert actual.shape == (2, *expected.shape[1:]), "Output shape is not as expected"
+        np.testing.assert_array_equal(expected[:2], actual)
+
     def test_rasterize_parameters(self):
         """Test the function `rasterize_parameters()` to ensure it outputs the right type and shape xr.Dataset."""
 
@@ -238,6 +315,44 @@ class TestNodes(unittest.TestCase):
             2400,
         ), "Output shape for 'parameter2' is not as expected"
 
+        result = output.rasterize_parameters(merge_parameters, output_resolution=0.5)
+
+        assert result["parameter1"].shape == (4, 4), "Output shape at 0.5 is not as expected"
+        xr.testing.assert_identical(
+            result, output.rasterize_parameters__fast(merge_parameters, output_resolution=0.5)
+        )
+
+    def test_rasterize_parameters_target_grid(self):
+        """Test that `rasterize_parameters()` and `raster_to_numpy__streaming()` burn onto a given grid."""
+
+        merge_parameters = gpd.GeoDataFrame(
+            {
+                "parameter1": [1.5, 2.0],
+                Settings.GEOMETRY_FIELD: [
+                    Polygon([[1.5, 1.5], [1.5, 2.5], [2.5, 2.5], [2.5, 1.5]]),
+                    Polygon([[1.6, 1.6], [1.6, 1.8], [1.8, 1.8], [1.8, 1.6]]),
+                ],
+            },
+            geometry=Settings.GEOMETRY_FIELD,
+            crs="EPSG:3857",
+        )
+        merge_parameters = merge_parameters.to_crs(Settings.OUTPUT_CRS)
+        target_grid = Grid("EPSG:3857", (0, 0), (1, 1), (4, 5))
+
+        result = output.rasterize_parameters(merge_parameters.copy(), target_grid=target_grid)
+        streaming = output.raster_to_numpy__streaming(merge_parameters, target_grid=target_grid)
+        fast = output.rasterize_parameters__fast(merge_parameters, target_grid=target_grid)
+
+        expected = np.zeros((4, 5))
+        expected[1:3, 1:3] = 1.5
+        expected[1, 1] = 3.5
+        np.testing.assert_allclose(result["parameter1"].to_numpy(), expected)
+        np.testing.assert_allclose(result["y"].to_numpy(), [0.5, 1.5, 2.5, 3.5])
+        xr.testing.assert_identical(result, fast)
+        np.testing.assert_allclose(
+            streaming[0], expected / np.maximum(result["building_count"].to_numpy(), 1) * 1e4
+        )
+
     def test_write_binary(self):
         """Test that the function `write_binary()` writes a binary file correctly."""
 
@@ -245,8 +360,9 @@ class TestNodes(unittest.TestCase):
         test_binary_filename = "00001-00010.00001-00010"
         numpy_to_binary = raster_to_numpy.tobytes()
 
-        output.write_binary(numpy_to_binary, raster_to_numpy)
+        path = output.write_binary(numpy_to_binary, raster_to_numpy)
 
+        assert path == os.path.join(".", test_binary_filename), "Returned path is not as expected"
         assert os.path.exists(test_binary_filename), "Binary file was not created."
         with open(test_binary_filename, "rb") as binary_file:
             content = binary_file.read()
@@ -254,6 +370,159 @@ class TestNodes(unittest.TestCase):
 
         os.remove(test_binary_filename)
 
+    def test_write_binary__streaming(self):
+        """Test that the function `write_binary__streaming()` writes the same bytes as `numpy_to_binary()`."""
+
+        raster_to_numpy = np.random.uniform(-1e5, 1e5, (3, 4, 5)).astype(np.float32)
+        test_binary_filename = "00001-00005.00001-00004"
+
+        output.write_binary__streaming(raster_to_numpy, output_directory=self.test_dir)
+        test_binary_filename = os.path.join(self.test_dir, test_binary_filename)
+
+        with open(test_binary_filename, "rb") as binary_file:
+            content = binary_file.read()
+        os.remove(test_binary_filename)
+
+        assert content == output.numpy_to_binary(raster_to_numpy), "Content is not as expected"
+
+    def test_write_tiled_binary(self):
+        """Test that the tiles from `write_tiled_binary()` reconstruct the binary from `numpy_to_binary()`."""
+
+        raster_to_numpy = np.random.uniform(-1e5, 1e5, (3, 5, 7)).astype(np.float32)
+
+        paths = output.write_tiled_binary(
+            raster_to_numpy, output_directory=self.test_dir, tile_x=3, tile_y=2, tile_workers=4
+        )
+
+        assert sorted(os.listdir(self.test_dir)) == [
+            f"{x:05d}-{x + 2:05d}.{y:05d}-{y + 1:05d}" for x in (1, 4, 7) for y in (1, 3, 5)
+        ], "Tile names are not as expected"
+        assert sorted(paths) == [
+            os.path.join(self.test_dir, filename) for filename in sorted(os.listdir(self.test_dir))
+        ], "Returned paths are not as expected"
+
+        reconstructed = np.zeros((3, 6, 9), dtype=">i4")
+        for first_row in (0, 2, 4):
+            for first_col in (0, 3, 6):
+                filename = output._tile_filename(
+                    first_row + 1, first_row + 2, first_col + 1, first_col + 3
+                )
+                tile = np.fromfile(os.path.join(self.test_dir, filename), dtype=">i4")
+                reconstructed[:, first_row : first_row + 2, first_col : first_col + 3] = (
+                    tile.reshape(3, 2, 3)
+                )
+
+        assert not reconstructed[:, 5:, :].any() and not reconstructed[:, :, 7:].any()
+        assert reconstructed[:, :5, :7].tobytes() == output.numpy_to_binary(raster_to_numpy)
+
+    def test_write_tiled_index(self):
+        """Test that the function `write_tiled_index()` writes the tile size to the index file."""
+
+        output_bounds = np.array([0.0, 0.0, 1.0, 1.0])
+
+        output.write_tiled_index(
+            output_bounds, output_directory=self.test_dir, tile_x=30, tile_y=20
+        )
+
+        with open(os.path.join(self.test_dir, "index"), "r") as index:
+            content = index.read()
+        assert "projection=albers_nad83" in content, "Index file projection is not as expected."
+        assert "tile_x=30" in content, "Index file tile_x is not as expected."
+        assert "tile_y=20" in content, "Index file tile_y is not as expected."
+
+    def _aggregate_rasters(self):
+        """Small aggregated dataset with a CRS for the dataset writers."""
+
+        merge_parameters = gpd.GeoDataFrame(
+            {
+                "parameter1": [1.5, 0.0],
+                Settings.GEOMETRY_FIELD: [
+                    Polygon([[0, 0], [0, 0.002], [0.002, 0.002], [0.002, 0]]),
+                    Polygon([[0.003, 0.003], [0.003, 0.004], [0.004, 0.004], [0.004, 0.003]]),
+                ],
+            },
+            geometry=Settings.GEOMETRY_FIELD,
+            crs=Settings.OUTPUT_CRS,
+        )
+
+        return output.aggregate_rasters(output.rasterize_parameters(merge_parameters))
+
+    @unittest.skipUnless(importlib.util.find_spec("zarr"), "zarr is not installed")
+    def test_write_dataset_zarr(self):
+        """Test that the function `write_dataset()` writes a Zarr store that reads back unchanged."""
+
+        aggregate_rasters = self._aggregate_rasters()
+
+        path = output.write_dataset(aggregate_rasters, self.test_dir, dataset_chunk_size=2)
+
+        result = xr.open_zarr(path).load()
+        assert path == os.path.join(self.test_dir, "naturf.zarr"), "Path is not as expected"
+        assert result.rio.crs == aggregate_rasters.rio.crs, "CRS is not as expected"
+        xr.testing.assert_equal(
+            result.drop_vars("spatial_ref"), aggregate_rasters.drop_vars("spatial_ref")
+        )
+
+    @unittest.skipUnless(importlib.util.find_spec("netCDF4"), "netCDF4 is not installed")
+    def test_write_dataset_netcdf(self):
+        """Test that the function `write_dataset()` writes a compressed NetCDF file that reads back unchanged."""
+
+        aggregate_rasters = self._aggregate_rasters()
+
+        path = output.write_dataset(
+            aggregate_rasters, self.test_dir, dataset_format="netcdf", dataset_chunk_size=2
+        )
+
+        with xr.open_dataset(path) as result:
+            result = result.load()
+        assert result["parameter1"].encoding["zlib"], "Variable is not compressed"
+        assert result["parameter1"].encoding["chunksizes"] == (2, 2), "Chunks are not as expected"
+        xr.testing.assert_equal(
+            result.drop_vars("spatial_ref"), aggregate_rasters.drop_vars("spatial_ref")
+        )
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_write_parameters(self):
+        """Test that the function `write_parameters()` writes the buildings sorted along a Hilbert curve."""
+
+        merge_parameters = gpd.GeoDataFrame(
+            {
+                "parameter1": [1.0, 2.0, 3.0, 4.0],
+                Settings.GEOMETRY_FIELD: [
+                    Polygon([[9, 9], [9, 10], [10, 10], [10, 9]]),
+                    Polygon([[0, 0], [0, 1], [1, 1], [1, 0]]),
+                    Polygon([[0, 9], [0, 10], [1, 10], [1, 9]]),
+                    Polygon([[1, 0], [1, 1], [2, 1], [2, 0]]),
+                ],
+            },
+            geometry=Settings.GEOMETRY_FIELD,
+            crs=Settings.OUTPUT_CRS,
+        )
+
+        path = output.write_parameters(merge_parameters, self.test_dir, parquet_row_group_size=2)
+
+        import pyarrow.parquet as pq
+
+        result = gpd.read_parquet(path)
+        assert pq.ParquetFile(path).metadata.num_row_groups == 2, "Row groups are not as expected"
+        assert result.crs == merge_parameters.crs, "CRS is not as expected"
+        assert list(result.columns) == [
+            "parameter1",
+            Settings.GEOMETRY_FIELD,
+            *Settings.GEOMETRY_BOUNDS_FIELDS,
+        ], "Columns are not as expected"
+        assert sorted(result.index) == [0, 1, 2, 3], "Index is not as expected"
+        assert set(result.index[:2]) == {1, 3}, "Buildings are not sorted spatially"
+        np.testing.assert_array_equal(
+            result[Settings.GEOMETRY_BOUNDS_FIELDS].to_numpy(),
+            result.geometry.bounds.to_numpy(),
+        )
+
+    def test_write_dataset_format(self):
+        """Test that the function `write_dataset()` rejects an unknown format."""
+
+        with self.assertRaises(ValueError):
+            output.write_dataset(self._aggregate_rasters(), self.test_dir, dataset_format="grib")
+
     def test_write_index(self):
         """Test that the function `write_index()` writes an index file and contains the correct values."""
 
@@ -263,10 +532,12 @@ class TestNodes(unittest.TestCase):
         building_geometry = pd.Series([polygon1, polygon2])
         target_crs = "epsg:3857"
         test_index_filename = "test_index"
+        output_bounds = output.output_bounds(output.output_geometry(building_geometry, target_crs))
 
         file_path = self.test_dir + "/" + test_index_filename
-        output.write_index(raster_to_numpy, building_geometry, target_crs, index_filename=file_path)
+        path = output.write_index(raster_to_numpy, output_bounds, index_filename=file_path)
 
+        assert path == file_path, "Returned path is not as expected"
         assert os.path.exists(file_path), "Index file was not created."
         with open(file_path, "r") as index:
             content = index.read()
@@ -298,6 +569,40 @@ class TestNodes(unittest.TestCase):
                 'description="Urban_Parameters"' in content
             ), "Index file description is not as expected."
 
+    def test_write_index_target_grid(self):
+        """Test that `write_index()` describes the target grid when one is given."""
+
+        raster_to_numpy = np.zeros((132, 4, 5))
+        output_bounds = np.array([0.0, 0.0, 1.0, 1.0])
+        target_grid = Grid(
+            "+proj=lcc +lat_1=30 +lat_2=60 +lat_0=34.83 +lon_0=-98 +a=6370000 +b=6370000",
+            (0, 0),
+            (1000, 1000),
+            (4, 5),
+        )
+        known_lat, known_lon = target_grid.known_point()
+
+        file_path = self.test_dir + "/test_index"
+        output.write_index(
+            raster_to_numpy,
+            output_bounds,
+            index_filename=file_path,
+            target_grid=target_grid,
+        )
+
+        with open(file_path, "r") as index:
+            content = index.read()
+        assert "projection=lambert" in content, "Index file projection is not as expected."
+        assert "dx=1000.0" in content, "Index file dx is not as expected."
+        assert "dy=1000.0" in content, "Index file dy is not as expected."
+        assert f"known_lat={known_lat}" in content, "Index file known_lat is not as expected."
+        assert f"known_lon={known_lon}" in content, "Index file known_lon is not as expected."
+        assert "truelat1=30.0" in content, "Index file truelat1 is not as expected."
+        assert "truelat2=60.0" in content, "Index file truelat2 is not as expected."
+        assert "stdlon=-98.0" in content, "Index file stdlon is not as expected."
+        assert "tile_x=5" in content, "Index file tile_x is not as expected."
+        assert "tile_y=4" in content, "Index file tile_y is not as expected."
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import naturf.output as output
+from naturf.reader import BinaryOutput, compare_outputs, level_names, read_index
+
+
+class TestReader(unittest.TestCase):
+    def setUp(self):
+        # Create a temporary directory
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        # Remove the directory after the test
+        shutil.rmtree(self.test_dir)
+
+    def _write_output(self, raster_to_numpy, output_directory):
+        """Write a binary and index file for `raster_to_numpy` to `output_directory`."""
+
+        os.makedirs(output_directory, exist_ok=True)
+        output_bounds = np.array([0.0, 0.0, 1.0, 1.0])
+        output.write_binary__streaming(raster_to_numpy, output_directory=output_directory)
+        output.write_index(raster_to_numpy, output_bounds, output_directory=output_directory)
+
+        return os.path.join(output_directory, "index")
+
+    def test_read_index(self):
+        """Test that the function `read_index()` parses the entries written by `write_index()`."""
+
+        index = read_index(self._write_output(np.zeros((132, 4, 5)), self.test_dir))
+
+        assert index["projection"] == "albers_nad83"
+        assert index["tile_x"] == 5
+        assert index["tile_y"] == 4
+        assert index["tile_z"] == 132
+        assert index["scale_factor"] == 0.0001
+        assert index["description"] == "Urban_Parameters"
+
+    def test_binary_output(self):
+        """Test that `BinaryOutput` maps the binary file and scales the values when indexed."""
+
+        raster_to_numpy = np.random.uniform(0, 1e5, (132, 4, 5)).astype(np.float32)
+
+        result = BinaryOutput(self._write_output(raster_to_numpy, self.test_dir))
+
+        assert isinstance(result.raw, np.memmap)
+        assert result.shape == (132, 4, 5)
+        assert len(result.parameters) == 132
+        assert result.parameters == level_names()
+        np.testing.assert_array_equal(result.raw, raster_to_numpy.astype(np.int32))
+        np.testing.assert_allclose(result[3, 1:3], raster_to_numpy[3, 1:3].astype(np.int32) * 1e-4)
+        np.testing.assert_allclose(
+            result.level("sky_view_factor"), result[level_names().index("sky_view_factor")]
+        )
+
+    def test_compare_outputs(self):
+        """Test that the function `compare_outputs()` reports the differences of each parameter beyond the tolerance."""
+
+        expected = np.full((132, 5, 4), 10000, dtype=np.float32)
+        actual = expected.copy()
+        actual[0, 4, 3] = 30000
+        actual[131, 0] = 9000
+        actual[2, 1:3] = 10001
+
+        expected_output = BinaryOutput(
+            self._write_output(expected, os.path.join(self.test_dir, "expected"))
+        )
+        actual_output = BinaryOutput(
+            self._write_output(actual, os.path.join(self.test_dir, "actual"))
+        )
+        result = compare_outputs(expected_output, actual_output, block_rows=2)
+
+        assert list(result.columns) == ["max_abs_diff", "mean_abs_diff", "differing_cells"]
+        assert result.index[0] == "frontal_area_north_0"
+        np.testing.assert_allclose(
+            result["max_abs_diff"].iloc[[0, 1, 2, 131]], [2.0, 0.0, 1e-4, 0.1]
+        )
+        np.testing.assert_allclose(result["mean_abs_diff"].iloc[[0, 2, 131]], [0.1, 4e-5, 0.02])
+        assert result["differing_cells"].iloc[[0, 1, 2, 131]].tolist() == [1, 0, 0, 4]
+
+        result = compare_outputs(expected_output, actual_output, rtol=0, atol=0)
+        assert result["differing_cells"].iloc[[0, 1, 2, 131]].tolist() == [1, 0, 8, 4]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+from naturf import cli, driver, service
+from naturf.config import Settings
+
+
+class TestService(unittest.TestCase):
+    INPUT_SHAPEFILE = os.path.join("naturf", "data", "C-5.shp")
+    INPUTS = {"radius": 100, "cap_style": 1}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def start_server(self, **kwargs) -> str:
+        """Serve on a free local port in a background thread and return its URL."""
+
+        started = threading.Event()
+        servers = []
+
+        def ready(server):
+            servers.append(server)
+            started.set()
+
+        thread = threading.Thread(
+            target=service.serve, kwargs=dict(kwargs, port=0, ready=ready), daemon=True
+        )
+        thread.start()
+        assert started.wait(60), "The server did not start"
+        self.addCleanup(thread.join, 60)
+        self.addCleanup(servers[0].shutdown)
+
+        host, port = servers[0].server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    def request(self, url: str, job: dict = None):
+        """Send a GET, or a POST of `job`, and return the status and decoded JSON of the response."""
+
+        data = None if job is None else json.dumps(job).encode()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, json.loads(error.read())
+
+    def test_serve(self):
+        """Test that jobs submitted over HTTP run in the warm pool and write the same outputs as a single run."""
+
+        expected_directory = os.path.join(self.directory, "expected")
+        os.makedirs(expected_directory)
+        driver.Model(
+            dict(
+                TestService.INPUTS,
+                input_shapefile=TestService.INPUT_SHAPEFILE,
+                output_directory=expected_directory,
+            ),
+            ["write_binary", "write_index"],
+        ).execute()
+
+        url = self.start_server(workers=1)
+        assert self.request(f"{url}/health") == (
+            200,
+            {"workers": 1, "queued": 0, "running": 0, "done": 0, "failed": 0},
+        )
+
+        # a file of another job, modified while this one runs, is not listed as written by it
+        output_directory = os.path.join(self.directory, "output")
+        os.makedirs(output_directory)
+        other = os.path.join(output_directory, "other")
+        open(other, "w").close()
+        os.utime(other, (time.time() + 3600, time.time() + 3600))
+        status, record = self.request(
+            f"{url}/jobs?wait=1",
+            {
+                "input_shapefile": TestService.INPUT_SHAPEFILE,
+                "output_directory": output_directory,
+                "inputs": TestService.INPUTS,
+            },
+        )
+        assert status == 200 and record["status"] == "done"
+        assert record["files"] == [
+            os.path.join(output_directory, "00001-00035.00001-00026"),
+            os.path.join(output_directory, "index"),
+        ]
+        assert record["seconds"] > 0 and record["queued_seconds"] >= 0
+        for filename in ["00001-00035.00001-00026", "index"]:
+            with open(os.path.join(expected_directory, filename), "rb") as expected:
+                with open(os.path.join(output_directory, filename), "rb") as actual:
+                    assert actual.read() == expected.read(), f"{filename} differs from a single run"
+
+        status, record = self.request(
+            f"{url}/jobs",
+            {"input_shapefile": "missing.shp", "output_directory": self.directory},
+        )
+        assert status == 202 and record["status"] in ("queued", "running")
+        status, record = self.request(f"{url}/jobs/{record['id']}?wait=1")
+        assert status == 200 and record["status"] == "failed"
+        assert "missing.shp" in record["error"]
+
+        assert self.request(f"{url}/jobs", {"input_shapefile": "missing.shp"})[0] == 400
+        assert self.request(f"{url}/jobs/3")[0] == 404
+        status, records = self.request(f"{url}/jobs")
+        assert status == 200 and [record["status"] for record in records] == ["done", "failed"]
+
+    def test_status(self):
+        """Test that only the job a worker took is running while the others wait for it, and that the queue bound
+        counts those waiting jobs."""
+
+        queue = service.JobQueue(workers=1, max_queued=2, inputs=TestService.INPUTS, engine="fast")
+        self.addCleanup(queue.shutdown)
+
+        first = queue.submit(
+            {
+                "input_shapefile": TestService.INPUT_SHAPEFILE,
+                "output_directory": self.directory,
+                "inputs": {"radius": 50},
+            }
+        )
+        assert first["inputs"] == {"radius": 50, "cap_style": 1}
+        while queue.record(first["id"])["status"] == "queued":
+            time.sleep(0.01)
+        waiting = [
+            queue.submit({"input_shapefile": "missing.shp", "output_directory": self.directory})
+            for _ in range(2)
+        ]
+
+        # the executor moves the waiting jobs to its call queue at once, where their futures already report running
+        time.sleep(0.2)
+        assert queue.counts() == {"queued": 2, "running": 1, "done": 0, "failed": 0}
+        assert [queue.record(record["id"])["status"] for record in waiting] == ["queued", "queued"]
+        with self.assertRaises(service.QueueFullError):
+            queue.submit({"input_shapefile": "missing.shp", "output_directory": self.directory})
+
+        assert queue.record(waiting[-1]["id"], wait_for=True)["status"] == "failed"
+        assert queue.counts() == {"queued": 0, "running": 0, "done": 1, "failed": 2}
+
+    def test_queue_full(self):
+        """Test that jobs beyond the bound of the queue are refused."""
+
+        queue = service.JobQueue(workers=1, max_queued=0)
+        self.addCleanup(queue.shutdown)
+
+        with self.assertRaises(service.QueueFullError):
+            queue.submit({"input_shapefile": "missing.shp", "output_directory": self.directory})
+        assert queue.jobs == {}
+
+    def test_cli(self):
+        """Test that `naturf serve` takes the model arguments of `naturf run` as the options and inputs of its
+        jobs."""
+
+        # the SIGTERM handler of the command is not installed in the test process
+        with patch("naturf.service.serve") as serve, patch("naturf.cli.signal.signal"):
+            assert (
+                cli.main(
+                    [
+                        "serve",
+                        "--port",
+                        "0",
+                        "--radius",
+                        "50",
+                        "--output-resolution",
+                        "0.001",
+                        "--engine",
+                        "fast",
+                        "--building-order",
+                        "hilbert",
+                    ]
+                )
+                == 0
+            )
+
+        kwargs = serve.call_args.kwargs
+        assert kwargs["inputs"] == {
+            "radius": 50,
+            "cap_style": Settings.CAP_STYLE,
+            "output_resolution": 0.001,
+        }
+        assert kwargs["engine"] == "fast" and kwargs["building_order"] == "hilbert"
+
+
+if __name__ == "__main__":
+    unittest.main()
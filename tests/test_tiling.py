@@ -0,0 +1,224 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+
+import geopandas as gpd
+import numpy as np
+
+from naturf import cli, driver, tiling
+from naturf.config import Settings
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+class TestTiling(unittest.TestCase):
+    INPUT_SHAPEFILE = os.path.join("naturf", "data", "C-5.shp")
+    INPUTS = {"radius": 100, "cap_style": 1}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_plan_tiles(self):
+        """Test that every building belongs to exactly one tile and that the halo of a tile holds its neighbors."""
+
+        manifest_filename = tiling.plan_tiles(
+            TestTiling.INPUT_SHAPEFILE, self.directory, TestTiling.INPUTS, tile_size=800
+        )
+        manifest = tiling.read_manifest(manifest_filename)
+
+        buildings = gpd.read_file(TestTiling.INPUT_SHAPEFILE)
+        buildings = buildings.loc[buildings[Settings.DATA_HEIGHT_FIELD_NAME] > 0]
+        bounds = buildings.geometry.bounds.to_numpy()
+        centers = tiling._centers(bounds)
+        membership = np.array(
+            [tiling._in_bounds(centers, tile["bounds"]) for tile in manifest["tiles"]]
+        )
+
+        assert [tile["task_id"] for tile in manifest["tiles"]] == list(
+            range(len(manifest["tiles"]))
+        )
+        assert (membership.sum(axis=0) == 1).all(), "Buildings not in exactly one tile"
+        for tile, in_tile in zip(manifest["tiles"], membership):
+            assert tile["buildings"] == in_tile.sum()
+            minx, miny, maxx, maxy = tile["halo_bounds"]
+            assert (bounds[in_tile, 0] - TestTiling.INPUTS["radius"] >= minx).all()
+            assert (bounds[in_tile, 1] - TestTiling.INPUTS["radius"] >= miny).all()
+            assert (bounds[in_tile, 2] + TestTiling.INPUTS["radius"] <= maxx).all()
+            assert (bounds[in_tile, 3] + TestTiling.INPUTS["radius"] <= maxy).all()
+
+    def test_balanced_tiles(self):
+        """Test that balanced tiles partition the buildings into tiles of about equal estimated cost."""
+
+        grid = tiling.read_manifest(
+            tiling.plan_tiles(
+                TestTiling.INPUT_SHAPEFILE,
+                os.path.join(self.directory, "grid"),
+                TestTiling.INPUTS,
+                tile_size=800,
+            )
+        )
+        balanced = tiling.read_manifest(
+            tiling.plan_tiles(
+                TestTiling.INPUT_SHAPEFILE,
+                os.path.join(self.directory, "balanced"),
+                TestTiling.INPUTS,
+                method="balanced",
+                tile_count=6,
+            )
+        )
+
+        def spread(manifest):
+            costs = np.array([tile["estimated_cost"] for tile in manifest["tiles"]])
+            return costs.std() / costs.mean()
+
+        assert len(balanced["tiles"]) == 6
+        assert sum(tile["buildings"] for tile in balanced["tiles"]) == sum(
+            tile["buildings"] for tile in grid["tiles"]
+        )
+        assert spread(balanced) < 0.25 < spread(grid), "Balanced tiles are not balanced"
+
+        with self.assertRaises(ValueError):
+            tiling.plan_tiles(
+                TestTiling.INPUT_SHAPEFILE, self.directory, TestTiling.INPUTS, method="quadtree"
+            )
+
+    def test_split(self):
+        """Test that a tile is split at the weighted median across its longer side between distinct centers."""
+
+        centers = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 0.5], [2.0, 0.0], [3.0, 0.0]])
+        costs = np.array([1.0, 1.0, 1.0, 6.0, 1.0])
+
+        (lower, lower_indices), (upper, upper_indices) = tiling._split(
+            centers, costs, [0.0, 0.0, 3.5, 1.0], np.arange(5)
+        )
+
+        assert lower == [0.0, 0.0, 2.5, 1.0] and upper == [2.5, 0.0, 3.5, 1.0]
+        assert sorted(lower_indices) == [0, 1, 2, 3] and list(upper_indices) == [4]
+        assert tiling._split(centers, costs, [0.0, 0.0, 3.5, 1.0], np.array([1, 1])) is None
+
+        (lower, lower_indices), _ = tiling._split(
+            centers, costs, [0.0, 0.0, 1.1, 1.0], np.array([1, 2])
+        )
+        assert lower == [0.0, 0.0, 1.1, 0.25] and list(lower_indices) == [1]
+
+    def test_workers_and_reduce(self):
+        """Test that tiles computed by separate worker processes reduce to the same binary and index as one run."""
+
+        expected_directory = os.path.join(self.directory, "expected")
+        os.makedirs(expected_directory)
+        driver.Model(
+            dict(
+                TestTiling.INPUTS,
+                input_shapefile=TestTiling.INPUT_SHAPEFILE,
+                output_directory=expected_directory,
+            ),
+            ["write_binary", "write_index"],
+        ).execute()
+
+        manifest_directory = os.path.join(self.directory, "manifest")
+        output_directory = os.path.join(self.directory, "output")
+        assert (
+            cli.main(
+                [
+                    "plan",
+                    TestTiling.INPUT_SHAPEFILE,
+                    "--manifest-directory",
+                    manifest_directory,
+                    "--tile-size",
+                    "1500",
+                    "--radius",
+                    "100",
+                    "--cap-style",
+                    "1",
+                    "--output-directory",
+                    output_directory,
+                ]
+            )
+            == 0
+        )
+        manifest_filename = os.path.join(manifest_directory, tiling.MANIFEST_FILENAME)
+        task_ids = [tile["task_id"] for tile in tiling.read_manifest(manifest_filename)["tiles"]]
+        assert len(task_ids) > 1
+
+        assert cli.main(["reduce", "--manifest", manifest_filename]) == 1, "Reduced missing tiles"
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            exit_codes = executor.map(
+                cli.main,
+                [
+                    ["worker", "--manifest", manifest_filename, "--task-id", str(task_id)]
+                    for task_id in task_ids
+                ],
+            )
+            assert list(exit_codes) == [0] * len(task_ids)
+
+        assert tiling.missing_tiles(manifest_filename) == []
+        assert not [
+            name
+            for name in os.listdir(os.path.dirname(tiling._tile_filename(manifest_filename, 0)))
+            if name.endswith(".tmp")
+        ]
+        assert cli.main(["reduce", "--manifest", manifest_filename]) == 0
+
+        for filename in ["00001-00035.00001-00026", "index"]:
+            with open(os.path.join(expected_directory, filename), "rb") as expected:
+                with open(os.path.join(output_directory, filename), "rb") as actual:
+                    assert actual.read() == expected.read(), f"{filename} differs from a single run"
+
+    def test_tile_report(self):
+        """Test that the report pairs the estimated cost of each computed tile with its measured run time."""
+
+        manifest_filename = tiling.plan_tiles(
+            TestTiling.INPUT_SHAPEFILE,
+            self.directory,
+            TestTiling.INPUTS,
+            method="balanced",
+            tile_count=3,
+            # workers always run headless, whatever the options of the plan say
+            headless=False,
+        )
+        for task_id in [0, 1]:
+            tiling.run_tile(manifest_filename, task_id)
+
+        report = tiling.tile_report(manifest_filename)
+
+        assert list(report.columns) == [
+            "buildings",
+            "estimated_pairs",
+            "estimated_cost",
+            "pairs",
+            "estimated_seconds",
+            "seconds",
+        ]
+        assert report.loc[[0, 1]].notna().all().all()
+        assert report.loc[2, ["pairs", "seconds"]].isna().all()
+        assert report["estimated_seconds"].notna().all()
+        np.testing.assert_allclose(
+            report.loc[[0, 1], "estimated_pairs"], report.loc[[0, 1], "pairs"], rtol=0.5
+        )
+
+    def test_worker_task_id(self):
+        """Test that the worker takes its task ID from a SLURM array job and needs one otherwise."""
+
+        manifest_filename = tiling.plan_tiles(
+            TestTiling.INPUT_SHAPEFILE, self.directory, TestTiling.INPUTS, tile_size=800
+        )
+        tile_filename = tiling._tile_filename(manifest_filename, 0)
+
+        with patch.dict(os.environ, {"SLURM_ARRAY_TASK_ID": "0"}):
+            assert cli.main(["worker", "--manifest", manifest_filename]) == 0
+        assert os.path.exists(tile_filename)
+        assert tiling.missing_tiles(manifest_filename) == list(
+            range(1, len(tiling.read_manifest(manifest_filename)["tiles"]))
+        )
+
+        with patch.dict(os.environ, clear=True):
+            assert cli.main(["worker", "--manifest", manifest_filename]) == 2
+
+
+if __name__ == "__main__":
+    unittest.main()